@@ -0,0 +1,309 @@
+# app/audit.py
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+AdminAction = models.AdminAction
+
+# Записи, уже дописанные в журнал в транзакции сессии и ждущие её коммита
+PENDING_KEY = "audit_entries"
+
+def action(admin_id: int, action_type: str, target_user_id: Optional[int] = None,
+           details: Optional[str] = None) -> dict:
+    """Запись журнала действий; время фиксируется в момент действия, а не вставки"""
+    return {
+        "entry_id": uuid.uuid4().hex,
+        "admin_id": admin_id,
+        "action_type": action_type,
+        "target_user_id": target_user_id,
+        "details": details,
+        "created_at": datetime.utcnow(),
+    }
+
+def insert_statement(dialect_name: str):
+    """INSERT ... ON CONFLICT (entry_id) DO NOTHING: повтор журнала не дублирует строки"""
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    return dialect_insert(AdminAction).on_conflict_do_nothing(index_elements=[AdminAction.entry_id])
+
+def _lock(file) -> bool:
+    """Неблокирующая исключительная блокировка; снимается при закрытии файла или смерти процесса.
+
+    lockf, а не flock: блокировку flock унаследовали бы процессы, порождённые
+    fork (пул хеширования паролей), и журнал остался бы занятым после стопа.
+    """
+    try:
+        if fcntl is not None:
+            fcntl.lockf(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+def _read(file) -> List[dict]:
+    file.seek(0)
+    entries = []
+    for line in file:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            # Недописанная строка: процесс упал посреди записи, действие не подтверждено
+            continue
+        entry["created_at"] = datetime.fromisoformat(entry["created_at"])
+        entries.append(entry)
+    return entries
+
+class AuditLog:
+    """Журнал действий администраторов с отложенной записью.
+
+    record() вызывается до коммита самого действия: записи дописываются
+    в файл журнала процесса (с fsync) и после коммита сессии попадают в
+    буфер, не дожидаясь INSERT. При откате сессии они снимаются с
+    журнала. Падение между fsync и коммитом оставит в журнале действие,
+    которое не закоммитилось, но не потеряет закоммиченное.
+
+    Фоновая задача раз в flush_interval секунд или по накоплении
+    max_batch записей вставляет буфер одним executemany и переписывает
+    журнал, оставляя в нём только ещё не вставленные записи. При старте
+    записи из журнала этого процесса и из журналов завершившихся
+    процессов (их файл никто не держит заблокированным) вставляются
+    заново; уже вставленные отсекает уникальный entry_id. При
+    flush_interval=0 или до start() строки вставляются в транзакции
+    самого действия.
+    """
+
+    def __init__(self, journal_dir: Path, flush_interval: float, max_batch: int):
+        self.journal_dir = journal_dir
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._buffer: List[dict] = []
+        # Дописаны в журнал и ещё не вставлены (включая ждущие коммита сессии)
+        self._unflushed: Dict[str, dict] = {}
+        self._stale = False
+        self._journal = None
+        self._journal_path: Optional[Path] = None
+        self._lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.recovered = 0
+        self.last_flush_ms = 0.0
+
+    async def _insert(self, entries: List[dict]):
+        async with models.AsyncSessionLocal() as db:
+            await db.execute(insert_statement(models.async_engine.dialect.name), entries)
+            await db.commit()
+
+    def _append(self, entries: List[dict]):
+        for entry in entries:
+            self._journal.write(json.dumps({**entry, "created_at": entry["created_at"].isoformat()}) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _compact(self, entries: List[dict]):
+        """Переписать журнал, оставив в нём только entries.
+
+        Новый файл блокируется до подмены, поэтому соседний процесс не
+        примет его за журнал упавшего.
+        """
+        temp_path = self._journal_path.with_suffix(".tmp")
+        journal = open(temp_path, "w+", encoding="utf-8")
+        if not _lock(journal):
+            journal.close()
+            raise RuntimeError(f"Audit journal {temp_path} is locked by another process")
+        self._journal, previous = journal, self._journal
+        try:
+            self._append(entries)
+            os.replace(temp_path, self._journal_path)
+        except BaseException:
+            self._journal = previous
+            journal.close()
+            raise
+        previous.close()
+
+    def _open_journal(self) -> List[dict]:
+        """Открыть журнал процесса и забрать записи журналов завершившихся процессов"""
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        path = self._journal_path = self.journal_dir / f"{os.getpid()}.jsonl"
+        self._journal = open(path, "a+", encoding="utf-8")
+        if not _lock(self._journal):
+            raise RuntimeError(f"Audit journal {path} is locked by another process")
+        entries = _read(self._journal)
+
+        orphans = []
+        for other in self.journal_dir.glob("*.jsonl"):
+            if other == path:
+                continue
+            with open(other, "a+", encoding="utf-8") as file:
+                if not _lock(file):
+                    continue  # процесс жив и пишет свой журнал сам
+                adopted = _read(file)
+            self._append(adopted)
+            entries += adopted
+            orphans.append(other)
+        # Удаляются только после fsync своего журнала с их записями
+        for other in orphans:
+            other.unlink(missing_ok=True)
+
+        unique: Dict[str, dict] = {entry["entry_id"]: entry for entry in entries}
+        return list(unique.values())
+
+    async def record(self, db, *entries: dict):
+        """Записать действия, созданные action(), в транзакции db; вызывается до её коммита"""
+        if not entries:
+            return
+        self.recorded += len(entries)
+        if self._task is None:
+            await db.execute(insert_statement(models.async_engine.dialect.name), list(entries))
+            self.flushed += len(entries)
+            return
+        # Транзакция начинается явно: иначе откат пустой сессии не даёт событий
+        session = getattr(db, "sync_session", db)
+        if not session.in_transaction():
+            session.begin()
+        async with self._lock:
+            await asyncio.to_thread(self._append, entries)
+            for entry in entries:
+                self._unflushed[entry["entry_id"]] = entry
+        db.info.setdefault(PENDING_KEY, []).extend(entries)
+
+    def _committed(self, entries: List[dict]):
+        self._buffer.extend(entries)
+        if len(self._buffer) >= self.max_batch:
+            self._wake.set()
+
+    def _rolled_back(self, entries: List[dict]):
+        # Из файла записи уберёт ближайшее переписывание журнала
+        for entry in entries:
+            self._unflushed.pop(entry["entry_id"], None)
+        self._stale = True
+        self._wake.set()
+
+    async def flush(self) -> int:
+        """Вставить накопленное; при ошибке записи остаются в буфере и журнале"""
+        async with self._flush_lock:
+            async with self._lock:
+                batch, self._buffer = self._buffer, []
+            if batch:
+                started = time.perf_counter()
+                try:
+                    await self._insert(batch)
+                except Exception:
+                    async with self._lock:
+                        self._buffer[:0] = batch
+                    self.failed_flushes += 1
+                    raise
+                for entry in batch:
+                    self._unflushed.pop(entry["entry_id"], None)
+                self.flushed += len(batch)
+                self.flushes += 1
+                self.last_flush_ms = (time.perf_counter() - started) * 1000
+            if self._journal is not None and (batch or self._stale):
+                # В журнале остаются только невставленные записи, в том числе
+                # пришедшие во время вставки: он не растёт при постоянном потоке
+                async with self._lock:
+                    self._stale = False
+                    await asyncio.to_thread(self._compact, list(self._unflushed.values()))
+            return len(batch)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка записи журнала действий администраторов")
+
+    async def start(self):
+        if self._task is not None or self.flush_interval <= 0:
+            return
+        recovered = await asyncio.to_thread(self._open_journal)
+        for entry in recovered:
+            self._unflushed[entry["entry_id"]] = entry
+        self._buffer = recovered + self._buffer
+        self.recovered += len(recovered)
+        self._task = asyncio.create_task(self.run())
+        if recovered:
+            self._wake.set()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            # Записи остаются в журнале и будут вставлены при следующем старте
+            logger.exception("Ошибка записи журнала действий администраторов")
+        self._journal.close()
+        self._journal = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": "write-behind" if self._task is not None else "sync",
+            "buffered": len(self._buffer),
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "recovered": self.recovered,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+        }
+
+audit_log = AuditLog(
+    journal_dir=Path(settings.AUDIT_JOURNAL_DIR),
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+    max_batch=settings.AUDIT_MAX_BATCH,
+)
+
+# Записи, переданные record(), уходят в буфер только после коммита сессии
+@event.listens_for(Session, "after_commit")
+def _buffer_committed(session):
+    entries = session.info.pop(PENDING_KEY, None)
+    if entries:
+        audit_log._committed(entries)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_rolled_back(session, transaction):
+    # Внешняя транзакция закончилась без коммита: откат или закрытие сессии
+    if transaction.parent is None:
+        entries = session.info.pop(PENDING_KEY, None)
+        if entries:
+            audit_log._rolled_back(entries)
@@ -2,46 +2,51 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import models
+from app import metrics, models
 from app.config import settings
-
-# Настройка для bcrypt
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__rounds=12
-)
+from app.hashing import hasher, hash_password, check_password
+from app.principal_cache import Principal, principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
+# Database dependency
+async def get_db():
+    """Единая сессия на запрос (unit of work).
+
+    FastAPI кеширует зависимость в рамках запроса, поэтому auth-зависимости
+    и обработчик получают одну и ту же сессию. При ошибке транзакция
+    откатывается, соединение возвращается в пул при выходе.
+    """
+    async with models.AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+
 def verify_password(plain_password, hashed_password):
-    """Проверка пароля"""
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception as e:
-        print(f"Error verifying password: {e}")
-        return False
+    """Проверка пароля (синхронно, для скриптов)"""
+    return check_password(plain_password, hashed_password)
 
 def get_password_hash(password):
-    """Хеширование пароля"""
-    if isinstance(password, str):
-        password = password.encode('utf-8')
-    if len(password) > 72:
-        password = password[:72]
-    return pwd_context.hash(password)
+    """Хеширование пароля (синхронно, для скриптов)"""
+    return hash_password(password)
 
-def authenticate_user(db: Session, email: str, password: str):
+async def authenticate_user(db: AsyncSession, email: str, password: str):
     """Аутентификация пользователя"""
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == email))
     if not user:
+        metrics.logins.inc("unknown_user")
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await hasher.verify(password, user.hashed_password):
+        metrics.logins.inc("wrong_password")
         return False
+    metrics.logins.inc("success")
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -69,7 +74,7 @@ def get_token_from_request(request: Request) -> str:
     
     return None
 
-async def get_current_user(request: Request, db: Session = Depends(lambda: next(get_db()))):
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)):
     """Получение текущего пользователя по токену"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -82,9 +87,15 @@ async def get_current_user(request: Request, db: Session = Depends(lambda: next(
     if not token:
         raise credentials_exception
     
+    if token.startswith("Bearer "):
+        token = token[7:]
+    
+    # Кеш: без jwt.decode и SELECT для уже известных токенов
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    
     try:
-        if token.startswith("Bearer "):
-            token = token[7:]
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: int = payload.get("sub")
         if user_id is None:
@@ -92,41 +103,35 @@ async def get_current_user(request: Request, db: Session = Depends(lambda: next(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, int(user_id))
     if user is None:
         raise credentials_exception
-    return user
+    
+    principal = Principal.from_user(user)
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     """Проверка активности пользователя"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 # Role-based dependencies
-def require_client(current_user: models.User = Depends(get_current_active_user)):
+def require_client(current_user: Principal = Depends(get_current_active_user)):
     """Требуется роль клиента"""
     if current_user.role != models.UserRole.CLIENT:
         raise HTTPException(status_code=403, detail="Not authorized")
     return current_user
 
-def require_driver(current_user: models.User = Depends(get_current_active_user)):
+def require_driver(current_user: Principal = Depends(get_current_active_user)):
     """Требуется роль водителя"""
     if current_user.role != models.UserRole.DRIVER:
         raise HTTPException(status_code=403, detail="Not authorized")
     return current_user
 
-def require_admin(current_user: models.User = Depends(get_current_active_user)):
+def require_admin(current_user: Principal = Depends(get_current_active_user)):
     """Требуется роль администратора"""
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
     return current_user
-
-# Database dependency
-def get_db():
-    """Получение сессии базы данных"""
-    db = models.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
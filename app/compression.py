@@ -0,0 +1,55 @@
+# app/compression.py
+import gzip
+from typing import Dict, Iterable, Optional
+
+import brotli
+from starlette.middleware.gzip import GZipMiddleware
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    """Тело во всех поддерживаемых кодировках (для заранее сжатых ответов)"""
+    return {
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        "br": brotli.compress(body, quality=11, mode=brotli.MODE_TEXT),
+    }
+
+def negotiate(accept_encoding: Optional[str], available: Iterable[str]) -> str:
+    """Лучшая из доступных кодировок по Accept-Encoding (с учётом q=0)"""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+class ApiGZipMiddleware:
+    """GZip для ответов JSON API крупнее minimum_size.
+
+    Применяется только к путям под /api/; потоки (SSE) исключаются, иначе
+    gzip держал бы события в буфере. Ответы с уже заданным
+    Content-Encoding GZipMiddleware не трогает.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, prefix: str = "/api/", exclude: Iterable[str] = ()):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+        self.prefix = prefix
+        self.exclude = tuple(exclude)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "") if scope["type"] == "http" else ""
+        if path.startswith(self.prefix) and not path.startswith(self.exclude):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
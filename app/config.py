@@ -11,6 +11,43 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     UPLOAD_DIR: str = "app/static/uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    PASSWORD_HASH_WORKERS: int = 0  # 0 = по числу ядер
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+    PASSWORD_HASH_MAX_WAIT_SECONDS: float = 5.0
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    EVENT_QUEUE_SIZE: int = 100
+    EVENT_HEARTBEAT_SECONDS: float = 15.0
+    DISPATCH_ENABLED: bool = True  # при нескольких воркерах - только в одном
+    DISPATCH_INTERVAL_SECONDS: float = 3.0
+    DISPATCH_CANDIDATES: int = 8
+    OFFER_TIMEOUT_SECONDS: float = 20.0
+    DRIVER_PRESENCE_TTL_SECONDS: float = 60.0
+    GEO_INDEX_IN_MEMORY: bool = False  # только при одном воркере: события шины не видны другим процессам
+    GEO_INDEX_RECONCILE_SECONDS: float = 30.0
+    STORAGE_BACKEND: str = "local"  # local | s3
+    S3_BUCKET: str = ""
+    S3_ENDPOINT_URL: str = ""  # для MinIO или локальной заглушки
+    S3_REGION: str = ""
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    DOCUMENT_RETENTION_DAYS: int = 30  # сколько хранить заменённые версии документов
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # рекомендуемый размер куска для клиентов
+    UPLOAD_SESSION_TTL_SECONDS: float = 24 * 3600.0
+    UPLOAD_SESSION_GC_INTERVAL_SECONDS: float = 600.0
+    GZIP_MINIMUM_SIZE: int = 1024
+    TEMPLATE_CACHE_DIR: str = ""  # пусто - во временном каталоге системы
+    IMAGE_WORKERS: int = 2  # 0 = по числу ядер
+    IMAGE_PREVIEW_SIZE: int = 1600
+    IMAGE_THUMBNAIL_SIZE: int = 320
+    IMAGE_WEBP_QUALITY: int = 80
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 2.0  # 0 = писать действия администраторов сразу
+    AUDIT_MAX_BATCH: int = 500
+    AUDIT_JOURNAL_DIR: str = "audit_journal"
+    METRICS_ENABLED: bool = True  # /metrics и замеры запросов
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,66 @@
+# app/db_pool.py
+import time
+from collections import deque
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+class PoolStats:
+    """Счётчики ожидания соединений из пула"""
+
+    def __init__(self, samples: int = 1000):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._waits = deque(maxlen=samples)
+
+    def record(self, wait: float):
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self._waits.append(wait)
+
+    def as_dict(self) -> dict:
+        waits = sorted(self._waits)
+        p95 = waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms": {
+                "avg": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "p95": round(p95 * 1000, 3),
+                "max": round(self.max_wait * 1000, 3),
+            },
+        }
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, замеряющий время получения соединения"""
+
+    # Общая для всех экземпляров: engine.dispose() пересоздаёт пул
+    stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+def pool_status(pool) -> dict:
+    """Текущее состояние пула и статистика ожидания"""
+    result = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        result.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, InstrumentedAsyncPool):
+        result.update(pool.stats.as_dict())
+    return result
@@ -0,0 +1,389 @@
+# app/dispatch.py
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app import geo, models
+from app.config import settings
+from app.events import OrderEventType, bus
+
+logger = logging.getLogger(__name__)
+
+# Стоимость заказа без координат: назначается после всех заказов с расстоянием
+NO_LOCATION_COST = 1e6
+
+# Сопоставление
+
+@dataclass
+class OrderBatch:
+    ids: np.ndarray
+    passengers: np.ndarray
+    luggage: np.ndarray
+    lat: np.ndarray  # NaN - координат нет
+    lng: np.ndarray
+
+@dataclass
+class DriverBatch:
+    """Машины водителей: строка - одна машина, у водителя с несколькими
+    машинами в ids несколько строк. Заказу подходит строка, у которой
+    хватает и мест, и багажника."""
+    ids: np.ndarray
+    capacity: np.ndarray
+    luggage: np.ndarray  # inf - багаж не ограничен
+    lat: np.ndarray
+    lng: np.ndarray
+
+def unit_vectors(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Точки на единичной сфере (N x 3); NaN-координаты дают NaN-строки"""
+    phi, lam = np.radians(lat), np.radians(lng)
+    return np.column_stack((np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)))
+
+def chord_to_km(chord2: np.ndarray) -> np.ndarray:
+    """Квадрат хорды единичной сферы -> расстояние по поверхности, км"""
+    return 2 * geo.EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(chord2, 0, 4)) / 2)
+
+# Квадрат хорды для заказа без координат: больше любого реального (максимум 4)
+NO_LOCATION_CHORD2 = 5.0
+
+def cost_block(orders: OrderBatch, order_xyz: np.ndarray, rows: np.ndarray,
+               drivers: DriverBatch, driver_xyz: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Квадраты хорд rows x columns (монотонны по расстоянию); inf - водитель не подходит.
+
+    Расстояние считается одним матричным умножением единичных векторов,
+    а arcsin применяется только к выбранным парам (chord_to_km).
+    """
+    chord2 = 2 - 2 * (order_xyz[rows] @ driver_xyz[columns].T)
+    chord2[np.isnan(chord2)] = NO_LOCATION_CHORD2
+    eligible = (
+        (drivers.capacity[columns][None, :] >= orders.passengers[rows][:, None])
+        & (drivers.luggage[columns][None, :] >= orders.luggage[rows][:, None])
+    )
+    chord2[~eligible] = np.inf
+    return chord2
+
+def match(orders: OrderBatch, drivers: DriverBatch,
+          excluded: Optional[Dict[int, Set[int]]] = None,
+          candidates: int = 8, chunk_size: int = 512, max_rounds: int = 5) -> List[Tuple[int, int, float]]:
+    """Жадное пакетное назначение: [(индекс заказа, индекс водителя, км)].
+
+    Для каждого заказа берутся `candidates` ближайших подходящих свободных
+    водителей (argpartition по блокам строк, без полной матрицы
+    заказы x водители в памяти), затем пары разбираются по возрастанию
+    расстояния. Заказы, чьих кандидатов разобрали, получают новых
+    кандидатов в следующем раунде. Заказы без координат идут последними
+    со стоимостью NO_LOCATION_COST.
+    excluded: индекс заказа -> индексы строк водителей, которым его уже предлагали.
+    """
+    excluded = excluded or {}
+    order_xyz = unit_vectors(orders.lat, orders.lng)
+    driver_xyz = unit_vectors(drivers.lat, drivers.lng)
+    free_orders = np.arange(len(orders.ids))
+    driver_free = np.ones(len(drivers.ids), dtype=bool)
+    # Назначенный водитель занимает все строки своих машин
+    _, owner = np.unique(drivers.ids, return_inverse=True)
+    siblings: Dict[int, List[int]] = {}
+    for row in np.flatnonzero(np.bincount(owner)[owner] > 1).tolist():
+        siblings.setdefault(int(owner[row]), []).append(row)
+    assignments = []
+
+    for _ in range(max_rounds):
+        columns = np.flatnonzero(driver_free)
+        if not len(columns) or not len(free_orders):
+            break
+        position = np.full(len(drivers.ids), -1)
+        position[columns] = np.arange(len(columns))
+        k = min(candidates, len(columns))
+
+        pair_orders, pair_drivers, pair_costs = [], [], []
+        for start in range(0, len(free_orders), chunk_size):
+            rows = free_orders[start:start + chunk_size]
+            cost = cost_block(orders, order_xyz, rows, drivers, driver_xyz, columns)
+            for offset, row in enumerate(rows.tolist()):
+                for driver_index in excluded.get(row, ()):
+                    if position[driver_index] >= 0:
+                        cost[offset, position[driver_index]] = np.inf
+            top = np.argpartition(cost, k - 1, axis=1)[:, :k]
+            top_cost = np.take_along_axis(cost, top, axis=1)
+            finite = np.isfinite(top_cost)
+            pair_orders.append(np.broadcast_to(rows[:, None], top.shape)[finite])
+            pair_drivers.append(columns[top[finite]])
+            pair_costs.append(top_cost[finite])
+
+        pair_costs = np.concatenate(pair_costs)
+        if not len(pair_costs):
+            break
+        pair_orders = np.concatenate(pair_orders)
+        pair_drivers = np.concatenate(pair_drivers)
+        ordering = np.argsort(pair_costs, kind="stable")
+        pair_km = np.where(
+            pair_costs > 4, NO_LOCATION_COST, chord_to_km(np.minimum(pair_costs, 4))
+        )
+
+        order_done = set()
+        assigned_before = len(assignments)
+        for order_index, driver_index, km in zip(
+            pair_orders[ordering].tolist(), pair_drivers[ordering].tolist(), pair_km[ordering].tolist()
+        ):
+            if order_index in order_done or not driver_free[driver_index]:
+                continue
+            order_done.add(order_index)
+            driver_free[driver_index] = False
+            for row in siblings.get(int(owner[driver_index]), ()):
+                driver_free[row] = False
+            assignments.append((order_index, driver_index, km))
+
+        if len(assignments) == assigned_before:
+            break
+        # Заказы без единого подходящего кандидата не получат его и дальше
+        has_candidates = np.unique(pair_orders)
+        free_orders = has_candidates[~np.isin(has_candidates, list(order_done))]
+
+    return assignments
+
+# Присутствие водителей
+
+class DriverPresence:
+    """Водители на линии и их последние координаты"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._positions: Dict[int, Tuple[float, float, float]] = {}
+
+    def update(self, driver_id: int, lat: float, lng: float):
+        self._positions[driver_id] = (lat, lng, time.monotonic())
+
+    def touch(self, driver_id: int, lat: float, lng: float):
+        """Продлить присутствие, не затирая более свежие координаты"""
+        entry = self._positions.get(driver_id)
+        if entry is None:
+            self.update(driver_id, lat, lng)
+        else:
+            self._positions[driver_id] = (entry[0], entry[1], time.monotonic())
+
+    def discard(self, driver_id: int):
+        self._positions.pop(driver_id, None)
+
+    def online(self) -> Dict[int, Tuple[float, float]]:
+        deadline = time.monotonic() - self.ttl
+        for driver_id in [d for d, (_, _, seen) in self._positions.items() if seen < deadline]:
+            del self._positions[driver_id]
+        return {driver_id: (lat, lng) for driver_id, (lat, lng, _) in self._positions.items()}
+
+# Предложения
+
+@dataclass
+class Offer:
+    order_id: int
+    driver_id: int
+    expires_at: datetime
+
+class Dispatcher:
+    """Периодически предлагает ожидающие заказы подходящим водителям.
+
+    Заказ предлагается одному водителю за раз; без ответа за
+    OFFER_TIMEOUT_SECONDS или после отказа он уходит следующему.
+    Принятие - обычный POST /api/drivers/orders/{id}/accept, так что
+    гонку с ручным принятием разрешает order_state. Состояние живёт в
+    памяти процесса: при нескольких воркерах диспетчер включают в одном
+    (DISPATCH_ENABLED).
+    """
+
+    def __init__(self, presence: DriverPresence):
+        self.presence = presence
+        self.offers: Dict[int, Offer] = {}
+        self._offered_to: Dict[int, int] = {}
+        self.declined: Dict[int, Set[int]] = {}
+        self.ticks = 0
+        self.offers_made = 0
+        self.offers_expired = 0
+        self.last_match_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    # Ответы водителей и события заказов
+
+    def decline(self, order_id: int, driver_id: int) -> bool:
+        offer = self.offers.get(order_id)
+        if offer is None or offer.driver_id != driver_id:
+            return False
+        self._withdraw(offer)
+        return True
+
+    def _withdraw(self, offer: Offer):
+        self.offers.pop(offer.order_id, None)
+        self._offered_to.pop(offer.driver_id, None)
+        self.declined.setdefault(offer.order_id, set()).add(offer.driver_id)
+
+    def on_event(self, event):
+        """Слушатель шины: заказ ушёл из ожидающих - предложение снимается"""
+        if event.type in (OrderEventType.ACCEPTED, OrderEventType.CANCELLED, OrderEventType.COMPLETED):
+            offer = self.offers.pop(event.order["id"], None)
+            if offer is not None:
+                self._offered_to.pop(offer.driver_id, None)
+            self.declined.pop(event.order["id"], None)
+
+    # Цикл
+
+    def _expire(self, now: datetime):
+        for offer in [o for o in self.offers.values() if o.expires_at <= now]:
+            self._withdraw(offer)
+            self.offers_expired += 1
+
+    async def _load(self, db, online: Dict[int, Tuple[float, float]]):
+        now = datetime.now()
+        order_rows = (await db.execute(
+            select(
+                models.Order.id, models.Order.passengers_count, models.Order.luggage_count,
+                models.Order.pickup_lat, models.Order.pickup_lng
+            ).where(
+                models.order_is_pending(),
+                models.Order.pickup_time >= now
+            ).order_by(models.Order.created_at)
+        )).all()
+        # Отказы по заказам, ушедшим из ожидающих без события (просрочены, изменены в другом процессе)
+        pending = {row[0] for row in order_rows}
+        for order_id in [order_id for order_id in self.declined if order_id not in pending]:
+            del self.declined[order_id]
+        order_rows = [row for row in order_rows if row[0] not in self.offers]
+
+        candidates = [driver_id for driver_id in online if driver_id not in self._offered_to]
+        if not order_rows or not candidates:
+            return None, None
+        busy = set(await db.scalars(
+            select(models.Order.driver_id).where(
+                models.Order.driver_id.in_(candidates),
+                models.Order.status == models.OrderStatus.ACCEPTED
+            )
+        ))
+        # Пригодность считается по каждой машине: места и багажник должны быть в одной
+        cars: Dict[int, List[Tuple[float, float]]] = {}
+        for driver_id, capacity, luggage in await db.execute(
+            select(
+                models.DriverProfile.user_id, models.Car.capacity, models.Car.luggage_capacity
+            ).join(models.Car, models.Car.driver_profile_id == models.DriverProfile.id)
+            .where(
+                models.DriverProfile.user_id.in_([d for d in candidates if d not in busy]),
+                models.DriverProfile.documents_status == "approved"
+            )
+        ):
+            # Машина без указанного багажника багаж не ограничивает
+            cars.setdefault(driver_id, []).append(
+                (float(capacity or 0), np.inf if luggage is None else float(luggage))
+            )
+        # Машины, которые другая машина того же водителя превосходит по обоим параметрам, не нужны
+        driver_rows = [
+            (driver_id, capacity, luggage)
+            for driver_id, options in cars.items()
+            for capacity, luggage in set(options)
+            if not any(
+                (other_capacity, other_luggage) != (capacity, luggage)
+                and other_capacity >= capacity and other_luggage >= luggage
+                for other_capacity, other_luggage in options
+            )
+        ]
+        if not driver_rows:
+            return None, None
+
+        orders = OrderBatch(
+            ids=np.array([row[0] for row in order_rows]),
+            passengers=np.array([row[1] or 0 for row in order_rows], dtype=float),
+            luggage=np.array([row[2] or 0 for row in order_rows], dtype=float),
+            lat=np.array([row[3] if row[3] is not None else np.nan for row in order_rows], dtype=float),
+            lng=np.array([row[4] if row[4] is not None else np.nan for row in order_rows], dtype=float),
+        )
+        drivers = DriverBatch(
+            ids=np.array([row[0] for row in driver_rows]),
+            capacity=np.array([row[1] for row in driver_rows], dtype=float),
+            luggage=np.array([row[2] for row in driver_rows], dtype=float),
+            lat=np.array([online[row[0]][0] for row in driver_rows], dtype=float),
+            lng=np.array([online[row[0]][1] for row in driver_rows], dtype=float),
+        )
+        return orders, drivers
+
+    async def tick(self):
+        """Один проход: снять просроченные предложения и раздать новые"""
+        self.ticks += 1
+        now = datetime.now()
+        self._expire(now)
+        online = self.presence.online()
+        if not online:
+            return 0
+        async with models.AsyncSessionLocal() as db:
+            orders, drivers = await self._load(db, online)
+            if orders is None:
+                return 0
+            order_index = {order_id: i for i, order_id in enumerate(orders.ids.tolist())}
+            driver_rows: Dict[int, List[int]] = {}
+            for i, driver_id in enumerate(drivers.ids.tolist()):
+                driver_rows.setdefault(driver_id, []).append(i)
+            excluded = {
+                order_index[order_id]: {i for d in driver_ids for i in driver_rows.get(d, ())}
+                for order_id, driver_ids in self.declined.items()
+                if order_id in order_index
+            }
+            started = time.perf_counter()
+            assignments = await asyncio.to_thread(
+                match, orders, drivers, excluded, settings.DISPATCH_CANDIDATES
+            )
+            self.last_match_ms = (time.perf_counter() - started) * 1000
+
+            offered = {int(orders.ids[i]): int(drivers.ids[j]) for i, j, _ in assignments}
+            if not offered:
+                return 0
+            rows = await db.scalars(select(models.Order).where(models.Order.id.in_(list(offered))))
+            expires_at = now + timedelta(seconds=settings.OFFER_TIMEOUT_SECONDS)
+            for order in rows:
+                driver_id = offered[order.id]
+                # Пока шёл расчёт, заказ могли принять или водителю уже предложили другой
+                if order.id in self.offers or driver_id in self._offered_to:
+                    continue
+                self.offers[order.id] = Offer(order.id, driver_id, expires_at)
+                self._offered_to[driver_id] = order.id
+                self.offers_made += 1
+                bus.publish(
+                    OrderEventType.OFFERED, order,
+                    driver_id=driver_id, offer_expires_at=expires_at.isoformat()
+                )
+        return len(offered)
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка диспетчера")
+            await asyncio.sleep(settings.DISPATCH_INTERVAL_SECONDS)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "online_drivers": len(self.presence.online()),
+            "open_offers": len(self.offers),
+            "ticks": self.ticks,
+            "offers_made": self.offers_made,
+            "offers_expired": self.offers_expired,
+            "last_match_ms": round(self.last_match_ms, 3),
+        }
+
+presence = DriverPresence(ttl=settings.DRIVER_PRESENCE_TTL_SECONDS)
+dispatcher = Dispatcher(presence)
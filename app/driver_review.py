@@ -0,0 +1,68 @@
+# app/driver_review.py
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import audit, models
+
+DriverProfile = models.DriverProfile
+DriverDocument = models.DriverDocument
+DocumentStatus = models.DocumentStatus
+
+# Итог по водителю, которого нет среди профилей
+NOT_FOUND = "not_found"
+
+async def review(db: AsyncSession, admin_id: int, driver_ids: List[int], approve: bool,
+                 reason: Optional[str] = None) -> Dict[int, dict]:
+    """Одобрить или отклонить водителей (по user_id) двумя операторами на всю пачку.
+
+    UPDATE профилей и UPDATE их активных документов; число операторов не
+    зависит ни от размера пачки, ни от накопленных версий документов.
+    Возвращает {driver_id: {"status", "documents"}} в порядке driver_ids.
+    Коммит и запись в журнал (actions()) - за вызывающим.
+    """
+    status = DocumentStatus.APPROVED if approve else DocumentStatus.REJECTED
+    driver_ids = list(dict.fromkeys(driver_ids))
+
+    profiles = dict((await db.execute(
+        update(DriverProfile)
+        .where(DriverProfile.user_id.in_(driver_ids))
+        .values(documents_status=status, is_verified=approve)
+        .returning(DriverProfile.user_id, DriverProfile.id)
+    )).all())
+
+    documents = Counter()
+    if profiles:
+        values = {"status": status, "reviewed_by": admin_id, "reviewed_at": datetime.now()}
+        if not approve:
+            values["rejection_reason"] = reason
+        documents.update(await db.scalars(
+            update(DriverDocument)
+            .where(
+                DriverDocument.driver_profile_id.in_(list(profiles.values())),
+                models.document_is_active()
+            )
+            .values(**values)
+            .returning(DriverDocument.driver_profile_id)
+        ))
+
+    return {
+        driver_id: {"status": status, "documents": documents[profiles[driver_id]]}
+        if driver_id in profiles else {"status": NOT_FOUND, "documents": 0}
+        for driver_id in driver_ids
+    }
+
+def actions(admin_id: int, results: Dict[int, dict], approve: bool, reason: Optional[str] = None) -> List[dict]:
+    """Записи журнала действий для проверенных водителей"""
+    return [
+        audit.action(
+            admin_id,
+            "approve_driver" if approve else "reject_driver",
+            driver_id,
+            "Driver approved" if approve else f"Driver rejected: {reason}"
+        )
+        for driver_id, result in results.items() if result["status"] != NOT_FOUND
+    ]
@@ -0,0 +1,146 @@
+# app/events.py
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, List, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from app import models
+from app.config import settings
+
+class OrderEventType:
+    CREATED = "order_created"
+    ACCEPTED = "order_accepted"
+    COMPLETED = "order_completed"
+    CANCELLED = "order_cancelled"
+    # Диспетчер предложил заказ конкретному водителю (app/dispatch.py)
+    OFFERED = "order_offered"
+
+# Служебное событие: подписчик не успевал читать и был отключён
+RESYNC = "resync"
+
+@dataclass
+class OrderEvent:
+    id: int
+    type: str
+    order: dict
+    client_id: Optional[int]
+    driver_id: Optional[int]
+    at: datetime = field(default_factory=datetime.utcnow)
+    data: dict = field(default_factory=dict)
+
+def order_payload(order: models.Order) -> dict:
+    """Публичная часть заказа (поля ленты доступных заказов)"""
+    return jsonable_encoder({
+        "id": order.id,
+        "pickup_location": order.pickup_location,
+        "dropoff_location": order.dropoff_location,
+        "pickup_lat": order.pickup_lat,
+        "pickup_lng": order.pickup_lng,
+        "dropoff_lat": order.dropoff_lat,
+        "dropoff_lng": order.dropoff_lng,
+        "pickup_time": order.pickup_time,
+        "passengers_count": order.passengers_count,
+        "luggage_count": order.luggage_count,
+        "client_price": order.client_price,
+        "final_price": order.final_price,
+        "status": order.status,
+        "driver_id": order.driver_id,
+        "version": order.version,
+        "created_at": order.created_at
+    })
+
+class Subscription:
+    """Очередь событий одного подключения с фильтром"""
+
+    def __init__(self, predicate: Callable[[OrderEvent], bool], max_queue: int):
+        self.predicate = predicate
+        self.queue: "asyncio.Queue[OrderEvent]" = asyncio.Queue(maxsize=max_queue)
+        self.lagging = False
+
+    async def get(self, timeout: float) -> Optional[OrderEvent]:
+        """Следующее событие или None по таймауту (для heartbeat)"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class EventBus:
+    """Внутрипроцессная pub/sub шина событий заказов.
+
+    publish() никогда не блокирует: у каждого подписчика ограниченная
+    очередь, и медленный подписчик при переполнении получает RESYNC и
+    отключается. Клиент перечитывает данные через REST и переподключается.
+    """
+
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self._subscribers: Set[Subscription] = set()
+        self._listeners: List[Callable[[OrderEvent], None]] = []
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+        self.dropped_subscribers = 0
+
+    def subscribe(self, predicate: Callable[[OrderEvent], bool]) -> Subscription:
+        subscription = Subscription(predicate, self.max_queue)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def add_listener(self, listener: Callable[[OrderEvent], None]):
+        """Синхронный обработчик внутри процесса (индексы в памяти)"""
+        self._listeners.append(listener)
+
+    def publish(self, event_type: str, order: models.Order,
+                driver_id: Optional[int] = None, **data) -> OrderEvent:
+        """driver_id - адресат, если заказ ещё не назначен (предложения)"""
+        event = OrderEvent(
+            id=next(self._ids),
+            type=event_type,
+            order=order_payload(order),
+            client_id=order.client_id,
+            driver_id=driver_id if driver_id is not None else order.driver_id,
+            data=data,
+        )
+        self.published += 1
+        for listener in self._listeners:
+            listener(event)
+        for subscription in list(self._subscribers):
+            if not subscription.predicate(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self._drop(subscription)
+        return event
+
+    def _drop(self, subscription: Subscription):
+        """Отключить подписчика, освободив место под RESYNC"""
+        self._subscribers.discard(subscription)
+        subscription.lagging = True
+        self.dropped_subscribers += 1
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(
+            OrderEvent(id=next(self._ids), type=RESYNC, order={}, client_id=None, driver_id=None)
+        )
+
+    def close_all(self):
+        for subscription in list(self._subscribers):
+            self._drop(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped_subscribers,
+        }
+
+bus = EventBus(max_queue=settings.EVENT_QUEUE_SIZE)
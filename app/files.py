@@ -0,0 +1,149 @@
+# app/files.py
+import mimetypes
+import os
+import stat
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional, Tuple
+
+import aiofiles
+from fastapi import Request
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import Response
+
+CHUNK_SIZE = 64 * 1024
+# Адрес по хешу содержимого не меняется: браузер может не перепроверять
+IMMUTABLE = "private, max-age=31536000, immutable"
+REVALIDATE = "private, no-cache"
+
+def strong_etag(path: Path, stat_result: os.stat_result) -> str:
+    """Сильный ETag: меняется при любой перезаписи файла"""
+    return f'"{path.stem[:16]}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) включительно для одного диапазона bytes=...
+
+    None - заголовка нет или он не поддерживается (несколько диапазонов):
+    тогда отдаётся весь файл. ValueError - диапазон вне файла (416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    if not (start or end) or (start and not start.isdigit()) or (end and not end.isdigit()):
+        return None
+    if not start:
+        # bytes=-N: последние N байт
+        if int(end) == 0:
+            raise ValueError("Range not satisfiable")
+        return max(0, size - int(end)), size - 1
+    first = int(start)
+    last = int(end) if end else size - 1
+    if first >= size or last < first:
+        raise ValueError("Range not satisfiable")
+    return first, min(last, size - 1)
+
+class FileRangeResponse(Response):
+    """Файл целиком или одним диапазоном.
+
+    Если сервер поддерживает ASGI-расширение http.response.zerocopysend,
+    тело отдаётся через sendfile без копирования в процесс; иначе -
+    чтением по 64 КБ.
+    """
+
+    def __init__(self, path: Path, stat_result: os.stat_result, headers: dict,
+                 byte_range: Optional[Tuple[int, int]] = None, send_body: bool = True):
+        super().__init__(
+            status_code=206 if byte_range else 200,
+            headers=headers,
+            media_type=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+        )
+        size = stat_result.st_size
+        self.path = path
+        self.offset, last = byte_range or (0, size - 1)
+        self.count = last - self.offset + 1
+        self.send_body = send_body
+        self.headers["content-length"] = str(self.count)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers.setdefault("last-modified", formatdate(stat_result.st_mtime, usegmt=True))
+        if byte_range:
+            self.headers["content-range"] = f"bytes {self.offset}-{last}/{size}"
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if not self.send_body or self.count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in (scope.get("extensions") or {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+            return
+
+        async with aiofiles.open(self.path, "rb") as file:
+            await file.seek(self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # Файл укоротился во время отдачи
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+def serve_file(request: Request, path: Path, cache_control: str) -> Response:
+    """Ответ на GET/HEAD с ETag, 304 и Range"""
+    stat_result = path.stat()
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise FileNotFoundError(path)
+    etag = strong_etag(path, stat_result)
+    headers = {"etag": etag, "cache-control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), stat_result.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{stat_result.st_size}"})
+    return FileRangeResponse(path, stat_result, headers, byte_range, send_body=request.method != "HEAD")
+
+class AssetStaticFiles(StaticFiles):
+    """StaticFiles для ресурсов страниц: каталоги из hidden не отдаются,
+    ответы перепроверяются по ETag (304) вместо повторной загрузки.
+    """
+
+    def __init__(self, *, hidden=(), **kwargs):
+        super().__init__(**kwargs)
+        self.hidden = [os.path.realpath(path) + os.sep for path in hidden]
+
+    def lookup_path(self, path: str):
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is not None and any(os.path.realpath(full_path).startswith(hidden) for hidden in self.hidden):
+            return "", None
+        return full_path, stat_result
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("cache-control", "public, no-cache")
+        return response
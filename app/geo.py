@@ -0,0 +1,351 @@
+# app/geo.py
+import asyncio
+import logging
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Row, and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, schemas
+from app.config import settings
+from app.events import OrderEventType
+
+logger = logging.getLogger(__name__)
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_KM = 6371.0088
+
+# Точность геохеша в колонке orders.pickup_geohash (~5 м)
+STORED_PRECISION = 9
+# Префиксы, по которым раскладывается индекс в памяти: от ~1250 км до ~0.6 км
+MIN_PRECISION = 2
+MAX_PRECISION = 6
+# Предел ячеек в покрытии круга: каждая - отдельный диапазон по индексу
+MAX_COVERING_CELLS = 64
+
+def encode(lat: float, lng: float, precision: int = STORED_PRECISION) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+def bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """(lat_min, lat_max, lng_min, lng_max) ячейки"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(lat_min, lat_max, lng_min, lng_max) вокруг круга радиуса radius_km.
+
+    lng_min > lng_max - прямоугольник пересекает 180-й меридиан.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angle)
+    lat_min, lat_max = lat - dlat, lat + dlat
+    # Круг, задевающий полюс, занимает все долготы
+    if lat_min <= -90 or lat_max >= 90 or math.sin(angle) >= math.cos(math.radians(lat)):
+        return max(lat_min, -90.0), min(lat_max, 90.0), -180.0, 180.0
+    dlng = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(lat))))
+    lng_min = (lng - dlng + 180) % 360 - 180
+    lng_max = (lng + dlng + 180) % 360 - 180
+    return lat_min, lat_max, lng_min, lng_max
+
+def _grid(box: Tuple[float, float, float, float], precision: int) -> Tuple[range, range, float, float]:
+    """Строки и столбцы сетки точности precision, задевающие прямоугольник, и размер ячейки в градусах"""
+    lat_min, lat_max, lng_min, lng_max = box
+    lat_bits = precision * 5 // 2
+    cell_lat, cell_lng = 180.0 / 2 ** lat_bits, 360.0 / 2 ** (precision * 5 - lat_bits)
+    columns_total = 2 ** (precision * 5 - lat_bits)
+    rows = range(
+        math.floor((lat_min + 90) / cell_lat),
+        min(math.floor((lat_max + 90) / cell_lat), 2 ** lat_bits - 1) + 1
+    )
+    first_col = math.floor((lng_min + 180) / cell_lng)
+    last_col = math.floor((lng_max + 180) / cell_lng)
+    if lng_min > lng_max:
+        last_col += columns_total
+    columns = range(first_col, min(last_col, first_col + columns_total - 1) + 1)
+    return rows, columns, cell_lat, cell_lng
+
+def covering_cells(lat: float, lng: float, radius_km: float) -> List[str]:
+    """Ячейки одной точности, покрывающие круг радиуса radius_km.
+
+    Берётся самая мелкая точность (до MAX_PRECISION), при которой
+    прямоугольник вокруг круга покрывают не больше MAX_COVERING_CELLS
+    ячеек: для 10 км это ячейки ~5 км, а не блок 3x3 по ~40 км.
+    """
+    box = bounding_box(lat, lng, radius_km)
+    for precision in range(MAX_PRECISION, MIN_PRECISION - 1, -1):
+        rows, columns, cell_lat, cell_lng = _grid(box, precision)
+        if len(rows) * len(columns) <= MAX_COVERING_CELLS or precision == MIN_PRECISION:
+            break
+    columns_total = round(360.0 / cell_lng)
+    return [
+        encode(-90 + (row + 0.5) * cell_lat, -180 + (col % columns_total + 0.5) * cell_lng, precision)
+        for row in rows
+        for col in columns
+    ]
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def order_coordinates(pickup_lat: Optional[float] = None, pickup_lng: Optional[float] = None,
+                      dropoff_lat: Optional[float] = None, dropoff_lng: Optional[float] = None) -> dict:
+    """Колонки координат заказа вместе с геохешем точки посадки"""
+    for lat, lng in ((pickup_lat, pickup_lng), (dropoff_lat, dropoff_lng)):
+        if (lat is None) != (lng is None):
+            raise HTTPException(status_code=400, detail="Both latitude and longitude are required")
+        if lat is not None and not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise HTTPException(status_code=400, detail="Invalid coordinates")
+    return {
+        "pickup_lat": pickup_lat,
+        "pickup_lng": pickup_lng,
+        "dropoff_lat": dropoff_lat,
+        "dropoff_lng": dropoff_lng,
+        "pickup_geohash": encode(pickup_lat, pickup_lng) if pickup_lat is not None else None,
+    }
+
+def geohash_ranges(cells: Iterable[str]) -> List[Tuple[str, str]]:
+    """[(от, до)) по pickup_geohash; соседние по порядку ячейки сливаются в один диапазон"""
+    ranges = []
+    for cell in sorted(set(cells)):
+        if ranges:
+            low, last = ranges[-1]
+            if len(last) == len(cell) and last[:-1] == cell[:-1] \
+                    and BASE32.index(cell[-1]) == BASE32.index(last[-1]) + 1:
+                ranges[-1] = (low, cell)
+                continue
+        ranges.append((cell, cell))
+    # "{" идёт сразу за "z": верхняя граница покрывает все уточнения последней ячейки
+    return [(low, last + "{") for low, last in ranges]
+
+def geohash_condition(cells: Iterable[str]):
+    """Диапазоны по индексу pickup_geohash вместо LIKE 'prefix%'"""
+    return or_(*[
+        and_(models.Order.pickup_geohash >= low, models.Order.pickup_geohash < high)
+        for low, high in geohash_ranges(cells)
+    ])
+
+def bounding_box_condition(box: Tuple[float, float, float, float]):
+    """pickup_lat/pickup_lng в прямоугольнике bounding_box"""
+    lat_min, lat_max, lng_min, lng_max = box
+    lng_condition = (
+        models.Order.pickup_lng.between(lng_min, lng_max) if lng_min <= lng_max
+        else or_(models.Order.pickup_lng >= lng_min, models.Order.pickup_lng <= lng_max)
+    )
+    return and_(models.Order.pickup_lat.between(lat_min, lat_max), lng_condition)
+
+class PendingOrderIndex:
+    """Геоиндекс ожидающих заказов в памяти процесса - кеш поверх orders.pickup_geohash.
+
+    Каждый заказ лежит в ячейках всех точностей MIN..MAX_PRECISION,
+    поэтому поиск - это объединение нескольких множеств без обхода
+    всех заказов. Заполняется из orders.pickup_geohash, обновляется
+    событиями шины (app/events.py) и раз в reconcile_interval
+    перезагружается из базы.
+
+    Шина событий у каждого процесса своя, поэтому индекс верен только
+    при одном воркере: включается GEO_INDEX_IN_MEMORY, по умолчанию
+    источник - запрос по pickup_geohash.
+    """
+
+    def __init__(self, reconcile_interval: float):
+        self.reconcile_interval = reconcile_interval
+        self._cells: Dict[str, Set[int]] = {}
+        self._orders: Dict[int, Tuple[float, float, Optional[datetime], str]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+
+    def __len__(self):
+        return len(self._orders)
+
+    def add(self, order_id: int, lat: float, lng: float, pickup_time: Optional[datetime]):
+        self.remove(order_id)
+        geohash = encode(lat, lng, MAX_PRECISION)
+        self._orders[order_id] = (lat, lng, pickup_time, geohash)
+        for precision in range(MIN_PRECISION, MAX_PRECISION + 1):
+            self._cells.setdefault(geohash[:precision], set()).add(order_id)
+
+    def remove(self, order_id: int):
+        entry = self._orders.pop(order_id, None)
+        if entry is None:
+            return
+        geohash = entry[3]
+        for precision in range(MIN_PRECISION, MAX_PRECISION + 1):
+            ids = self._cells.get(geohash[:precision])
+            if ids is not None:
+                ids.discard(order_id)
+                if not ids:
+                    del self._cells[geohash[:precision]]
+
+    def nearby(self, lat: float, lng: float, radius_km: float,
+               now: Optional[datetime] = None) -> List[Tuple[float, int]]:
+        """[(расстояние, id)] в радиусе, по возрастанию расстояния"""
+        now = now or datetime.now()
+        found = []
+        expired = []
+        for cell in covering_cells(lat, lng, radius_km):
+            for order_id in self._cells.get(cell, ()):
+                order_lat, order_lng, pickup_time, _ = self._orders[order_id]
+                if pickup_time is not None and pickup_time < now:
+                    expired.append(order_id)
+                    continue
+                distance = haversine_km(lat, lng, order_lat, order_lng)
+                if distance <= radius_km:
+                    found.append((distance, order_id))
+        for order_id in expired:
+            self.remove(order_id)
+        found.sort()
+        return found
+
+    async def load(self, db: AsyncSession):
+        rows = (await db.execute(
+            select(
+                models.Order.id, models.Order.pickup_lat, models.Order.pickup_lng, models.Order.pickup_time
+            ).where(
+                models.order_is_pending(),
+                models.Order.pickup_geohash.is_not(None)
+            )
+        )).all()
+        # Замена без await между очисткой и заполнением: поиск не видит пустой индекс
+        self._cells.clear()
+        self._orders.clear()
+        for order_id, lat, lng, pickup_time in rows:
+            self.add(order_id, lat, lng, pickup_time)
+        self.ready = True
+
+    async def run(self):
+        """Сверка с базой: правит расхождения, которые события не донесли"""
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                async with models.AsyncSessionLocal() as db:
+                    await self.load(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка сверки геоиндекса заказов")
+
+    async def start(self):
+        if self._task is not None:
+            return
+        async with models.AsyncSessionLocal() as db:
+            await self.load(db)
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.ready = False
+
+    def on_event(self, event):
+        """Слушатель шины событий заказов"""
+        order = event.order
+        if event.type == OrderEventType.CREATED:
+            if order.get("pickup_lat") is not None and order.get("pickup_lng") is not None:
+                pickup_time = order.get("pickup_time")
+                self.add(
+                    order["id"], order["pickup_lat"], order["pickup_lng"],
+                    datetime.fromisoformat(pickup_time) if pickup_time else None
+                )
+        elif event.type in (OrderEventType.ACCEPTED, OrderEventType.CANCELLED, OrderEventType.COMPLETED):
+            self.remove(order["id"])
+
+pending_index = PendingOrderIndex(reconcile_interval=settings.GEO_INDEX_RECONCILE_SECONDS)
+
+async def nearby_pending_orders(db: AsyncSession, lat: float, lng: float, radius_km: float,
+                                limit: int) -> List[Tuple[float, Row]]:
+    """Ближайшие ожидающие заказы в радиусе, по возрастанию расстояния.
+
+    Строки содержат только столбцы AvailableOrderResponse. Кандидаты
+    берутся запросом по индексу pickup_geohash, отсечённым
+    прямоугольником вокруг круга; индекс в памяти используется вместо
+    него, только если включён и загружен. Статус и время
+    перепроверяются в базе.
+    """
+    now = datetime.now()
+    pending = [
+        models.order_is_pending(),
+        models.Order.pickup_time >= now
+    ]
+    order_columns = schemas.columns(models.Order, schemas.AvailableOrderResponse)
+    if not pending_index.ready:
+        box = bounding_box(lat, lng, radius_km)
+        query = select(*order_columns).where(
+            *pending,
+            geohash_condition(covering_cells(lat, lng, radius_km)),
+            bounding_box_condition(box)
+        )
+        if box[2] <= box[3]:
+            # Ближайших отбирает сама база по равнопромежуточной проекции: в пределах
+            # 100 км она расходится с гаверсинусом на доли процента; точное расстояние - ниже
+            scale = math.cos(math.radians(lat))
+            dlat = models.Order.pickup_lat - lat
+            dlng = (models.Order.pickup_lng - lng) * scale
+            query = query.order_by(dlat * dlat + dlng * dlng, models.Order.id).limit(limit)
+        found = []
+        for order in await db.execute(query):
+            distance = haversine_km(lat, lng, order.pickup_lat, order.pickup_lng)
+            if distance <= radius_km:
+                found.append((distance, order.id, order))
+        found.sort(key=lambda item: item[:2])
+        return [(distance, order) for distance, _, order in found[:limit]]
+
+    candidates = pending_index.nearby(lat, lng, radius_km, now)
+    result = []
+    # Индекс может отставать от базы, поэтому добираем пачками
+    for offset in range(0, len(candidates), limit):
+        chunk = candidates[offset:offset + limit]
+        orders = {
+            order.id: order
+            for order in await db.execute(
+                select(*order_columns).where(
+                    models.Order.id.in_([order_id for _, order_id in chunk]),
+                    *pending
+                )
+            )
+        }
+        for distance, order_id in chunk:
+            if order_id in orders:
+                result.append((distance, orders[order_id]))
+            else:
+                pending_index.remove(order_id)
+        if len(result) >= limit:
+            break
+    return result[:limit]
@@ -0,0 +1,142 @@
+# app/hashing.py
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Настройка для bcrypt
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=12
+)
+
+def hash_password(password) -> str:
+    """Хеширование пароля (синхронно, выполняется в воркере)"""
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    if len(password) > 72:
+        password = password[:72]
+    return pwd_context.hash(password)
+
+def check_password(plain_password, hashed_password) -> bool:
+    """Проверка пароля (синхронно, выполняется в воркере)"""
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except Exception:
+        logger.exception("Ошибка проверки пароля")
+        return False
+
+class PasswordHasher:
+    """Пул процессов для bcrypt с ограниченной очередью.
+
+    bcrypt занимает ~250 мс CPU, поэтому хеширование выносится из
+    event loop в отдельные процессы. Одновременно принимается не более
+    workers + max_queue задач; остальные ждут место не дольше max_wait
+    секунд и получают 503.
+    """
+
+    def __init__(self, workers: int, max_queue: int, max_wait: float, samples: int = 1000):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._waiting = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latencies = deque(maxlen=samples)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers + self.max_queue)
+        return self._slots
+
+    async def _run(self, operation: str, fn, *args):
+        slots = self._get_slots()
+        self._waiting += 1
+        waiting_since = time.perf_counter()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            metrics.password_hashing_rejected.inc(operation)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        started = time.perf_counter()
+        metrics.password_hashing_wait.observe(started - waiting_since, operation)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._latencies.append(elapsed)
+            metrics.password_hashing.observe(elapsed, operation)
+            self._completed += 1
+            self._in_flight -= 1
+            slots.release()
+
+    async def hash(self, password) -> str:
+        return await self._run("hash", hash_password, password)
+
+    async def verify(self, plain_password, hashed_password) -> bool:
+        return await self._run("verify", check_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": max(0, self._in_flight - self.workers) + self._waiting,
+            "waiting_for_slot": self._waiting,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "latency_ms": {
+                "p50": round(percentile(0.50) * 1000, 2),
+                "p95": round(percentile(0.95) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            },
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._slots = None
+
+hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+    max_queue=settings.PASSWORD_HASH_QUEUE_SIZE,
+    max_wait=settings.PASSWORD_HASH_MAX_WAIT_SECONDS,
+)
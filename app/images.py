@@ -0,0 +1,210 @@
+# app/images.py
+import asyncio
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional
+
+from PIL import Image, ImageOps
+from sqlalchemy import select, update
+
+from app import models
+from app.config import settings
+from app.storage import blob_key, storage
+from app.uploads import file_sha256
+
+logger = logging.getLogger(__name__)
+
+# Поля результата обработки; копируются на новые строки с тем же содержимым
+RENDITION_FIELDS = (
+    "width", "height", "preview_path", "preview_width", "preview_height",
+    "thumbnail_path", "thumbnail_width", "thumbnail_height", "processed_at",
+)
+# Временные каталоги обработки; .staging не отдаётся через /uploads
+WORK_DIR = Path(settings.UPLOAD_DIR) / ".staging"
+
+def render(source: str, workdir: str, preview_size: int, thumbnail_size: int, quality: int) -> dict:
+    """Снять EXIF и сделать WebP-превью и миниатюру (выполняется в воркере).
+
+    Исходный блоб не меняется: все файлы пишутся в workdir. Если в
+    оригинале были метаданные, копия без них ложится туда как
+    <sha256><расширение>, и content_hash - её хеш (иначе None).
+    Renditions называются по хешу итогового оригинала:
+    <hash>.preview.webp и <hash>.thumb.webp.
+    """
+    path = Path(source)
+    output = Path(workdir)
+    with Image.open(path) as original:
+        original.load()
+        image_format = original.format
+        has_metadata = bool(original.getexif()) or "exif" in original.info
+        # Поворот из EXIF применяется к пикселям, иначе без метаданных фото ляжет набок
+        image = ImageOps.exif_transpose(original)
+
+    stem, content_hash = path.stem, None
+    if has_metadata:
+        # В EXIF телефонных фото - координаты и модель устройства
+        temp_path = output / f".{path.name}.strip"
+        image.save(temp_path, format=image_format, quality=95)
+        stem = content_hash = file_sha256(temp_path)
+        os.replace(temp_path, output / f"{content_hash}{path.suffix}")
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+    result = {"width": image.width, "height": image.height, "content_hash": content_hash}
+    # Миниатюра делается из превью, а не из полного кадра
+    for name, suffix, size in (("preview", "preview", preview_size), ("thumbnail", "thumb", thumbnail_size)):
+        image = image.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+        target = output / f"{stem}.{suffix}.webp"
+        temp_path = target.with_name(f".{target.name}.part")
+        image.save(temp_path, "WEBP", quality=quality, method=4)
+        os.replace(temp_path, target)
+        result[f"{name}_path"] = target.name
+        result[f"{name}_width"] = image.width
+        result[f"{name}_height"] = image.height
+    return result
+
+class ImageProcessor:
+    """Фоновая обработка загруженных документов в пуле процессов.
+
+    upload_documents только ставит id документов в очередь; декодирование
+    и сжатие идут в отдельных процессах, результат записывается в
+    driver_documents. Документы без processed_at (например, загруженные
+    перед перезапуском) подбираются при старте.
+    """
+
+    def __init__(self, workers: int, preview_size: int, thumbnail_size: int, quality: int):
+        self.workers = workers
+        self.preview_size = preview_size
+        self.thumbnail_size = thumbnail_size
+        self.quality = quality
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.processed = 0
+        self.failed = 0
+
+    def submit(self, document_ids: Iterable[int]):
+        # До старта очередь не создана: такие документы подберёт start()
+        if self._queue is None:
+            return
+        for document_id in document_ids:
+            self._queue.put_nowait(document_id)
+
+    async def _process(self, document_id: int):
+        async with models.AsyncSessionLocal() as db:
+            file_path = await db.scalar(
+                select(models.DriverDocument.file_path).where(
+                    models.DriverDocument.id == document_id,
+                    models.DriverDocument.processed_at.is_(None)
+                )
+            )
+        if file_path is None:
+            return
+
+        # Строки с одинаковым содержимым делят блоб: он обрабатывается один раз
+        task = self._in_flight.get(file_path)
+        if task is None:
+            task = asyncio.ensure_future(self._render_blob(file_path))
+            self._in_flight[file_path] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(file_path, None))
+        result = await task
+
+        async with models.AsyncSessionLocal() as db:
+            await db.execute(
+                update(models.DriverDocument)
+                .where(
+                    models.DriverDocument.file_path == file_path,
+                    models.DriverDocument.processed_at.is_(None)
+                )
+                .values(**result, processed_at=datetime.utcnow())
+            )
+            await db.commit()
+
+    async def _render_blob(self, file_path: str) -> dict:
+        # Рабочий каталог внутри UPLOAD_DIR: LocalStorage.put переносит файлы через os.replace
+        await asyncio.to_thread(WORK_DIR.mkdir, parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=WORK_DIR) as workdir:
+            source = storage.local_path(file_path)
+            if source is None:
+                # Удалённое хранилище: оригинал скачивается во временный каталог
+                source = Path(workdir) / f".source{PurePosixPath(file_path).suffix}"
+                await storage.fetch(file_path, source)
+            result = await self._render(source, workdir)
+
+            # Блобы неизменяемы: оригинал без EXIF - это другой блоб под ключом своего хеша,
+            # строки переводятся на него, а старый блоб без ссылок уберёт gc_documents.py
+            blob = PurePosixPath(file_path)
+            if result["content_hash"] is not None:
+                blob = PurePosixPath(blob_key(result["content_hash"], blob.suffix))
+                await storage.put(str(blob), Path(workdir) / blob.name)
+                result["file_path"] = str(blob)
+            else:
+                del result["content_hash"]
+            for field in ("preview_path", "thumbnail_path"):
+                name = result[field]
+                result[field] = str(blob.with_name(name))
+                await storage.put(result[field], Path(workdir) / name)
+        return result
+
+    async def _render(self, source: Path, workdir: str) -> dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, render, str(source), workdir, self.preview_size, self.thumbnail_size, self.quality
+        )
+
+    async def _worker(self):
+        while True:
+            document_id = await self._queue.get()
+            try:
+                await self._process(document_id)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failed += 1
+                logger.exception("Ошибка обработки документа %s", document_id)
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._queue = asyncio.Queue()
+        async with models.AsyncSessionLocal() as db:
+            self.submit(await db.scalars(
+                select(models.DriverDocument.id).where(models.DriverDocument.processed_at.is_(None))
+            ))
+        # По одному потребителю на процесс пула, чтобы пул был занят целиком
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": bool(self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+image_processor = ImageProcessor(
+    workers=settings.IMAGE_WORKERS or os.cpu_count() or 1,
+    preview_size=settings.IMAGE_PREVIEW_SIZE,
+    thumbnail_size=settings.IMAGE_THUMBNAIL_SIZE,
+    quality=settings.IMAGE_WEBP_QUALITY,
+)
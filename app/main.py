@@ -1,19 +1,34 @@
 ﻿# app/main.py
-from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import select
+import logging
 import os
 
 from app import models
-from app import auth
-from app.routers import auth as auth_router, clients, drivers, admin, orders
+from app import auth, metrics, rollups
+from app.events import bus
+from app.geo import pending_index
+from app.dispatch import dispatcher
+from app.audit import audit_log
+from app.compression import ApiGZipMiddleware
+from app.files import AssetStaticFiles
+from app.hashing import hasher
+from app.images import image_processor
+from app.pages import WEB_PAGES, page_cache
+from app.upload_sessions import upload_sessions
+from app.uploads import MULTIPART_OVERHEAD, MaxBodySizeMiddleware
+from app.routers import auth as auth_router, clients, drivers, admin, orders, events, files
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Create upload directory if it doesn't exist
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
-app = FastAPI(title="Transfer Service API", version="1.0.0")
+# JSON через orjson; ответы проходят через объявленные response_model
+app = FastAPI(title="Transfer Service API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -24,9 +39,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Static files and templates
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
+# Сжатие JSON API; HTML-страницы сжаты заранее, SSE не сжимается
+app.add_middleware(
+    ApiGZipMiddleware,
+    minimum_size=settings.GZIP_MINIMUM_SIZE,
+    exclude=["/api/events/"],
+)
+
+# Загрузка документов обрывается, как только тело превысило лимит, а не после буферизации
+app.add_middleware(
+    MaxBodySizeMiddleware,
+    limits={
+        "/api/drivers/documents/upload": drivers.DOCUMENT_UPLOAD_FILES * settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD,
+        # Кусок возобновляемой загрузки - не больше одного файла
+        "/api/drivers/documents/uploads/": settings.MAX_UPLOAD_SIZE,
+    },
+)
+
+# Замеры запросов - снаружи остальных middleware, чтобы учитывать и их время
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(models.async_engine.sync_engine)
+    metrics.register_pool(lambda: models.async_engine.pool)
+
+# Static files
+# Загрузки водителей отдаются только через /uploads с проверкой доступа
+app.mount("/static", AssetStaticFiles(directory="app/static", hidden=[settings.UPLOAD_DIR]), name="static")
 
 # Include routers
 app.include_router(auth_router.router, prefix="/api/auth", tags=["authentication"])
@@ -34,65 +72,115 @@ app.include_router(clients.router, prefix="/api/clients", tags=["clients"])
 app.include_router(drivers.router, prefix="/api/drivers", tags=["drivers"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 app.include_router(orders.router, prefix="/api/orders", tags=["orders"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+app.include_router(files.router, prefix="/uploads", tags=["files"])
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
-# Web routes
+# Web routes: HTML-оболочки из памяти (app/pages.py)
 @app.get("/")
 async def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return page_cache.response(request, "index.html")
 
 @app.get("/login")
 async def login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return page_cache.response(request, "login.html")
 
 @app.get("/register")
 async def register_page(request: Request):
-    return templates.TemplateResponse("register.html", {"request": request})
+    return page_cache.response(request, "register.html")
 
 @app.get("/client/dashboard")
 async def client_dashboard(request: Request):
-    return templates.TemplateResponse("client/dashboard.html", {"request": request})
+    return page_cache.response(request, "client/dashboard.html")
 
 @app.get("/driver/dashboard")
 async def driver_dashboard(request: Request):
-    return templates.TemplateResponse("driver/dashboard.html", {"request": request})
+    return page_cache.response(request, "driver/dashboard.html")
 
 @app.get("/driver/upload-documents")
 async def driver_upload_documents(request: Request):
-    return templates.TemplateResponse("driver/upload_documents.html", {"request": request})
+    return page_cache.response(request, "driver/upload_documents.html")
 
 @app.get("/admin/dashboard")
 async def admin_dashboard(request: Request):
-    return templates.TemplateResponse("admin/dashboard.html", {"request": request})
+    return page_cache.response(request, "admin/dashboard.html")
+
+# Геоиндекс ожидающих заказов следит за событиями шины
+if settings.GEO_INDEX_IN_MEMORY:
+    bus.add_listener(pending_index.on_event)
+bus.add_listener(dispatcher.on_event)
+
+@app.on_event("startup")
+async def start_geo_index():
+    if settings.GEO_INDEX_IN_MEMORY:
+        await pending_index.start()
+
+@app.on_event("startup")
+async def warm_pages():
+    page_cache.warm(WEB_PAGES)
+
+@app.on_event("startup")
+async def start_image_processor():
+    await image_processor.start()
+
+@app.on_event("startup")
+async def start_audit_log():
+    await audit_log.start()
+
+@app.on_event("startup")
+async def start_upload_session_gc():
+    upload_sessions.start()
+
+@app.on_event("startup")
+async def start_dispatcher():
+    if settings.DISPATCH_ENABLED:
+        dispatcher.start()
 
 # Create default admin user on startup
 @app.on_event("startup")
-def create_admin_user():
-    print("Проверка наличия администратора...")
-    db = next(auth.get_db())
-    try:
-        admin_email = "admin@transferservice.com"
-        admin = db.query(models.User).filter(models.User.email == admin_email).first()
-        if not admin:
-            print("Администратор не найден. Создаю нового...")
-            from app.auth import get_password_hash
-            admin = models.User(
-                email=admin_email,
-                hashed_password=get_password_hash("admin123"),
-                full_name="System Administrator",
-                role="admin",
-                is_active=True
+async def create_admin_user():
+    logger.info("Проверка наличия администратора")
+    async with models.AsyncSessionLocal() as db:
+        try:
+            admin_email = "admin@transferservice.com"
+            admin = await db.scalar(
+                select(models.User).where(models.User.email == admin_email)
             )
-            db.add(admin)
-            db.commit()
-            print("✓ Администратор успешно создан!")
-            print("  Email: admin@transferservice.com")
-            print("  Password: admin123")
-        else:
-            print("✓ Администратор уже существует")
-    except Exception as e:
-        print(f"✗ Ошибка при создании администратора: {e}")
-    finally:
-        db.close()
+            if not admin:
+                logger.info("Администратор не найден, создаю нового")
+                admin = models.User(
+                    email=admin_email,
+                    hashed_password=await hasher.hash("admin123"),
+                    full_name="System Administrator",
+                    role="admin",
+                    is_active=True
+                )
+                db.add(admin)
+                await db.flush()
+                await rollups.record(db, admin.created_at, **rollups.user_deltas(admin.role))
+                await db.commit()
+                # Пароль по умолчанию: предупреждение, чтобы его сменили
+                logger.warning("Создан администратор %s с паролем по умолчанию admin123", admin_email)
+            else:
+                logger.info("Администратор уже существует")
+        except Exception:
+            logger.exception("Ошибка при создании администратора")
+
+@app.on_event("shutdown")
+async def release_resources():
+    await dispatcher.stop()
+    await pending_index.stop()
+    await image_processor.stop()
+    await upload_sessions.stop()
+    await audit_log.stop()
+    bus.close_all()
+    hasher.shutdown()
+    await models.async_engine.dispose()
 
 if __name__ == "__main__":
     import uvicorn
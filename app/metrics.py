@@ -0,0 +1,250 @@
+# app/metrics.py
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import event
+from starlette.routing import Mount
+
+from app.db_pool import pool_status
+
+# Границы корзин гистограмм задержек, секунды
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+# Маршрут запросов, не попавших ни в один обработчик (404): путь в метку не идёт
+UNMATCHED = "<unmatched>"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 collect: Optional[Callable[[], Dict[tuple, float]]] = None):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        # Значения, снимаемые в момент чтения, вместо накопленных кодом
+        self.collect = collect
+        self._values: Dict[tuple, float] = {}
+
+    def samples(self) -> Iterable[str]:
+        values = self.collect() if self.collect is not None else self._values
+        for labels, value in values.items():
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+class Histogram(Metric):
+    """Гистограмма с фиксированными корзинами; observe - bisect и два сложения"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [счётчики по корзинам (+Inf последним), сумма]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self):
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus 0.0.4"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status", ("method", "route", "status")
+))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template", ("method", "route")
+))
+http_in_flight = registry.register(Gauge("http_requests_in_flight", "HTTP requests being processed"))
+http_in_flight.set(0)
+request_db_statements = registry.register(Histogram(
+    "http_request_db_statements", "SQL statements executed per HTTP request", ("method", "route"), STATEMENT_BUCKETS
+))
+request_db_time = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per HTTP request", ("method", "route")
+))
+db_statements = registry.register(Counter("db_statements_total", "SQL statements executed"))
+db_time = registry.register(Counter("db_statement_seconds_total", "Time spent executing SQL statements"))
+password_hashing = registry.register(Histogram(
+    "password_hash_duration_seconds", "bcrypt time in the worker pool by operation", ("operation",)
+))
+password_hashing_wait = registry.register(Histogram(
+    "password_hash_wait_seconds", "Wait for a bcrypt worker slot by operation", ("operation",)
+))
+password_hashing_rejected = registry.register(Counter(
+    "password_hash_rejected_total", "bcrypt operations rejected with 503 by operation", ("operation",)
+))
+logins = registry.register(Counter("logins_total", "Login attempts by result", ("result",)))
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+# Счётчики текущего запроса; задачи, порождённые обработчиком, видят тот же объект
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+def instrument_engine(engine):
+    """Считать операторы и время в БД движка (AsyncEngine - через sync_engine)"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        db_statements.inc()
+        db_time.inc(amount=elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+def register_pool(pool_getter: Callable):
+    """Метрики пула соединений, снимаются при чтении (engine.dispose() меняет пул)"""
+    def connections() -> Dict[tuple, float]:
+        status = pool_status(pool_getter())
+        return {
+            (state,): status[state]
+            for state in ("size", "checked_out", "checked_in", "overflow", "max_overflow")
+            if state in status
+        }
+
+    def counter(key: str) -> Callable[[], Dict[tuple, float]]:
+        def collect() -> Dict[tuple, float]:
+            status = pool_status(pool_getter())
+            return {(): status[key]} if key in status else {}
+        return collect
+
+    def wait() -> Dict[tuple, float]:
+        status = pool_status(pool_getter())
+        if "wait_ms" not in status:
+            return {}
+        return {(stat,): value / 1000 for stat, value in status["wait_ms"].items()}
+
+    registry.register(Gauge("db_pool_connections", "Database pool connections by state", ("state",), collect=connections))
+    registry.register(Counter("db_pool_checkouts_total", "Connections handed out by the pool", collect=counter("checkouts")))
+    registry.register(Counter("db_pool_timeouts_total", "Pool checkouts that timed out", collect=counter("timeouts")))
+    registry.register(Gauge(
+        "db_pool_checkout_wait_seconds", "Wait for a pooled connection over recent checkouts", ("stat",), collect=wait
+    ))
+
+class MetricsMiddleware:
+    """Число, задержка и SQL-нагрузка запросов по шаблону маршрута.
+
+    Шаблон (/api/orders/{order_id}) берётся по обработчику, который
+    роутер кладёт в scope["endpoint"], поэтому число рядов не растёт
+    с числом разных id в путях.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._templates: Optional[Dict[int, str]] = None
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED
+        if self._templates is None:
+            templates = {}
+            for route in scope["app"].routes:
+                if isinstance(route, Mount):
+                    templates[id(route.app)] = route.path + "/{path}"
+                elif hasattr(route, "endpoint"):
+                    templates.setdefault(id(route.endpoint), route.path)
+            self._templates = templates
+        return self._templates.get(id(endpoint), UNMATCHED)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stats = RequestStats()
+        token = current_request.set(stats)
+        http_in_flight.inc()
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            current_request.reset(token)
+            method, route = scope["method"], self._route(scope)
+            http_requests.inc(method, route, status)
+            http_latency.observe(elapsed, method, route)
+            request_db_statements.observe(stats.statements, method, route)
+            request_db_time.observe(stats.db_seconds, method, route)
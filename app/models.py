@@ -1,16 +1,67 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Index, literal, text, true
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.engine import make_url
 from datetime import datetime
 import enum
 
 from app.config import settings
+from app.db_pool import InstrumentedAsyncPool
 
-engine = create_engine(
-    settings.DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+# Синхронный и асинхронный драйвер для каждого диалекта
+SYNC_DRIVERS = {"sqlite": "pysqlite", "postgresql": "psycopg2"}
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def _with_driver(url: str, drivers: dict) -> str:
+    """Подставить драйвер нужного режима в DATABASE_URL"""
+    url = make_url(url)
+    driver = drivers.get(url.get_backend_name())
+    if driver is None:
+        return url.render_as_string(hide_password=False)
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+def sync_database_url(url: str = settings.DATABASE_URL) -> str:
+    return _with_driver(url, SYNC_DRIVERS)
+
+def async_database_url(url: str = settings.DATABASE_URL) -> str:
+    return _with_driver(url, ASYNC_DRIVERS)
+
+_connect_args = {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+
+# Синхронный движок: скрипты, миграции, create_all. Создаётся при первом
+# обращении к models.engine / models.SessionLocal, поэтому приложению
+# хватает асинхронного драйвера (asyncpg), а psycopg2 нужен только скриптам
+_sync = {}
+
+def __getattr__(name: str):
+    if name in ("engine", "SessionLocal"):
+        if not _sync:
+            _sync["engine"] = create_engine(sync_database_url(), connect_args=_connect_args)
+            _sync["SessionLocal"] = sessionmaker(autocommit=False, autoflush=False, bind=_sync["engine"])
+        return _sync[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _async_pool_args() -> dict:
+    """Очередь соединений с замером ожидания (кроме SQLite в памяти)"""
+    if make_url(settings.DATABASE_URL).database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+    }
+
+# Асинхронный движок: все обработчики FastAPI
+async_engine = create_async_engine(
+    async_database_url(), connect_args=_connect_args, **_async_pool_args()
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autocommit=False, autoflush=False, expire_on_commit=False
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
 Base = declarative_base()
 
 class UserRole:
@@ -39,6 +90,15 @@ class User(Base):
     role = Column(String, default=UserRole.CLIENT)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    driver_profile = relationship("DriverProfile", back_populates="user", uselist=False)
+    client_orders = relationship("Order", back_populates="client", foreign_keys="Order.client_id")
+    driver_orders = relationship("Order", back_populates="driver", foreign_keys="Order.driver_id")
+    
+    __table_args__ = (
+        Index("ix_users_role_created_at", "role", "created_at"),
+        Index("ix_users_created_at", "created_at"),
+    )
 
 class DriverProfile(Base):
     __tablename__ = "driver_profiles"
@@ -53,6 +113,10 @@ class DriverProfile(Base):
     rating = Column(Float, default=0.0)
     total_trips = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    user = relationship("User", back_populates="driver_profile")
+    documents = relationship("DriverDocument", back_populates="driver_profile", order_by="DriverDocument.id")
+    cars = relationship("Car", back_populates="driver_profile", order_by="Car.id")
 
 class DriverDocument(Base):
     __tablename__ = "driver_documents"
@@ -60,13 +124,46 @@ class DriverDocument(Base):
     id = Column(Integer, primary_key=True, index=True)
     driver_profile_id = Column(Integer, ForeignKey("driver_profiles.id"))
     document_type = Column(String)
+    # Ключ в хранилище (app/storage.py): blobs/ab/<content_hash>.jpg
     file_path = Column(String)
     side = Column(String, nullable=True)
+    # Слот (car_photo_1, license_front, ...) и номер версии в нём;
+    # активна только последняя загрузка слота
+    slot = Column(String, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    is_active = Column(Boolean, nullable=False, default=True, server_default=true())
+    content_hash = Column(String(64), nullable=True)
+    superseded_at = Column(DateTime, nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String, default=DocumentStatus.PENDING)
     reviewed_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     reviewed_at = Column(DateTime, nullable=True)
     rejection_reason = Column(Text, nullable=True)
+    # Заполняются фоновой обработкой (app/images.py); пути относительно UPLOAD_DIR
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    preview_path = Column(String, nullable=True)
+    preview_width = Column(Integer, nullable=True)
+    preview_height = Column(Integer, nullable=True)
+    thumbnail_path = Column(String, nullable=True)
+    thumbnail_width = Column(Integer, nullable=True)
+    thumbnail_height = Column(Integer, nullable=True)
+    processed_at = Column(DateTime, nullable=True)
+    
+    driver_profile = relationship("DriverProfile", back_populates="documents")
+    reviewer = relationship("User", foreign_keys=[reviewed_by])
+    
+    __table_args__ = (
+        Index("ix_driver_documents_driver_profile_id", "driver_profile_id"),
+        Index("ix_driver_documents_content_hash", "content_hash"),
+        # Не больше одной активной версии на слот
+        Index(
+            "ix_driver_documents_active_slot", "driver_profile_id", "slot",
+            unique=True,
+            sqlite_where=text("is_active = 1"),
+            postgresql_where=text("is_active"),
+        ),
+    )
 
 class Car(Base):
     __tablename__ = "cars"
@@ -79,9 +176,12 @@ class Car(Base):
     color = Column(String)
     license_plate = Column(String, unique=True)
     capacity = Column(Integer)
+    luggage_capacity = Column(Integer, nullable=True)  # NULL - не ограничено
     has_air_conditioning = Column(Boolean, default=True)
     has_wifi = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    driver_profile = relationship("DriverProfile", back_populates="cars")
 
 class Order(Base):
     __tablename__ = "orders"
@@ -92,6 +192,12 @@ class Order(Base):
     
     pickup_location = Column(String)
     dropoff_location = Column(String)
+    pickup_lat = Column(Float, nullable=True)
+    pickup_lng = Column(Float, nullable=True)
+    dropoff_lat = Column(Float, nullable=True)
+    dropoff_lng = Column(Float, nullable=True)
+    # Геохеш точки посадки, копия геоиндекса в памяти (app/geo.py)
+    pickup_geohash = Column(String(12), nullable=True)
     pickup_time = Column(DateTime)
     passengers_count = Column(Integer)
     luggage_count = Column(Integer)
@@ -103,6 +209,42 @@ class Order(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     accepted_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
+    # Растёт при каждом переходе статуса (см. app/order_state.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
+    client = relationship("User", back_populates="client_orders", foreign_keys=[client_id])
+    driver = relationship("User", back_populates="driver_orders", foreign_keys=[driver_id])
+    
+    __table_args__ = (
+        # Лента доступных заказов: status='pending' AND pickup_time >= ? ORDER BY created_at
+        Index(
+            "ix_orders_pending_created_at", "created_at", "pickup_time",
+            sqlite_where=text("status = 'pending'"),
+            postgresql_where=text("status = 'pending'"),
+        ),
+        Index("ix_orders_driver_id_status", "driver_id", "status"),
+        Index("ix_orders_client_id_created_at", "client_id", "created_at"),
+        Index("ix_orders_driver_id_created_at", "driver_id", "created_at"),
+        Index("ix_orders_created_at", "created_at"),
+        # Поиск ожидающих заказов рядом с водителем по префиксу геохеша
+        Index(
+            "ix_orders_pending_pickup_geohash", "pickup_geohash",
+            sqlite_where=text("status = 'pending'"),
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+def order_is_pending():
+    """Условие status='pending' для частичного индекса ix_orders_pending_created_at.
+
+    Значение подставляется литералом: по связанному параметру SQLite
+    не может доказать, что запрос попадает под WHERE частичного индекса.
+    """
+    return Order.status == literal(OrderStatus.PENDING, literal_execute=True)
+
+def document_is_active():
+    """Условие is_active для частичного индекса ix_driver_documents_active_slot (литералом)"""
+    return DriverDocument.is_active == true()
 
 class DriverReview(Base):
     __tablename__ = "driver_reviews"
@@ -124,5 +266,31 @@ class AdminAction(Base):
     target_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     details = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Идентификатор записи журнала app/audit.py: повторная вставка после сбоя игнорируется
+    entry_id = Column(String(32), nullable=True)
+    
+    __table_args__ = (
+        Index("ix_admin_actions_entry_id", "entry_id", unique=True),
+        Index("ix_admin_actions_created_at", "created_at"),
+        Index("ix_admin_actions_admin_id_created_at", "admin_id", "created_at"),
+        Index("ix_admin_actions_target_user_id_created_at", "target_user_id", "created_at"),
+    )
+
+class StatsBucket(Base):
+    """Почасовые и суточные счётчики для /api/admin/statistics/full.
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Заказ учитывается в корзине своего created_at: завершение или отмена
+    увеличивают счётчики той же корзины, где заказ был создан.
+    """
+    __tablename__ = "stats_buckets"
+    
+    granularity = Column(String, primary_key=True)  # hour, day
+    bucket_start = Column(DateTime, primary_key=True)
+    orders_created = Column(Integer, nullable=False, default=0)
+    orders_accepted = Column(Integer, nullable=False, default=0)
+    orders_completed = Column(Integer, nullable=False, default=0)
+    orders_cancelled = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    new_users = Column(Integer, nullable=False, default=0)
+    new_clients = Column(Integer, nullable=False, default=0)
+    new_drivers = Column(Integer, nullable=False, default=0)
\ No newline at end of file
@@ -126,6 +126,4 @@ class AdminAction(Base):
     action_type = Column(String)
     target_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     details = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
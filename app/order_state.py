@@ -0,0 +1,131 @@
+# app/order_state.py
+from datetime import datetime
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import exists, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.principal_cache import Principal
+
+Order = models.Order
+OrderStatus = models.OrderStatus
+
+# Из каких статусов разрешён переход
+ACCEPT_FROM = (OrderStatus.PENDING,)
+COMPLETE_FROM = (OrderStatus.ACCEPTED,)
+CANCEL_FROM = (OrderStatus.PENDING, OrderStatus.ACCEPTED)
+
+def transition(order_id: int, from_statuses: Iterable[str], *conditions,
+               version: Optional[int] = None, **values):
+    """UPDATE orders SET ... WHERE id=? AND status IN (...) [AND version=?] RETURNING *
+
+    Проверка статуса и запись выполняются одним оператором, поэтому из
+    двух конкурентных переходов строку изменит только один. Пустой
+    RETURNING означает, что переход не состоялся.
+    """
+    statement = update(Order).where(
+        Order.id == order_id,
+        Order.status.in_(list(from_statuses)),
+        *conditions
+    )
+    if version is not None:
+        statement = statement.where(Order.version == version)
+    return statement.values(version=Order.version + 1, **values).returning(Order)
+
+def driver_is_approved(driver_id: int):
+    return exists().where(
+        models.DriverProfile.user_id == driver_id,
+        models.DriverProfile.documents_status == "approved"
+    )
+
+def accept_statement(order_id: int, driver_id: int, version: Optional[int] = None):
+    return transition(
+        order_id, ACCEPT_FROM, driver_is_approved(driver_id),
+        version=version,
+        driver_id=driver_id,
+        status=OrderStatus.ACCEPTED,
+        accepted_at=datetime.now()
+    )
+
+def complete_statement(order_id: int, driver_id: int, version: Optional[int] = None):
+    return transition(
+        order_id, COMPLETE_FROM, Order.driver_id == driver_id,
+        version=version,
+        status=OrderStatus.COMPLETED,
+        completed_at=datetime.now(),
+        final_price=Order.client_price
+    )
+
+def cancel_statement(order_id: int, user: Principal, version: Optional[int] = None):
+    conditions = []
+    if user.role == models.UserRole.CLIENT:
+        conditions.append(Order.client_id == user.id)
+    elif user.role == models.UserRole.DRIVER:
+        conditions.append(Order.driver_id == user.id)
+    return transition(
+        order_id, CANCEL_FROM, *conditions,
+        version=version,
+        status=OrderStatus.CANCELLED
+    )
+
+async def _apply(db: AsyncSession, statement) -> Optional[models.Order]:
+    return (await db.scalars(
+        statement, execution_options={"populate_existing": True}
+    )).one_or_none()
+
+async def _failed(db: AsyncSession, order_id: int, version: Optional[int],
+                  forbidden: Optional[str], invalid: str):
+    """Разобрать, почему переход не состоялся (только на неуспешном пути)"""
+    order = await db.get(models.Order, order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if forbidden is not None:
+        raise HTTPException(status_code=403, detail=forbidden)
+    if version is not None and order.version != version:
+        raise HTTPException(status_code=409, detail="Order was modified concurrently")
+    raise HTTPException(status_code=400, detail=invalid)
+
+async def accept(db: AsyncSession, order_id: int, driver_id: int,
+                 version: Optional[int] = None) -> models.Order:
+    """pending -> accepted; выигрывает ровно один водитель"""
+    order = await _apply(db, accept_statement(order_id, driver_id, version))
+    if order is not None:
+        return order
+    if not await db.scalar(select(driver_is_approved(driver_id))):
+        raise HTTPException(status_code=403, detail="Your account is not verified yet")
+    await _failed(db, order_id, version, None, "Order is not available")
+
+async def complete(db: AsyncSession, order_id: int, driver_id: int,
+                   version: Optional[int] = None) -> models.Order:
+    """accepted -> completed, с увеличением счётчика поездок водителя"""
+    order = await _apply(db, complete_statement(order_id, driver_id, version))
+    if order is None:
+        current = await db.get(models.Order, order_id)
+        await _failed(
+            db, order_id, version,
+            "Not your order" if current is not None and current.driver_id != driver_id else None,
+            "Order cannot be completed"
+        )
+    await db.execute(
+        update(models.DriverProfile)
+        .where(models.DriverProfile.user_id == driver_id)
+        .values(total_trips=models.DriverProfile.total_trips + 1)
+    )
+    return order
+
+async def cancel(db: AsyncSession, order_id: int, user: Principal,
+                 version: Optional[int] = None) -> models.Order:
+    """pending/accepted -> cancelled"""
+    order = await _apply(db, cancel_statement(order_id, user, version))
+    if order is not None:
+        return order
+    current = await db.get(models.Order, order_id)
+    forbidden = None
+    if current is not None:
+        if user.role == models.UserRole.CLIENT and current.client_id != user.id:
+            forbidden = "Not authorized to cancel this order"
+        elif user.role == models.UserRole.DRIVER and current.driver_id != user.id:
+            forbidden = "Not authorized to cancel this order"
+    await _failed(db, order_id, version, forbidden, "Order already completed or cancelled")
@@ -0,0 +1,93 @@
+# app/pages.py
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Tuple
+
+from fastapi import Request
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache
+from starlette.responses import Response
+
+from app.compression import compress_variants, negotiate
+from app.config import settings
+from app.files import etag_matches
+
+# Страницы, которые прогреваются при старте
+WEB_PAGES = (
+    "index.html",
+    "login.html",
+    "register.html",
+    "client/dashboard.html",
+    "driver/dashboard.html",
+    "driver/upload_documents.html",
+    "admin/dashboard.html",
+)
+
+@dataclass
+class Page:
+    etag: str
+    variants: Dict[str, bytes]
+
+    def tag(self, encoding: str) -> str:
+        # У каждого представления свой сильный ETag
+        return f'"{self.etag}"' if encoding == "identity" else f'"{self.etag}-{encoding}"'
+
+class PageCache:
+    """Готовые HTML-оболочки страниц.
+
+    Шаблоны не содержат пользовательских данных, кроме навигации для
+    вошедшего/гостя (наличие cookie access_token), поэтому каждая страница
+    рендерится и сжимается один раз на вариант и дальше отдаётся из
+    памяти с ETag и 304. Данные страницы подгружают через API.
+    """
+
+    def __init__(self, env: Environment):
+        self.env = env
+        self._pages: Dict[Tuple[str, bool], Page] = {}
+
+    def _render(self, name: str, logged_in: bool) -> Page:
+        body = self.env.get_template(name).render(logged_in=logged_in).encode()
+        page = Page(etag=hashlib.sha256(body).hexdigest()[:20], variants=compress_variants(body))
+        self._pages[name, logged_in] = page
+        return page
+
+    def warm(self, names: Iterable[str]):
+        for name in names:
+            for logged_in in (False, True):
+                self._render(name, logged_in)
+
+    def response(self, request: Request, name: str) -> Response:
+        logged_in = bool(request.cookies.get("access_token"))
+        page = self._pages.get((name, logged_in)) or self._render(name, logged_in)
+        encoding = negotiate(request.headers.get("accept-encoding"), page.variants)
+        headers = {
+            "etag": page.tag(encoding),
+            "cache-control": "private, no-cache",
+            "vary": "Accept-Encoding, Cookie",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if any(etag_matches(if_none_match, page.tag(variant)) for variant in page.variants):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["content-encoding"] = encoding
+        return Response(page.variants[encoding], headers=headers, media_type="text/html")
+
+    def stats(self) -> dict:
+        return {
+            "pages": len(self._pages),
+            "bytes": {
+                encoding: sum(len(page.variants.get(encoding, b"")) for page in self._pages.values())
+                for encoding in ("identity", "gzip", "br")
+            },
+        }
+
+def bytecode_cache() -> FileSystemBytecodeCache:
+    """Скомпилированные шаблоны на диске: общие для воркеров и перезапусков"""
+    if settings.TEMPLATE_CACHE_DIR:
+        os.makedirs(settings.TEMPLATE_CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(settings.TEMPLATE_CACHE_DIR)
+    return FileSystemBytecodeCache()
+
+templates = Jinja2Templates(directory="app/templates", bytecode_cache=bytecode_cache())
+page_cache = PageCache(templates.env)
@@ -0,0 +1,66 @@
+# app/pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """Непрозрачный курсор: позиция (created_at, id) последней записи страницы"""
+    raw = json.dumps([created_at.isoformat(), item_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, item_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+class PageParams:
+    """Параметры ?limit=&cursor= для списочных эндпоинтов"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+        cursor: Optional[str] = None
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+def keyset(query, model, params: PageParams):
+    """Страница по (created_at DESC, id DESC), начиная после курсора"""
+    if params.cursor:
+        created_at, item_id = decode_cursor(params.cursor)
+        query = query.where(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < item_id)
+        ))
+    # Одна лишняя строка показывает, есть ли следующая страница
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(params.limit + 1)
+
+async def fetch_page(db: AsyncSession, query, model, params: PageParams) -> dict:
+    """Выполнить keyset-запрос и вернуть {"items": [...], "next_cursor": ...}
+
+    select(Model) даёт объекты ORM, select(Model.a, Model.b, ...) - словари
+    только с этими столбцами (среди них должны быть id и created_at).
+    """
+    entities = query.column_descriptions[0]["expr"] is model
+    result = await db.execute(keyset(query, model, params))
+    rows = (result.scalars().unique() if entities else result).all()
+    items = rows[:params.limit]
+    next_cursor = None
+    if len(rows) > params.limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    if not entities:
+        # Схема ответа проверяет словари в разы быстрее, чем атрибуты Row
+        items = [row._asdict() for row in items]
+    return {"items": items, "next_cursor": next_cursor}
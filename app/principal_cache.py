@@ -0,0 +1,169 @@
+# app/principal_cache.py
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+@dataclass(frozen=True)
+class Principal:
+    """Снимок аутентифицированного пользователя без секретных полей"""
+    id: int
+    email: str
+    full_name: Optional[str]
+    role: str
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            is_active=user.is_active,
+            created_at=user.created_at,
+        )
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+class PrincipalCache:
+    """LRU/TTL кеш: хеш токена -> Principal.
+
+    Запись живёт не дольше exp токена и не дольше ttl секунд, чтобы
+    изменения в базе в обход API всё равно подхватывались.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        key = token_key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        principal, expires_at = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return principal
+
+    def put(self, token: str, principal: Principal, exp: Optional[float] = None):
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        key = token_key(token)
+        self._remove(key)
+        self._entries[key] = (principal, expires_at)
+        self._by_user.setdefault(principal.id, set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def discard(self, token: str):
+        self._remove(token_key(token))
+
+    def invalidate_user(self, user_id: Optional[int]):
+        if user_id is None:
+            return
+        keys = self._by_user.pop(user_id, set())
+        for key in keys:
+            self._entries.pop(key, None)
+        self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._by_user.clear()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry[0].id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry[0].id]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+# Смена роли или активности сбрасывает закешированные токены пользователя.
+# Сброс идёт после коммита: до него другой запрос перечитал бы из базы
+# старые значения и снова положил их в кеш. Изменения копятся в
+# session.info при flush; после отката они не сбрасываются - лишняя
+# инвалидация безвредна, а откат точки сохранения не отменяет внешнюю
+# транзакцию. Изменения в обход сессии подхватываются по ttl.
+PENDING_KEY = "principal_cache_users"
+# Пометка "все пользователи": массовый UPDATE/DELETE по таблице users
+ALL_USERS = object()
+
+def _pending(session) -> set:
+    return session.info.setdefault(PENDING_KEY, set())
+
+def invalidate_on_commit(session, user_id: int):
+    """Сбросить кеш пользователя после коммита session (Session или AsyncSession)"""
+    _pending(session).add(user_id)
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    for user in session.dirty:
+        if isinstance(user, models.User):
+            attrs = inspect(user).attrs
+            if attrs.role.history.has_changes() or attrs.is_active.history.has_changes():
+                _pending(session).add(user.id)
+    for user in session.deleted:
+        if isinstance(user, models.User):
+            _pending(session).add(user.id)
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_changes(orm_execute_state):
+    # update(User)/delete(User) минуют flush; какие строки задеты, заранее не известно
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) \
+            and orm_execute_state.statement.table.name == models.User.__tablename__:
+        _pending(orm_execute_state.session).add(ALL_USERS)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    users = session.info.pop(PENDING_KEY, None)
+    if not users:
+        return
+    if ALL_USERS in users:
+        principal_cache.clear()
+        return
+    for user_id in users:
+        principal_cache.invalidate_user(user_id)
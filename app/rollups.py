@@ -0,0 +1,180 @@
+# app/rollups.py
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, delete, func, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+Bucket = models.StatsBucket
+
+GRANULARITIES = ("hour", "day")
+SERIES_GRANULARITIES = ("hour", "day", "week", "month")
+COUNTERS = (
+    "orders_created",
+    "orders_accepted",
+    "orders_completed",
+    "orders_cancelled",
+    "revenue",
+    "new_users",
+    "new_clients",
+    "new_drivers",
+)
+
+def truncate(ts: datetime, granularity: str) -> datetime:
+    """Начало корзины, в которую попадает ts"""
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "week":
+        return truncate(ts - timedelta(days=ts.weekday()), "day")
+    if granularity == "month":
+        return truncate(ts.replace(day=1), "day")
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+def user_deltas(role: str) -> dict:
+    deltas = {"new_users": 1}
+    if role == models.UserRole.CLIENT:
+        deltas["new_clients"] = 1
+    elif role == models.UserRole.DRIVER:
+        deltas["new_drivers"] = 1
+    return deltas
+
+# Инкрементальное обновление
+
+def upsert_statement(dialect_name: str, ts: datetime, deltas: dict):
+    """INSERT ... ON CONFLICT DO UPDATE для часовой и суточной корзин ts"""
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    rows = []
+    for granularity in GRANULARITIES:
+        row = dict.fromkeys(COUNTERS, 0)
+        row.update(deltas)
+        row.update(granularity=granularity, bucket_start=truncate(ts, granularity))
+        rows.append(row)
+    statement = dialect_insert(Bucket).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[Bucket.granularity, Bucket.bucket_start],
+        set_={name: getattr(Bucket, name) + getattr(statement.excluded, name) for name in deltas},
+    )
+
+async def record(db: AsyncSession, ts: Optional[datetime], **deltas):
+    """Увеличить счётчики корзин ts в текущей транзакции"""
+    if ts is None or not deltas:
+        return
+    await db.execute(upsert_statement(db.get_bind().dialect.name, ts, deltas))
+
+# Полный пересчёт
+
+def _bucket_expr(column, granularity: str, dialect_name: str):
+    if dialect_name == "postgresql":
+        return func.date_trunc(granularity, column)
+    # Формат совпадает с тем, как SQLAlchemy хранит DateTime в SQLite
+    fmt = "%Y-%m-%d %H:00:00.000000" if granularity == "hour" else "%Y-%m-%d 00:00:00.000000"
+    return func.strftime(fmt, column)
+
+def _as_datetime(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+def rebuild(connection, chunk_size: int = 5000) -> int:
+    """Пересчитать все корзины из orders и users. Возвращает число корзин."""
+    dialect_name = connection.dialect.name
+    Order, User = models.Order, models.User
+    buckets: Dict[tuple, dict] = {}
+
+    def bucket(granularity, start):
+        key = (granularity, _as_datetime(start))
+        if key not in buckets:
+            buckets[key] = dict.fromkeys(COUNTERS, 0)
+        return buckets[key]
+
+    for granularity in GRANULARITIES:
+        start = _bucket_expr(Order.created_at, granularity, dialect_name)
+        orders = connection.execute(
+            select(
+                start,
+                func.count(Order.id),
+                func.count(Order.accepted_at),
+                func.sum(case((Order.status == models.OrderStatus.COMPLETED, 1), else_=0)),
+                func.sum(case((Order.status == models.OrderStatus.CANCELLED, 1), else_=0)),
+                func.sum(case((Order.status == models.OrderStatus.COMPLETED, Order.final_price), else_=0)),
+            ).where(Order.created_at.is_not(None)).group_by(start)
+        )
+        for row in orders:
+            counters = bucket(granularity, row[0])
+            counters["orders_created"] = row[1]
+            counters["orders_accepted"] = row[2]
+            counters["orders_completed"] = row[3] or 0
+            counters["orders_cancelled"] = row[4] or 0
+            counters["revenue"] = row[5] or 0.0
+
+        start = _bucket_expr(User.created_at, granularity, dialect_name)
+        users = connection.execute(
+            select(
+                start,
+                func.count(User.id),
+                func.sum(case((User.role == models.UserRole.CLIENT, 1), else_=0)),
+                func.sum(case((User.role == models.UserRole.DRIVER, 1), else_=0)),
+            ).where(User.created_at.is_not(None)).group_by(start)
+        )
+        for row in users:
+            counters = bucket(granularity, row[0])
+            counters["new_users"] = row[1]
+            counters["new_clients"] = row[2] or 0
+            counters["new_drivers"] = row[3] or 0
+
+    connection.execute(delete(Bucket))
+    rows = [
+        {"granularity": granularity, "bucket_start": start, **counters}
+        for (granularity, start), counters in buckets.items()
+    ]
+    for offset in range(0, len(rows), chunk_size):
+        connection.execute(insert(Bucket), rows[offset:offset + chunk_size])
+    return len(rows)
+
+# Чтение
+
+def _plan(start: datetime, end: datetime) -> List[tuple]:
+    """Разбить [start, end) на часовые края и целые сутки"""
+    start = truncate(start, "hour")
+    first_day = truncate(start, "day")
+    if first_day < start:
+        first_day += timedelta(days=1)
+    last_day = truncate(end, "day")
+    if first_day >= last_day:
+        return [("hour", start, end)]
+    return [("hour", start, first_day), ("day", first_day, last_day), ("hour", last_day, end)]
+
+async def totals(db: AsyncSession, start: datetime, end: datetime) -> dict:
+    """Суммы счётчиков за [start, end) с точностью до часа"""
+    ranges = [
+        and_(Bucket.granularity == granularity, Bucket.bucket_start >= lo, Bucket.bucket_start < hi)
+        for granularity, lo, hi in _plan(start, end)
+        if lo < hi
+    ]
+    row = (await db.execute(
+        select(*[func.coalesce(func.sum(getattr(Bucket, name)), 0) for name in COUNTERS])
+        .where(or_(*ranges))
+    )).one()
+    return dict(zip(COUNTERS, row))
+
+async def series(db: AsyncSession, start: datetime, end: datetime, granularity: str) -> List[dict]:
+    """Ряд корзин hour/day/week/month за [start, end)"""
+    source = "hour" if granularity == "hour" else "day"
+    buckets = await db.scalars(
+        select(Bucket).where(
+            Bucket.granularity == source,
+            Bucket.bucket_start >= truncate(start, source),
+            Bucket.bucket_start < end
+        ).order_by(Bucket.bucket_start)
+    )
+    result: "OrderedDict[datetime, dict]" = OrderedDict()
+    for item in buckets:
+        key = truncate(item.bucket_start, granularity)
+        counters = result.setdefault(key, dict.fromkeys(COUNTERS, 0))
+        for name in COUNTERS:
+            counters[name] += getattr(item, name)
+    return [{"bucket_start": key, **counters} for key, counters in result.items()]
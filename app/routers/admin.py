@@ -1,273 +1,286 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Form
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload, selectinload
+from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 
-from app import schemas, models, auth
-from app.auth import get_db, require_admin
+from app import schemas, models, auth, driver_review, rollups
+from app.audit import audit_log
+from app.auth import Principal, get_db, require_admin
+from app.hashing import hasher
+from app.principal_cache import invalidate_on_commit, principal_cache
+from app.db_pool import pool_status
+from app.dispatch import dispatcher
+from app.images import image_processor
+from app.pages import page_cache
+from app.events import bus
+from app.pagination import PageParams, fetch_page
 
 router = APIRouter()
 
-@router.get("/dashboard")
+@router.get("/dashboard", response_model=schemas.AdminDashboard)
 async def admin_dashboard(
-    current_user: models.User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
 ):
-    # Get counts
-    total_users = db.query(models.User).count()
-    total_clients = db.query(models.User).filter(
-        models.User.role == models.UserRole.CLIENT
-    ).count()
-    total_drivers = db.query(models.User).filter(
-        models.User.role == models.UserRole.DRIVER
-    ).count()
-    
-    pending_drivers = db.query(models.DriverProfile).filter(
+    # Пользователи по ролям + водители на проверке (один запрос)
+    pending_drivers_count = select(func.count(models.DriverProfile.id)).where(
         models.DriverProfile.documents_status == models.DocumentStatus.PENDING
-    ).count()
-    
-    total_orders = db.query(models.Order).count()
-    pending_orders = db.query(models.Order).filter(
-        models.Order.status == models.OrderStatus.PENDING
-    ).count()
-    completed_orders = db.query(models.Order).filter(
-        models.Order.status == models.OrderStatus.COMPLETED
-    ).count()
-    
-    # Calculate revenue
-    completed_trips = db.query(models.Order).filter(
-        models.Order.status == models.OrderStatus.COMPLETED
-    ).all()
-    total_revenue = sum([trip.final_price or 0 for trip in completed_trips])
-    
-    return {
-        "stats": {
-            "total_users": total_users,
-            "total_clients": total_clients,
-            "total_drivers": total_drivers,
-            "pending_drivers": pending_drivers,
-            "total_orders": total_orders,
-            "pending_orders": pending_orders,
-            "completed_orders": completed_orders,
-            "total_revenue": total_revenue
-        }
-    }
+    ).scalar_subquery()
+    users_by_role = (await db.execute(
+        select(models.User.role, func.count(models.User.id), pending_drivers_count)
+        .group_by(models.User.role)
+    )).all()
+    
+    # Заказы по статусам с суммой final_price (один запрос)
+    orders_by_status = (await db.execute(
+        select(
+            models.Order.status,
+            func.count(models.Order.id),
+            func.coalesce(func.sum(models.Order.final_price), 0)
+        ).group_by(models.Order.status)
+    )).all()
+    
+    role_counts = {role: count for role, count, _ in users_by_role}
+    status_counts = {status: count for status, count, _ in orders_by_status}
+    revenue_by_status = {status: revenue for status, _, revenue in orders_by_status}
+    
+    stats = schemas.AdminStats(
+        total_users=sum(role_counts.values()),
+        total_clients=role_counts.get(models.UserRole.CLIENT, 0),
+        total_drivers=role_counts.get(models.UserRole.DRIVER, 0),
+        pending_drivers=users_by_role[0][2] if users_by_role else 0,
+        total_orders=sum(status_counts.values()),
+        pending_orders=status_counts.get(models.OrderStatus.PENDING, 0),
+        completed_orders=status_counts.get(models.OrderStatus.COMPLETED, 0),
+        total_revenue=revenue_by_status.get(models.OrderStatus.COMPLETED, 0)
+    )
+    return {"stats": stats}
 
-@router.get("/users")
+@router.get("/users", response_model=schemas.Page[schemas.UserResponse])
 async def get_all_users(
     role: Optional[str] = None,
-    current_user: models.User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(models.User)
+    query = select(*schemas.columns(models.User, schemas.UserResponse))
     if role:
-        query = query.filter(models.User.role == role)
+        query = query.where(models.User.role == role)
     
-    users = query.all()
-    return users
+    return await fetch_page(db, query, models.User, page)
 
-@router.get("/drivers/pending")
+@router.get("/drivers/pending", response_model=List[schemas.PendingDriverResponse])
 async def get_pending_drivers(
-    current_user: models.User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
 ):
-    pending_profiles = db.query(models.DriverProfile).filter(
-        models.DriverProfile.documents_status == models.DocumentStatus.PENDING
-    ).all()
+    # Пользователь через JOIN, документы одним SELECT ... IN: 2 запроса на любой объём
+    pending_profiles = await db.scalars(
+        select(models.DriverProfile).where(
+            models.DriverProfile.documents_status == models.DocumentStatus.PENDING
+        ).options(
+            joinedload(models.DriverProfile.user).load_only(
+                *schemas.columns(models.User, schemas.UserResponse)
+            ),
+            selectinload(models.DriverProfile.documents.and_(models.document_is_active())).load_only(
+                *schemas.columns(models.DriverDocument, schemas.DocumentResponse)
+            )
+        )
+    )
     
-    result = []
-    for profile in pending_profiles:
-        user = db.query(models.User).filter(models.User.id == profile.user_id).first()
-        documents = db.query(models.DriverDocument).filter(
-            models.DriverDocument.driver_profile_id == profile.id
-        ).all()
-        
-        result.append({
+    return [
+        {
             "profile_id": profile.id,
-            "user": user,
-            "documents": documents,
+            "user": profile.user,
+            "documents": profile.documents,
             "submitted_at": profile.created_at
-        })
-    
-    return result
+        }
+        for profile in pending_profiles
+    ]
 
-@router.post("/drivers/{driver_id}/approve")
+@router.post("/drivers/{driver_id}/approve", response_model=schemas.Message)
 async def approve_driver(
     driver_id: int,
-    current_user: models.User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
 ):
-    profile = db.query(models.DriverProfile).filter(
-        models.DriverProfile.user_id == driver_id
-    ).first()
-    
-    if not profile:
+    result = await driver_review.review(db, current_user.id, [driver_id], approve=True)
+    if result[driver_id]["status"] == driver_review.NOT_FOUND:
         raise HTTPException(status_code=404, detail="Driver profile not found")
     
-    # Update all documents
-    documents = db.query(models.DriverDocument).filter(
-        models.DriverDocument.driver_profile_id == profile.id
-    ).all()
-    
-    for doc in documents:
-        doc.status = models.DocumentStatus.APPROVED
-        doc.reviewed_by = current_user.id
-        doc.reviewed_at = datetime.now()
-    
-    profile.documents_status = models.DocumentStatus.APPROVED
-    profile.is_verified = True
-    
-    # Log admin action
-    admin_action = models.AdminAction(
-        admin_id=current_user.id,
-        action_type="approve_driver",
-        target_user_id=driver_id,
-        details="Driver approved"
-    )
-    db.add(admin_action)
-    
-    db.commit()
+    invalidate_on_commit(db, driver_id)
+    await audit_log.record(db, *driver_review.actions(current_user.id, result, approve=True))
+    await db.commit()
     
     return {"message": "Driver approved successfully"}
 
-@router.post("/drivers/{driver_id}/reject")
+@router.post("/drivers/{driver_id}/reject", response_model=schemas.Message)
 async def reject_driver(
     driver_id: int,
     reason: str = Form(...),
-    current_user: models.User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
 ):
-    profile = db.query(models.DriverProfile).filter(
-        models.DriverProfile.user_id == driver_id
-    ).first()
-    
-    if not profile:
+    result = await driver_review.review(db, current_user.id, [driver_id], approve=False, reason=reason)
+    if result[driver_id]["status"] == driver_review.NOT_FOUND:
         raise HTTPException(status_code=404, detail="Driver profile not found")
     
-    # Update all documents
-    documents = db.query(models.DriverDocument).filter(
-        models.DriverDocument.driver_profile_id == profile.id
-    ).all()
-    
-    for doc in documents:
-        doc.status = models.DocumentStatus.REJECTED
-        doc.reviewed_by = current_user.id
-        doc.reviewed_at = datetime.now()
-        doc.rejection_reason = reason
-    
-    profile.documents_status = models.DocumentStatus.REJECTED
-    profile.is_verified = False
-    
-    # Log admin action
-    admin_action = models.AdminAction(
-        admin_id=current_user.id,
-        action_type="reject_driver",
-        target_user_id=driver_id,
-        details=f"Driver rejected: {reason}"
-    )
-    db.add(admin_action)
-    
-    db.commit()
+    invalidate_on_commit(db, driver_id)
+    await audit_log.record(db, *driver_review.actions(current_user.id, result, approve=False, reason=reason))
+    await db.commit()
     
     return {"message": "Driver rejected"}
 
-@router.get("/orders/all")
+@router.post("/drivers/review", response_model=schemas.DriverReviewResponse)
+async def review_drivers(
+    data: schemas.DriverReviewRequest,
+    current_user: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Одобрить или отклонить пачку водителей в одной транзакции.
+
+    Ненайденные водители получают статус not_found и не мешают остальным.
+    """
+    approve = data.action == schemas.ReviewAction.APPROVE
+    if not approve and not data.reason:
+        raise HTTPException(status_code=400, detail="Rejection reason is required")
+    
+    result = await driver_review.review(db, current_user.id, data.driver_ids, approve, data.reason)
+    for driver_id, outcome in result.items():
+        if outcome["status"] != driver_review.NOT_FOUND:
+            invalidate_on_commit(db, driver_id)
+    await audit_log.record(db, *driver_review.actions(current_user.id, result, approve, data.reason))
+    await db.commit()
+    
+    return {"results": [{"driver_id": driver_id, **outcome} for driver_id, outcome in result.items()]}
+
+@router.get("/orders/all", response_model=schemas.Page[schemas.AdminOrderResponse])
 async def get_all_orders(
     status: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    current_user: models.User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(models.Order)
+    # Клиент и водитель - LEFT JOIN в том же запросе, их столбцы с префиксами
+    client, driver = aliased(models.User), aliased(models.User)
+    query = select(
+        *schemas.columns(models.Order, schemas.OrderResponse),
+        *schemas.columns(client, schemas.UserResponse, prefix="client__"),
+        *schemas.columns(driver, schemas.UserResponse, prefix="driver__")
+    ).outerjoin(
+        client, models.Order.client_id == client.id
+    ).outerjoin(
+        driver, models.Order.driver_id == driver.id
+    )
     
     if status:
-        query = query.filter(models.Order.status == status)
+        query = query.where(models.Order.status == status)
     
     if start_date:
         start = datetime.fromisoformat(start_date)
-        query = query.filter(models.Order.created_at >= start)
+        query = query.where(models.Order.created_at >= start)
     
     if end_date:
         end = datetime.fromisoformat(end_date)
-        query = query.filter(models.Order.created_at <= end)
-    
-    orders = query.order_by(models.Order.created_at.desc()).all()
+        query = query.where(models.Order.created_at <= end)
     
-    result = []
-    for order in orders:
-        client = db.query(models.User).filter(models.User.id == order.client_id).first()
-        driver = None
-        if order.driver_id:
-            driver = db.query(models.User).filter(models.User.id == order.driver_id).first()
-        
-        result.append({
-            "order": order,
-            "client": client,
-            "driver": driver
-        })
+    result = await fetch_page(db, query, models.Order, page)
     
+    result["items"] = [
+        {
+            "client": schemas.pop_prefixed(row, schemas.UserResponse, "client__"),
+            "driver": schemas.pop_prefixed(row, schemas.UserResponse, "driver__"),
+            "order": row
+        }
+        for row in result["items"]
+    ]
     return result
 
-@router.get("/statistics/full")
+@router.get("/audit", response_model=schemas.Page[schemas.AdminActionResponse])
+async def get_audit_log(
+    admin_id: Optional[int] = None,
+    target_user_id: Optional[int] = None,
+    action_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """История действий администраторов, новые первыми"""
+    # Сначала дописать буфер, чтобы в выдаче были и только что сделанные действия
+    await audit_log.flush()
+    
+    query = select(*schemas.columns(models.AdminAction, schemas.AdminActionResponse))
+    if admin_id is not None:
+        query = query.where(models.AdminAction.admin_id == admin_id)
+    if target_user_id is not None:
+        query = query.where(models.AdminAction.target_user_id == target_user_id)
+    if action_type:
+        query = query.where(models.AdminAction.action_type == action_type)
+    if start_date:
+        query = query.where(models.AdminAction.created_at >= datetime.fromisoformat(start_date))
+    if end_date:
+        query = query.where(models.AdminAction.created_at <= datetime.fromisoformat(end_date))
+    
+    return await fetch_page(db, query, models.AdminAction, page)
+
+@router.get("/statistics/full", response_model=schemas.FullStatistics, response_model_exclude_none=True)
 async def get_full_statistics(
     period: str = "month",  # day, week, month, year
-    current_user: models.User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    granularity: Optional[str] = None,  # hour, day, week, month
+    current_user: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
 ):
     now = datetime.now()
     
     if period == "day":
-        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     elif period == "week":
-        start_date = now - timedelta(days=now.weekday())
-        start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        start = now - timedelta(days=now.weekday())
+        start = start.replace(hour=0, minute=0, second=0, microsecond=0)
     elif period == "month":
-        start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     elif period == "year":
-        start_date = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
     else:
-        start_date = now - timedelta(days=30)
-    
-    # Get orders in period
-    orders = db.query(models.Order).filter(
-        models.Order.created_at >= start_date
-    ).all()
+        start = now - timedelta(days=30)
     
-    # User registrations in period
-    new_users = db.query(models.User).filter(
-        models.User.created_at >= start_date
-    ).count()
-    
-    new_clients = db.query(models.User).filter(
-        models.User.role == models.UserRole.CLIENT,
-        models.User.created_at >= start_date
-    ).count()
+    # Произвольный диапазон
+    end = now
+    if start_date:
+        start = datetime.fromisoformat(start_date)
+        period = "custom"
+    if end_date:
+        end = datetime.fromisoformat(end_date)
     
-    new_drivers = db.query(models.User).filter(
-        models.User.role == models.UserRole.DRIVER,
-        models.User.created_at >= start_date
-    ).count()
+    if granularity and granularity not in rollups.SERIES_GRANULARITIES:
+        raise HTTPException(status_code=400, detail="Unknown granularity")
     
-    # Order statistics
-    total_orders = len(orders)
-    completed_orders = sum(1 for o in orders if o.status == models.OrderStatus.COMPLETED)
-    cancelled_orders = sum(1 for o in orders if o.status == models.OrderStatus.CANCELLED)
+    # Счётчики читаются из корзин stats_buckets: O(корзин), а не O(заказов)
+    totals = await rollups.totals(db, start, end)
     
-    # Revenue
-    revenue = sum(o.final_price or 0 for o in orders if o.status == models.OrderStatus.COMPLETED)
+    total_orders = totals["orders_created"]
+    completed_orders = totals["orders_completed"]
+    cancelled_orders = totals["orders_cancelled"]
+    revenue = totals["revenue"]
     
     # Average order value
     avg_order_value = revenue / completed_orders if completed_orders > 0 else 0
     
-    return {
+    result = {
         "period": period,
-        "start_date": start_date,
-        "end_date": now,
-        "new_users": new_users,
-        "new_clients": new_clients,
-        "new_drivers": new_drivers,
+        "start_date": start,
+        "end_date": end,
+        "new_users": totals["new_users"],
+        "new_clients": totals["new_clients"],
+        "new_drivers": totals["new_drivers"],
         "orders": {
             "total": total_orders,
             "completed": completed_orders,
@@ -276,4 +289,23 @@ async def get_full_statistics(
         },
         "revenue": revenue,
         "average_order_value": avg_order_value
+    }
+    if granularity:
+        result["granularity"] = granularity
+        result["series"] = await rollups.series(db, start, end, granularity)
+    return result
+
+@router.get("/system/stats", response_model=Dict[str, Dict[str, Any]])
+async def get_system_stats(
+    current_user: Principal = Depends(require_admin)
+):
+    return {
+        "password_hashing": hasher.stats(),
+        "principal_cache": principal_cache.stats(),
+        "db_pool": pool_status(models.async_engine.pool),
+        "event_bus": bus.stats(),
+        "dispatcher": dispatcher.stats(),
+        "image_processing": image_processor.stats(),
+        "pages": page_cache.stats(),
+        "audit": audit_log.stats()
     }
\ No newline at end of file
@@ -1,31 +1,34 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Form
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from app import models
-from app.auth import get_db, authenticate_user, create_access_token, get_password_hash
+from app import models, rollups, schemas
+from app.auth import get_db, authenticate_user, create_access_token, get_token_from_request
+from app.principal_cache import principal_cache
+from app.hashing import hasher
 from app.config import settings
 
 router = APIRouter()
 
-@router.post("/register")
+@router.post("/register", response_model=schemas.UserCreated)
 async def register(
     email: str = Form(...),
     password: str = Form(...),
     full_name: str = Form(...),
     role: str = Form("client"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Регистрация нового пользователя"""
     # Check if user exists
-    db_user = db.query(models.User).filter(models.User.email == email).first()
+    db_user = await db.scalar(select(models.User).where(models.User.email == email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user
-    hashed_password = get_password_hash(password)
+    hashed_password = await hasher.hash(password)
     
     user = models.User(
         email=email,
@@ -34,14 +37,16 @@ async def register(
         role=role
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.flush()
+    await rollups.record(db, user.created_at, **rollups.user_deltas(role))
+    await db.commit()
+    await db.refresh(user)
     
     # If driver, create driver profile
     if role == "driver":
         driver_profile = models.DriverProfile(user_id=user.id)
         db.add(driver_profile)
-        db.commit()
+        await db.commit()
     
     return {"message": "User created successfully", "user_id": user.id}
 
@@ -50,10 +55,10 @@ async def login(
     request: Request,
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Вход в систему"""
-    user = authenticate_user(db, email, password)
+    user = await authenticate_user(db, email, password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -71,8 +76,12 @@ async def login(
     return response
 
 @router.post("/logout")
-async def logout():
+async def logout(request: Request):
     """Выход из системы"""
+    token = get_token_from_request(request)
+    if token:
+        principal_cache.discard(token[7:] if token.startswith("Bearer ") else token)
+    
     response = RedirectResponse(url="/", status_code=302)
     response.delete_cookie("access_token")
     return response
\ No newline at end of file
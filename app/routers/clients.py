@@ -1,30 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Form
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+from typing import Optional
 
-from app import schemas, models, auth
-from app.auth import get_db, require_client
+from app import schemas, models, auth, geo, rollups
+from app.events import OrderEventType, bus
+from app.auth import Principal, get_db, require_client
+from app.pagination import PageParams, fetch_page
 
 router = APIRouter()
 
 @router.get("/profile", response_model=schemas.UserResponse)
 async def get_client_profile(
-    current_user: models.User = Depends(require_client),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_client),
+    db: AsyncSession = Depends(get_db)
 ):
     return current_user
 
-@router.get("/orders")
+@router.get("/orders", response_model=schemas.Page[schemas.OrderResponse])
 async def get_client_orders(
-    current_user: models.User = Depends(require_client),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(require_client),
+    db: AsyncSession = Depends(get_db)
 ):
-    orders = db.query(models.Order).filter(
+    query = select(*schemas.columns(models.Order, schemas.OrderResponse)).where(
         models.Order.client_id == current_user.id
-    ).order_by(models.Order.created_at.desc()).all()
-    return orders
+    )
+    return await fetch_page(db, query, models.Order, page)
 
-@router.post("/orders/create")
+@router.post("/orders/create", response_model=schemas.OrderCreated)
 async def create_order_web(
     request: Request,
     pickup_location: str = Form(...),
@@ -33,8 +38,12 @@ async def create_order_web(
     passengers_count: int = Form(...),
     luggage_count: int = Form(...),
     client_price: float = Form(...),
-    current_user: models.User = Depends(require_client),
-    db: Session = Depends(get_db)
+    pickup_lat: Optional[float] = Form(None),
+    pickup_lng: Optional[float] = Form(None),
+    dropoff_lat: Optional[float] = Form(None),
+    dropoff_lng: Optional[float] = Form(None),
+    current_user: Principal = Depends(require_client),
+    db: AsyncSession = Depends(get_db)
 ):
     pickup_datetime = datetime.fromisoformat(pickup_time)
     
@@ -46,40 +55,52 @@ async def create_order_web(
         passengers_count=passengers_count,
         luggage_count=luggage_count,
         client_price=client_price,
-        status=models.OrderStatus.PENDING
+        status=models.OrderStatus.PENDING,
+        **geo.order_coordinates(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng)
     )
     
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    await db.flush()
+    await rollups.record(db, order.created_at, orders_created=1)
+    await db.commit()
+    await db.refresh(order)
+    bus.publish(OrderEventType.CREATED, order)
     
     return {"message": "Order created successfully", "order_id": order.id}
 
-@router.get("/stats")
+@router.get("/stats", response_model=schemas.ClientStats)
 async def get_client_stats(
-    current_user: models.User = Depends(require_client),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_client),
+    db: AsyncSession = Depends(get_db)
 ):
-    total_orders = db.query(models.Order).filter(
-        models.Order.client_id == current_user.id
-    ).count()
+    total_orders = await db.scalar(
+        select(func.count(models.Order.id)).where(
+            models.Order.client_id == current_user.id
+        )
+    )
     
-    completed_orders = db.query(models.Order).filter(
-        models.Order.client_id == current_user.id,
-        models.Order.status == models.OrderStatus.COMPLETED
-    ).count()
+    completed_orders = await db.scalar(
+        select(func.count(models.Order.id)).where(
+            models.Order.client_id == current_user.id,
+            models.Order.status == models.OrderStatus.COMPLETED
+        )
+    )
     
-    pending_orders = db.query(models.Order).filter(
-        models.Order.client_id == current_user.id,
-        models.Order.status == models.OrderStatus.PENDING
-    ).count()
+    pending_orders = await db.scalar(
+        select(func.count(models.Order.id)).where(
+            models.Order.client_id == current_user.id,
+            models.Order.status == models.OrderStatus.PENDING
+        )
+    )
     
-    total_spent = db.query(models.Order).filter(
-        models.Order.client_id == current_user.id,
-        models.Order.status == models.OrderStatus.COMPLETED
-    ).with_entities(models.Order.final_price).all()
+    total_spent = await db.scalars(
+        select(models.Order.final_price).where(
+            models.Order.client_id == current_user.id,
+            models.Order.status == models.OrderStatus.COMPLETED
+        )
+    )
     
-    total_spent_sum = sum([order[0] or 0 for order in total_spent])
+    total_spent_sum = sum([price or 0 for price in total_spent])
     
     return {
         "total_orders": total_orders,
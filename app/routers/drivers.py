@@ -1,105 +1,65 @@
 # app/routers/drivers.py
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
-from sqlalchemy.orm import Session
-from typing import List
-import shutil
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
 from datetime import datetime
 from pathlib import Path
 
-from app import models, auth
-from app.auth import get_db, require_driver
+from app import models, schemas, auth, geo, order_state, rollups, uploads
+from app.auth import Principal, get_db, require_driver
+from app.dispatch import dispatcher, presence
+from app.events import OrderEventType, bus
+from app.images import RENDITION_FIELDS, image_processor
+from app.storage import blob_key, storage
+from app.upload_sessions import upload_sessions
+from app.pagination import PageParams, fetch_page
 from app.config import settings
 
 router = APIRouter()
 
-@router.get("/profile")
+@router.get("/profile", response_model=schemas.DriverAccountResponse)
 async def get_driver_profile(
     request: Request,
-    current_user: models.User = Depends(require_driver),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_driver),
+    db: AsyncSession = Depends(get_db)
 ):
     """Получение профиля водителя"""
-    profile = db.query(models.DriverProfile).filter(
-        models.DriverProfile.user_id == current_user.id
-    ).first()
-    
-    documents = []
-    cars = []
-    
-    if profile:
-        documents = db.query(models.DriverDocument).filter(
-            models.DriverDocument.driver_profile_id == profile.id
-        ).all()
-        cars = db.query(models.Car).filter(
-            models.Car.driver_profile_id == profile.id
-        ).all()
-    
-    # Преобразуем документы в словари для JSON
-    docs_list = []
-    for doc in documents:
-        docs_list.append({
-            "id": doc.id,
-            "document_type": doc.document_type,
-            "file_path": doc.file_path,
-            "side": doc.side,
-            "status": doc.status,
-            "uploaded_at": doc.uploaded_at
-        })
-    
-    # Преобразуем машины в словари
-    cars_list = []
-    for car in cars:
-        cars_list.append({
-            "id": car.id,
-            "make": car.make,
-            "model": car.model,
-            "year": car.year,
-            "color": car.color,
-            "license_plate": car.license_plate,
-            "capacity": car.capacity,
-            "has_air_conditioning": car.has_air_conditioning,
-            "has_wifi": car.has_wifi
-        })
-    
-    profile_dict = None
-    if profile:
-        profile_dict = {
-            "id": profile.id,
-            "phone": profile.phone,
-            "experience_years": profile.experience_years,
-            "bio": profile.bio,
-            "documents_status": profile.documents_status,
-            "is_verified": profile.is_verified,
-            "rating": profile.rating,
-            "total_trips": profile.total_trips
-        }
+    profile = await db.scalar(
+        select(models.DriverProfile).where(
+            models.DriverProfile.user_id == current_user.id
+        ).options(
+            selectinload(models.DriverProfile.documents.and_(models.document_is_active())).load_only(
+                *schemas.columns(models.DriverDocument, schemas.DocumentResponse)
+            ),
+            selectinload(models.DriverProfile.cars)
+        )
+    )
     
+    # Поля отбирает и сериализует DriverAccountResponse
     return {
-        "user": {
-            "id": current_user.id,
-            "email": current_user.email,
-            "full_name": current_user.full_name,
-            "role": current_user.role,
-            "created_at": current_user.created_at
-        },
-        "profile": profile_dict,
-        "documents": docs_list,
-        "cars": cars_list
+        "user": current_user,
+        "profile": profile,
+        "documents": profile.documents if profile else [],
+        "cars": profile.cars if profile else []
     }
 
-@router.post("/profile/update")
+@router.post("/profile/update", response_model=schemas.Message)
 async def update_driver_profile(
     request: Request,
     phone: str = Form(...),
     experience_years: int = Form(...),
     bio: str = Form(None),
-    current_user: models.User = Depends(require_driver),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_driver),
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновление профиля водителя"""
-    profile = db.query(models.DriverProfile).filter(
-        models.DriverProfile.user_id == current_user.id
-    ).first()
+    profile = await db.scalar(
+        select(models.DriverProfile).where(
+            models.DriverProfile.user_id == current_user.id
+        )
+    )
     
     if not profile:
         profile = models.DriverProfile(user_id=current_user.id)
@@ -109,11 +69,11 @@ async def update_driver_profile(
     profile.experience_years = experience_years
     profile.bio = bio
     
-    db.commit()
+    await db.commit()
     
     return {"message": "Profile updated successfully"}
 
-@router.post("/cars/add")
+@router.post("/cars/add", response_model=schemas.CarCreated)
 async def add_car(
     request: Request,
     make: str = Form(...),
@@ -122,23 +82,28 @@ async def add_car(
     color: str = Form(...),
     license_plate: str = Form(...),
     capacity: int = Form(...),
+    luggage_capacity: Optional[int] = Form(None),
     has_air_conditioning: bool = Form(True),
     has_wifi: bool = Form(False),
-    current_user: models.User = Depends(require_driver),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_driver),
+    db: AsyncSession = Depends(get_db)
 ):
     """Добавление автомобиля"""
-    profile = db.query(models.DriverProfile).filter(
-        models.DriverProfile.user_id == current_user.id
-    ).first()
+    profile = await db.scalar(
+        select(models.DriverProfile).where(
+            models.DriverProfile.user_id == current_user.id
+        )
+    )
     
     if not profile:
         raise HTTPException(status_code=404, detail="Driver profile not found. Please update your profile first.")
     
     # Check if license plate already exists
-    existing_car = db.query(models.Car).filter(
-        models.Car.license_plate == license_plate
-    ).first()
+    existing_car = await db.scalar(
+        select(models.Car).where(
+            models.Car.license_plate == license_plate
+        )
+    )
     
     if existing_car:
         raise HTTPException(status_code=400, detail="License plate already registered")
@@ -151,20 +116,115 @@ async def add_car(
         color=color,
         license_plate=license_plate,
         capacity=capacity,
+        luggage_capacity=luggage_capacity,
         has_air_conditioning=has_air_conditioning,
         has_wifi=has_wifi
     )
     
     db.add(car)
-    db.commit()
+    await db.commit()
     
     return {"message": "Car added successfully", "car_id": car.id}
 
-@router.post("/documents/upload")
+# Файлов в одной загрузке документов: 4 фото машины + 5 документов
+DOCUMENT_UPLOAD_FILES = len(uploads.DOCUMENT_SLOTS)
+
+async def save_documents(db: AsyncSession, user_id: int, staged: dict) -> int:
+    """Сохранить принятые файлы {слот: StagedUpload} в хранилище и обновить версии документов.
+
+    Файл, совпадающий по хешу с активной версией слота, не создаёт новую
+    строку; одинаковое содержимое хранится одним блобом. Возвращает
+    число слотов, получивших новую версию.
+    """
+    profile = await db.scalar(
+        select(models.DriverProfile).where(
+            models.DriverProfile.user_id == user_id
+        )
+    )
+    
+    if not profile:
+        profile = models.DriverProfile(user_id=user_id)
+        db.add(profile)
+        await db.commit()
+        await db.refresh(profile)
+    
+    active = {
+        document.slot: document
+        for document in await db.scalars(
+            select(models.DriverDocument).where(
+                models.DriverDocument.driver_profile_id == profile.id,
+                models.document_is_active()
+            )
+        )
+    }
+    
+    now = datetime.utcnow()
+    documents = []
+    for slot, (_, _, document_type, side) in uploads.DOCUMENT_SLOTS.items():
+        upload = staged[slot]
+        current = active.get(slot)
+        if current is not None and current.content_hash == upload.sha256:
+            await uploads.discard(upload.temp_path)
+            continue
+        
+        key = blob_key(upload.sha256, upload.extension)
+        if await storage.exists(key):
+            await uploads.discard(upload.temp_path)
+        else:
+            await storage.put(key, upload.temp_path)
+        
+        if current is not None:
+            current.is_active = False
+            current.superseded_at = now
+        documents.append(models.DriverDocument(
+            driver_profile_id=profile.id,
+            document_type=document_type,
+            file_path=key,
+            side=side,
+            slot=slot,
+            version=current.version + 1 if current is not None else 1,
+            content_hash=upload.sha256,
+            status="pending"
+        ))
+    
+    if not documents:
+        return 0
+    
+    # Старые версии снимаются до вставки новых: уникальный индекс по активному слоту
+    await db.flush()
+    
+    # Для уже обработанного содержимого превью и миниатюры переиспользуются
+    processed = {
+        document.content_hash: document
+        for document in await db.scalars(
+            select(models.DriverDocument).where(
+                models.DriverDocument.content_hash.in_([document.content_hash for document in documents]),
+                models.DriverDocument.processed_at.is_not(None)
+            )
+        )
+    }
+    for document in documents:
+        source = processed.get(document.content_hash)
+        if source is not None:
+            for field in RENDITION_FIELDS:
+                setattr(document, field, getattr(source, field))
+    db.add_all(documents)
+    
+    # Update profile status
+    profile.documents_status = "pending"
+    
+    await db.flush()
+    document_ids = [document.id for document in documents if document.processed_at is None]
+    await db.commit()
+    # Превью и миниатюры строятся в фоне, ответ их не ждёт
+    image_processor.submit(document_ids)
+    return len(documents)
+
+@router.post("/documents/upload", response_model=schemas.DocumentsUploaded)
 async def upload_documents(
     request: Request,
-    current_user: models.User = Depends(require_driver),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_driver),
+    db: AsyncSession = Depends(get_db),
     car_photos: List[UploadFile] = File(..., description="4 photos of the car"),
     tech_passport_front: UploadFile = File(..., description="Technical passport front"),
     tech_passport_back: UploadFile = File(..., description="Technical passport back"),
@@ -177,125 +237,102 @@ async def upload_documents(
     if len(car_photos) != 4:
         raise HTTPException(status_code=400, detail="Please upload exactly 4 car photos")
     
-    profile = db.query(models.DriverProfile).filter(
-        models.DriverProfile.user_id == current_user.id
-    ).first()
-    
-    if not profile:
-        profile = models.DriverProfile(user_id=current_user.id)
-        db.add(profile)
-        db.commit()
-        db.refresh(profile)
-    
-    # Create user-specific directory
-    user_upload_dir = Path(settings.UPLOAD_DIR) / str(current_user.id)
-    user_upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Function to save file
-    async def save_file(file: UploadFile, subdir: str, filename: str) -> str:
-        # Create subdirectory
-        file_dir = user_upload_dir / subdir
-        file_dir.mkdir(parents=True, exist_ok=True)
-        
-        file_path = file_dir / filename
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Return relative path from upload directory
-        relative_path = Path(str(current_user.id)) / subdir / filename
-        return str(relative_path)
-    
-    # Save car photos
-    for i, photo in enumerate(car_photos):
-        file_path = await save_file(photo, "car_photos", f"car_photo_{i+1}.jpg")
-        document = models.DriverDocument(
-            driver_profile_id=profile.id,
-            document_type="car_photo",
-            file_path=file_path,
-            side=None,
-            status="pending"
-        )
-        db.add(document)
-    
-    # Save tech passport
-    tech_front_path = await save_file(tech_passport_front, "tech_passport", "front.jpg")
-    document = models.DriverDocument(
-        driver_profile_id=profile.id,
-        document_type="tech_passport",
-        file_path=tech_front_path,
-        side="front",
-        status="pending"
-    )
-    db.add(document)
-    
-    tech_back_path = await save_file(tech_passport_back, "tech_passport", "back.jpg")
-    document = models.DriverDocument(
-        driver_profile_id=profile.id,
-        document_type="tech_passport",
-        file_path=tech_back_path,
-        side="back",
-        status="pending"
-    )
-    db.add(document)
-    
-    # Save license
-    license_front_path = await save_file(license_front, "license", "front.jpg")
-    document = models.DriverDocument(
-        driver_profile_id=profile.id,
-        document_type="license",
-        file_path=license_front_path,
-        side="front",
-        status="pending"
-    )
-    db.add(document)
-    
-    license_back_path = await save_file(license_back, "license", "back.jpg")
-    document = models.DriverDocument(
-        driver_profile_id=profile.id,
-        document_type="license",
-        file_path=license_back_path,
-        side="back",
-        status="pending"
-    )
-    db.add(document)
+    files = {
+        **{f"car_photo_{i+1}": photo for i, photo in enumerate(car_photos)},
+        "tech_passport_front": tech_passport_front,
+        "tech_passport_back": tech_passport_back,
+        "license_front": license_front,
+        "license_back": license_back,
+        "selfie": selfie,
+    }
+    staging_dir = Path(settings.UPLOAD_DIR) / ".staging"
     
-    # Save selfie
-    selfie_path = await save_file(selfie, "selfie", "selfie.jpg")
-    document = models.DriverDocument(
-        driver_profile_id=profile.id,
-        document_type="selfie",
-        file_path=selfie_path,
-        side=None,
-        status="pending"
+    # Все файлы пишутся параллельно во временные; в хранилище - только если записались все
+    staged = await uploads.stage_all(
+        {slot: (file, staging_dir) for slot, file in files.items()},
+        settings.MAX_UPLOAD_SIZE
     )
-    db.add(document)
-    
-    # Update profile status
-    profile.documents_status = "pending"
+    updated = await save_documents(db, current_user.id, staged)
     
-    db.commit()
-    
-    return {"message": "Documents uploaded successfully. Waiting for admin approval."}
+    return {"message": "Documents uploaded successfully. Waiting for admin approval.", "updated": updated}
+
+# Возобновляемая загрузка: сессия -> PUT кусков по слотам со смещением -> finalize
+
+@router.post("/documents/uploads", status_code=201, response_model=schemas.UploadSessionResponse)
+async def create_upload_session(
+    data: schemas.UploadSessionCreate,
+    current_user: Principal = Depends(require_driver)
+):
+    """Начать загрузку документов по частям; sizes - размер каждого слота в байтах"""
+    session_id = await upload_sessions.create(current_user.id, data.sizes)
+    return await upload_sessions.get(session_id, current_user.id)
+
+@router.get("/documents/uploads/{session_id}", response_model=schemas.UploadSessionResponse)
+async def get_upload_session(
+    session_id: str,
+    current_user: Principal = Depends(require_driver)
+):
+    """Сколько байт каждого слота уже принято"""
+    return await upload_sessions.get(session_id, current_user.id)
 
-@router.get("/documents/status")
+@router.put("/documents/uploads/{session_id}/{slot}", response_model=schemas.UploadChunkResponse)
+async def upload_chunk(
+    session_id: str,
+    slot: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user: Principal = Depends(require_driver)
+):
+    """Дописать тело запроса в слот начиная с offset (должен совпадать с принятым)"""
+    session = await upload_sessions.get(session_id, current_user.id)
+    received = await upload_sessions.append(session, slot, offset, request.stream())
+    return {"slot": slot, "received": received, "size": session["files"][slot]["size"]}
+
+@router.post("/documents/uploads/{session_id}/finalize", response_model=schemas.DocumentsUploaded)
+async def finalize_upload_session(
+    session_id: str,
+    current_user: Principal = Depends(require_driver),
+    db: AsyncSession = Depends(get_db)
+):
+    """Перенести дописанные слоты в документы водителя"""
+    async with upload_sessions.locked(session_id, current_user.id) as session:
+        staged = await upload_sessions.stage(session)
+        updated = await save_documents(db, current_user.id, staged)
+    # Слоты уже перенесены в хранилище: дозапись после снятия замка получит 404
+    await upload_sessions.discard(session_id)
+    
+    return {"message": "Documents uploaded successfully. Waiting for admin approval.", "updated": updated}
+
+@router.delete("/documents/uploads/{session_id}", status_code=204)
+async def abort_upload_session(
+    session_id: str,
+    current_user: Principal = Depends(require_driver)
+):
+    await upload_sessions.get(session_id, current_user.id)
+    await upload_sessions.discard(session_id)
+
+@router.get("/documents/status", response_model=schemas.DocumentsStatusResponse)
 async def get_documents_status(
     request: Request,
-    current_user: models.User = Depends(require_driver),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_driver),
+    db: AsyncSession = Depends(get_db)
 ):
     """Получение статуса документов"""
-    profile = db.query(models.DriverProfile).filter(
-        models.DriverProfile.user_id == current_user.id
-    ).first()
+    profile = await db.scalar(
+        select(models.DriverProfile).where(
+            models.DriverProfile.user_id == current_user.id
+        )
+    )
     
     if not profile:
         return {"status": "not_found", "message": "Profile not found"}
     
-    documents = db.query(models.DriverDocument).filter(
-        models.DriverDocument.driver_profile_id == profile.id
-    ).all()
+    documents = [row._asdict() for row in await db.execute(
+        select(*schemas.columns(models.DriverDocument, schemas.DocumentResponse)).where(
+            models.DriverDocument.driver_profile_id == profile.id,
+            models.document_is_active()
+        )
+    )]
     
     return {
         "status": profile.documents_status,
@@ -304,113 +341,130 @@ async def get_documents_status(
         "documents": documents
     }
 
-@router.get("/available-orders")
+@router.get("/available-orders", response_model=schemas.Page[schemas.AvailableOrderResponse])
 async def get_available_orders(
     request: Request,
-    current_user: models.User = Depends(require_driver),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(10.0, gt=0, le=100),
+    current_user: Principal = Depends(require_driver),
+    db: AsyncSession = Depends(get_db)
 ):
     """Получение доступных заказов"""
     # Check if driver is verified
-    profile = db.query(models.DriverProfile).filter(
-        models.DriverProfile.user_id == current_user.id
-    ).first()
+    profile = await db.scalar(
+        select(models.DriverProfile).where(
+            models.DriverProfile.user_id == current_user.id
+        )
+    )
     
     if not profile or profile.documents_status != "approved":
         raise HTTPException(status_code=403, detail="Your account is not verified yet")
     
+    # Рядом с водителем: ближайшие заказы в радиусе, без курсора
+    if lat is not None and lng is not None:
+        nearby = await geo.nearby_pending_orders(db, lat, lng, radius_km, page.limit)
+        items = []
+        for distance, order in nearby:
+            item = schemas.AvailableOrderResponse.model_validate(order)
+            item.distance_km = round(distance, 3)
+            items.append(item)
+        return {"items": items, "next_cursor": None}
+    
     # Get pending orders
-    orders = db.query(models.Order).filter(
-        models.Order.status == "pending",
+    query = select(*schemas.columns(models.Order, schemas.AvailableOrderResponse)).where(
+        models.order_is_pending(),
         models.Order.pickup_time >= datetime.now()
-    ).order_by(models.Order.created_at.desc()).all()
-    
-    # Преобразуем в словари для JSON
-    orders_list = []
-    for order in orders:
-        orders_list.append({
-            "id": order.id,
-            "pickup_location": order.pickup_location,
-            "dropoff_location": order.dropoff_location,
-            "pickup_time": order.pickup_time,
-            "passengers_count": order.passengers_count,
-            "luggage_count": order.luggage_count,
-            "client_price": order.client_price,
-            "status": order.status,
-            "created_at": order.created_at
-        })
-    
-    return orders_list
+    )
+    return await fetch_page(db, query, models.Order, page)
 
-@router.post("/orders/{order_id}/accept")
+@router.post("/orders/{order_id}/accept", response_model=schemas.Message)
 async def accept_order(
     request: Request,
     order_id: int,
-    current_user: models.User = Depends(require_driver),
-    db: Session = Depends(get_db)
+    version: Optional[int] = None,
+    current_user: Principal = Depends(require_driver),
+    db: AsyncSession = Depends(get_db)
 ):
     """Принятие заказа водителем"""
-    # Check if driver is verified
-    profile = db.query(models.DriverProfile).filter(
-        models.DriverProfile.user_id == current_user.id
-    ).first()
-    
-    if not profile or profile.documents_status != "approved":
-        raise HTTPException(status_code=403, detail="Your account is not verified yet")
-    
-    # Get order
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    if order.status != "pending":
-        raise HTTPException(status_code=400, detail="Order is not available")
+    # Проверка верификации и статуса - внутри одного UPDATE
+    order = await order_state.accept(db, order_id, current_user.id, version)
     
-    # Accept order
-    order.driver_id = current_user.id
-    order.status = "accepted"
-    order.accepted_at = datetime.now()
-    
-    db.commit()
+    await rollups.record(db, order.created_at, orders_accepted=1)
+    await db.commit()
+    bus.publish(OrderEventType.ACCEPTED, order)
     
     return {"message": "Order accepted successfully"}
 
-@router.get("/stats")
+@router.post("/location", response_model=schemas.Message)
+async def update_location(
+    lat: float = Form(..., ge=-90, le=90),
+    lng: float = Form(..., ge=-180, le=180),
+    current_user: Principal = Depends(require_driver)
+):
+    """Текущее местоположение водителя для диспетчера"""
+    presence.update(current_user.id, lat, lng)
+    return {"message": "Location updated"}
+
+@router.post("/orders/{order_id}/decline", response_model=schemas.Message)
+async def decline_offer(
+    order_id: int,
+    current_user: Principal = Depends(require_driver)
+):
+    """Отказ от предложенного диспетчером заказа"""
+    if not dispatcher.decline(order_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Offer not found")
+    return {"message": "Offer declined"}
+
+@router.get("/stats", response_model=schemas.DriverStats)
 async def get_driver_stats(
     request: Request,
-    current_user: models.User = Depends(require_driver),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_driver),
+    db: AsyncSession = Depends(get_db)
 ):
     """Получение статистики водителя"""
-    profile = db.query(models.DriverProfile).filter(
-        models.DriverProfile.user_id == current_user.id
-    ).first()
+    profile = await db.scalar(
+        select(models.DriverProfile).where(
+            models.DriverProfile.user_id == current_user.id
+        )
+    )
     
     # Get order statistics
-    total_orders = db.query(models.Order).filter(
-        models.Order.driver_id == current_user.id
-    ).count()
+    total_orders = await db.scalar(
+        select(func.count(models.Order.id)).where(
+            models.Order.driver_id == current_user.id
+        )
+    )
     
-    completed_orders = db.query(models.Order).filter(
-        models.Order.driver_id == current_user.id,
-        models.Order.status == "completed"
-    ).count()
+    completed_orders = await db.scalar(
+        select(func.count(models.Order.id)).where(
+            models.Order.driver_id == current_user.id,
+            models.Order.status == "completed"
+        )
+    )
     
-    cancelled_orders = db.query(models.Order).filter(
-        models.Order.driver_id == current_user.id,
-        models.Order.status == "cancelled"
-    ).count()
+    cancelled_orders = await db.scalar(
+        select(func.count(models.Order.id)).where(
+            models.Order.driver_id == current_user.id,
+            models.Order.status == "cancelled"
+        )
+    )
     
-    pending_orders = db.query(models.Order).filter(
-        models.Order.driver_id == current_user.id,
-        models.Order.status == "accepted"
-    ).count()
+    pending_orders = await db.scalar(
+        select(func.count(models.Order.id)).where(
+            models.Order.driver_id == current_user.id,
+            models.Order.status == "accepted"
+        )
+    )
     
     # Calculate earnings
-    completed_trips = db.query(models.Order).filter(
-        models.Order.driver_id == current_user.id,
-        models.Order.status == "completed"
-    ).all()
+    completed_trips = await db.scalars(
+        select(models.Order).where(
+            models.Order.driver_id == current_user.id,
+            models.Order.status == "completed"
+        )
+    )
     
     total_earnings = sum([trip.final_price or trip.client_price or 0 for trip in completed_trips])
     
@@ -0,0 +1,99 @@
+# app/routers/events.py
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, auth, geo
+from app.auth import Principal, get_db
+from app.config import settings
+from app.dispatch import presence
+from app.events import OrderEvent, OrderEventType, RESYNC, bus
+
+router = APIRouter()
+
+# События, меняющие ленту доступных заказов
+PENDING_FEED = (OrderEventType.CREATED, OrderEventType.ACCEPTED, OrderEventType.CANCELLED)
+
+def format_event(event: OrderEvent) -> str:
+    data = orjson.dumps({"type": event.type, "order": event.order, **event.data}).decode()
+    return f"id: {event.id}\nevent: {event.type}\ndata: {data}\n\n"
+
+def within(event: OrderEvent, lat: float, lng: float, radius_km: float) -> bool:
+    order_lat, order_lng = event.order.get("pickup_lat"), event.order.get("pickup_lng")
+    if order_lat is None or order_lng is None:
+        # Без координат пропускаем только снятие заказа с ленты
+        return event.type != OrderEventType.CREATED
+    return geo.haversine_km(lat, lng, order_lat, order_lng) <= radius_km
+
+async def build_filter(current_user: Principal, db: AsyncSession, lat: Optional[float] = None,
+                       lng: Optional[float] = None, radius_km: float = 10.0):
+    """Какие события видит пользователь"""
+    if current_user.role == models.UserRole.ADMIN:
+        return lambda event: True
+
+    if current_user.role == models.UserRole.CLIENT:
+        return lambda event: event.client_id == current_user.id and event.type != OrderEventType.OFFERED
+
+    documents_status = await db.scalar(
+        select(models.DriverProfile.documents_status).where(
+            models.DriverProfile.user_id == current_user.id
+        )
+    )
+    approved = documents_status == "approved"
+    nearby_only = lat is not None and lng is not None
+    return lambda event: (
+        event.driver_id == current_user.id
+        or (
+            approved and event.type in PENDING_FEED
+            and (not nearby_only or within(event, lat, lng, radius_km))
+        )
+    )
+
+@router.get("/orders")
+async def order_events(
+    request: Request,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(10.0, gt=0, le=100),
+    current_user: Principal = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """SSE-поток событий заказов вместо периодического опроса.
+
+    Водитель с lat/lng получает только заказы в радиусе radius_km и,
+    пока поток открыт, считается на линии для диспетчера.
+    """
+    subscription = bus.subscribe(await build_filter(current_user, db, lat, lng, radius_km))
+    # Соединение с базой не должно висеть всё время жизни потока
+    await db.close()
+    on_line = current_user.role == models.UserRole.DRIVER and lat is not None and lng is not None
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                if on_line:
+                    presence.touch(current_user.id, lat, lng)
+                event = await subscription.get(timeout=settings.EVENT_HEARTBEAT_SECONDS)
+                if await request.is_disconnected():
+                    break
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                yield format_event(event)
+                if event.type == RESYNC:
+                    break
+        finally:
+            bus.unsubscribe(subscription)
+            if on_line:
+                presence.discard(current_user.id)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,68 @@
+# app/routers/files.py
+import asyncio
+from pathlib import Path, PurePosixPath
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import RedirectResponse
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.auth import Principal, get_current_active_user, get_db
+from app.config import settings
+from app.files import IMMUTABLE, REVALIDATE, serve_file
+from app.storage import BLOB_PREFIX, storage
+
+router = APIRouter()
+
+def not_found():
+    return HTTPException(status_code=404, detail="File not found")
+
+@router.api_route("/{key:path}", methods=["GET", "HEAD"])
+async def get_upload(
+    key: str,
+    request: Request,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Файл документа водителя: только владельцу и администраторам"""
+    parts = PurePosixPath(key).parts
+    # Служебные каталоги (.sessions, .staging) и выход за пределы хранилища
+    if not parts or any(part.startswith(".") for part in parts):
+        raise not_found()
+    is_admin = current_user.role == models.UserRole.ADMIN
+
+    if key.startswith(BLOB_PREFIX):
+        content_hash = PurePosixPath(key).name.split(".")[0]
+        owners = (await db.scalars(
+            select(models.DriverProfile.user_id)
+            .join(models.DriverDocument.driver_profile)
+            .where(
+                models.DriverDocument.content_hash == content_hash,
+                or_(
+                    models.DriverDocument.file_path == key,
+                    models.DriverDocument.preview_path == key,
+                    models.DriverDocument.thumbnail_path == key
+                )
+            )
+        )).all()
+        if not owners or not (is_admin or current_user.id in owners):
+            raise not_found()
+        # Блобы не перезаписываются: снятие EXIF создаёт новый ключ
+        cache_control = IMMUTABLE
+
+        url = storage.url(key)
+        if url is not None:
+            return RedirectResponse(url, status_code=307)
+        path = storage.local_path(key)
+    else:
+        # Файлы, загруженные до хранилища по хешу: <user_id>/<подкаталог>/<имя>
+        if not (is_admin or parts[0] == str(current_user.id)):
+            raise not_found()
+        cache_control = REVALIDATE
+        path = Path(settings.UPLOAD_DIR) / key
+
+    try:
+        return await asyncio.to_thread(serve_file, request, path, cache_control)
+    except (FileNotFoundError, NotADirectoryError):
+        raise not_found()
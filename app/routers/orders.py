@@ -1,18 +1,22 @@
 # app/routers/orders.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+from typing import Optional
 
-from app import models, auth
-from app.auth import get_db, require_client, require_driver
+from app import models, schemas, auth, geo, order_state, rollups
+from app.auth import Principal, get_db, require_client, require_driver
+from app.events import OrderEventType, bus
+from app.pagination import PageParams, fetch_page
 
 router = APIRouter()
 
-@router.post("/create")
+@router.post("/create", response_model=schemas.OrderResponse)
 async def create_order(
     order_data: dict,
-    current_user: models.User = Depends(require_client),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_client),
+    db: AsyncSession = Depends(get_db)
 ):
     db_order = models.Order(
         client_id=current_user.id,
@@ -22,30 +26,38 @@ async def create_order(
         passengers_count=order_data.get("passengers_count"),
         luggage_count=order_data.get("luggage_count"),
         client_price=order_data.get("client_price"),
-        status="pending"
+        status="pending",
+        **geo.order_coordinates(
+            order_data.get("pickup_lat"), order_data.get("pickup_lng"),
+            order_data.get("dropoff_lat"), order_data.get("dropoff_lng")
+        )
     )
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    await db.flush()
+    await rollups.record(db, db_order.created_at, orders_created=1)
+    await db.commit()
+    await db.refresh(db_order)
+    bus.publish(OrderEventType.CREATED, db_order)
     return db_order
 
-@router.get("/driver/my-orders")
+@router.get("/driver/my-orders", response_model=schemas.Page[schemas.OrderResponse])
 async def get_driver_orders(
-    current_user: models.User = Depends(require_driver),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(require_driver),
+    db: AsyncSession = Depends(get_db)
 ):
-    orders = db.query(models.Order).filter(
+    query = select(*schemas.columns(models.Order, schemas.OrderResponse)).where(
         models.Order.driver_id == current_user.id
-    ).order_by(models.Order.created_at.desc()).all()
-    return orders
+    )
+    return await fetch_page(db, query, models.Order, page)
 
-@router.get("/{order_id}")
+@router.get("/{order_id}", response_model=schemas.OrderResponse)
 async def get_order(
     order_id: int,
-    current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    order = await db.get(models.Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -57,57 +69,32 @@ async def get_order(
     
     return order
 
-@router.post("/{order_id}/complete")
+@router.post("/{order_id}/complete", response_model=schemas.Message)
 async def complete_order(
     order_id: int,
-    current_user: models.User = Depends(require_driver),
-    db: Session = Depends(get_db)
+    version: Optional[int] = None,
+    current_user: Principal = Depends(require_driver),
+    db: AsyncSession = Depends(get_db)
 ):
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    if order.driver_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not your order")
+    order = await order_state.complete(db, order_id, current_user.id, version)
     
-    if order.status != "accepted":
-        raise HTTPException(status_code=400, detail="Order cannot be completed")
-    
-    order.status = "completed"
-    order.completed_at = datetime.now()
-    order.final_price = order.client_price
-    
-    profile = db.query(models.DriverProfile).filter(
-        models.DriverProfile.user_id == current_user.id
-    ).first()
-    if profile:
-        profile.total_trips += 1
-    
-    db.commit()
+    await rollups.record(db, order.created_at, orders_completed=1, revenue=order.final_price or 0)
+    await db.commit()
+    bus.publish(OrderEventType.COMPLETED, order)
     
     return {"message": "Order completed successfully"}
 
-@router.post("/{order_id}/cancel")
+@router.post("/{order_id}/cancel", response_model=schemas.Message)
 async def cancel_order(
     order_id: int,
-    current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    version: Optional[int] = None,
+    current_user: Principal = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    if current_user.role == "client" and order.client_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to cancel this order")
-    
-    if current_user.role == "driver" and order.driver_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to cancel this order")
-    
-    if order.status in ["completed", "cancelled"]:
-        raise HTTPException(status_code=400, detail="Order already completed or cancelled")
-    
-    order.status = "cancelled"
+    order = await order_state.cancel(db, order_id, current_user, version)
     
-    db.commit()
+    await rollups.record(db, order.created_at, orders_cancelled=1)
+    await db.commit()
+    bus.publish(OrderEventType.CANCELLED, order)
     
     return {"message": "Order cancelled successfully"}
\ No newline at end of file
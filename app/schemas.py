@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional, List
+from typing import Dict, Generic, Optional, List, TypeVar
 from datetime import datetime
 from enum import Enum
 
@@ -19,6 +19,44 @@ class OrderStatus(str, Enum):
     COMPLETED = "completed"
     CANCELLED = "cancelled"
 
+T = TypeVar("T")
+
+def columns(model, schema, prefix: str = "") -> list:
+    """Столбцы модели, которые нужны схеме ответа: запрос выбирает только их.
+
+    prefix - метки столбцов присоединённой модели, чтобы имена не совпали
+    """
+    names = [name for name in schema.model_fields if hasattr(model, name)]
+    if prefix:
+        return [getattr(model, name).label(prefix + name) for name in names]
+    return [getattr(model, name) for name in names]
+
+def pop_prefixed(row: dict, schema, prefix: str) -> Optional[dict]:
+    """Вынуть из строки столбцы columns(..., prefix); None, если LEFT JOIN не нашёл строку"""
+    item = {name: row.pop(prefix + name) for name in schema.model_fields if prefix + name in row}
+    return item if item.get("id") is not None else None
+
+# Keyset-страница списка
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+# Ответы действий
+class Message(BaseModel):
+    message: str
+
+class UserCreated(Message):
+    user_id: int
+
+class OrderCreated(Message):
+    order_id: int
+
+class CarCreated(Message):
+    car_id: int
+
+class DocumentsUploaded(Message):
+    updated: int
+
 # User schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -33,6 +71,8 @@ class UserLogin(BaseModel):
     password: str
 
 class UserResponse(UserBase):
+    # Ответ не перепроверяет адрес: он проверен при регистрации
+    email: str
     id: int
     role: UserRole
     is_active: bool
@@ -51,6 +91,9 @@ class DriverProfileCreate(DriverProfileBase):
     pass
 
 class DriverProfileResponse(DriverProfileBase):
+    # Профиль создаётся при регистрации, телефон и стаж заполняются позже
+    phone: Optional[str] = None
+    experience_years: Optional[int] = None
     id: int
     user_id: int
     documents_status: DocumentStatus
@@ -70,6 +113,7 @@ class CarBase(BaseModel):
     color: str
     license_plate: str
     capacity: int
+    luggage_capacity: Optional[int] = None
     has_air_conditioning: bool = True
     has_wifi: bool = False
 
@@ -96,39 +140,149 @@ class OrderBase(BaseModel):
 class OrderCreate(OrderBase):
     pass
 
-class OrderResponse(OrderBase):
+# Ограничения OrderBase проверяют ввод; ответы отдают то, что лежит в базе
+class OrderSummary(BaseModel):
+    """Публичная часть заказа (лента доступных заказов)"""
     id: int
-    client_id: int
-    driver_id: Optional[int] = None
-    final_price: Optional[float] = None
+    pickup_location: str
+    dropoff_location: str
+    pickup_lat: Optional[float] = None
+    pickup_lng: Optional[float] = None
+    dropoff_lat: Optional[float] = None
+    dropoff_lng: Optional[float] = None
+    pickup_time: datetime
+    passengers_count: int
+    luggage_count: int
+    client_price: float
     status: OrderStatus
+    version: int
     created_at: datetime
-    accepted_at: Optional[datetime] = None
-    completed_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
+class AvailableOrderResponse(OrderSummary):
+    distance_km: Optional[float] = None
+
+class OrderResponse(OrderSummary):
+    client_id: int
+    driver_id: Optional[int] = None
+    final_price: Optional[float] = None
+    accepted_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
 # Document schemas
 class DocumentResponse(BaseModel):
     id: int
     document_type: str
     file_path: str
     side: Optional[str] = None
+    slot: Optional[str] = None
+    version: int
     uploaded_at: datetime
     status: DocumentStatus
+    reviewed_at: Optional[datetime] = None
+    rejection_reason: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    preview_path: Optional[str] = None
+    preview_width: Optional[int] = None
+    preview_height: Optional[int] = None
+    thumbnail_path: Optional[str] = None
+    thumbnail_width: Optional[int] = None
+    thumbnail_height: Optional[int] = None
+    processed_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
+class DocumentsStatusResponse(BaseModel):
+    status: str
+    message: Optional[str] = None
+    is_verified: bool = False
+    documents_count: int = 0
+    documents: List[DocumentResponse] = []
+
+class DriverAccountResponse(BaseModel):
+    user: UserResponse
+    profile: Optional[DriverProfileResponse] = None
+    documents: List[DocumentResponse]
+    cars: List[CarResponse]
+
+class UploadSessionCreate(BaseModel):
+    sizes: Dict[str, int]
+
+class UploadProgress(BaseModel):
+    size: int
+    received: int
+
+class UploadSessionResponse(BaseModel):
+    session_id: str
+    chunk_size: int
+    expires_at: datetime
+    files: Dict[str, UploadProgress]
+    complete: bool
+
+class UploadChunkResponse(BaseModel):
+    slot: str
+    received: int
+    size: int
+
+# Admin review schemas
+class PendingDriverResponse(BaseModel):
+    profile_id: int
+    user: Optional[UserResponse] = None
+    documents: List[DocumentResponse]
+    submitted_at: Optional[datetime] = None
+
+class ReviewAction(str, Enum):
+    APPROVE = "approve"
+    REJECT = "reject"
+
+# Водителей в одной пачке проверки
+REVIEW_BATCH_LIMIT = 500
+
+class DriverReviewRequest(BaseModel):
+    driver_ids: List[int] = Field(min_length=1, max_length=REVIEW_BATCH_LIMIT)
+    action: ReviewAction
+    reason: Optional[str] = None
+
+class DriverReviewResult(BaseModel):
+    driver_id: int
+    status: str  # approved, rejected или not_found
+    documents: int
+
+class DriverReviewResponse(BaseModel):
+    results: List[DriverReviewResult]
+
+class AdminActionResponse(BaseModel):
+    id: int
+    admin_id: int
+    action_type: str
+    target_user_id: Optional[int] = None
+    details: Optional[str] = None
+    created_at: datetime
+
+class AdminOrderResponse(BaseModel):
+    order: OrderResponse
+    client: Optional[UserResponse] = None
+    driver: Optional[UserResponse] = None
+
 # Statistics schemas
+class ClientStats(BaseModel):
+    total_orders: int
+    completed_orders: int
+    pending_orders: int
+    total_spent: float
+
 class DriverStats(BaseModel):
     total_trips: int
+    completed_trips: int
+    cancelled_trips: int
+    pending_trips: int
     total_earnings: float
-    average_rating: float
-    completed_orders: int
-    cancelled_orders: int
-    pending_orders: int
+    rating: float
+    verification_status: str
 
 class AdminStats(BaseModel):
     total_users: int
@@ -138,4 +292,37 @@ class AdminStats(BaseModel):
     total_orders: int
     pending_orders: int
     completed_orders: int
-    total_revenue: float
\ No newline at end of file
+    total_revenue: float
+
+class AdminDashboard(BaseModel):
+    stats: AdminStats
+
+class OrderCounts(BaseModel):
+    total: int
+    completed: int
+    cancelled: int
+    pending: int
+
+class StatsPoint(BaseModel):
+    bucket_start: datetime
+    orders_created: int
+    orders_accepted: int
+    orders_completed: int
+    orders_cancelled: int
+    revenue: float
+    new_users: int
+    new_clients: int
+    new_drivers: int
+
+class FullStatistics(BaseModel):
+    period: str
+    start_date: datetime
+    end_date: datetime
+    new_users: int
+    new_clients: int
+    new_drivers: int
+    orders: OrderCounts
+    revenue: float
+    average_order_value: float
+    granularity: Optional[str] = None
+    series: Optional[List[StatsPoint]] = None
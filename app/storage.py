@@ -0,0 +1,161 @@
+# app/storage.py
+import asyncio
+import os
+import shutil
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from app.config import settings
+
+# Блобы документов адресуются SHA-256 загруженных байт
+BLOB_PREFIX = "blobs/"
+
+def blob_key(sha256: str, extension: str) -> str:
+    return f"{BLOB_PREFIX}{sha256[:2]}/{sha256}{extension}"
+
+class Storage(ABC):
+    """Хранилище файлов по ключам вида blobs/ab/<sha256>.jpg.
+
+    Методы асинхронные; блокирующий ввод-вывод выполняется в потоках.
+    Контракт проверяет python check_storage.py.
+    """
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def put(self, key: str, source: Path):
+        """Сохранить локальный файл под ключом; source после вызова не существует"""
+
+    @abstractmethod
+    async def fetch(self, key: str, target: Path):
+        """Скопировать содержимое ключа в локальный файл"""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Удалить ключ; отсутствующий ключ - не ошибка"""
+
+    @abstractmethod
+    async def list(self, prefix: str) -> List[Tuple[str, datetime]]:
+        """[(ключ, время изменения в UTC)] для сборки мусора"""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Путь на диске, если хранилище локальное: тогда обработка идёт на месте"""
+        return None
+
+    def url(self, key: str, expires: int = 3600) -> Optional[str]:
+        """Временная прямая ссылка, если хранилище умеет их выдавать"""
+        return None
+
+class LocalStorage(Storage):
+    """Каталог на диске; ключ - путь относительно root (UPLOAD_DIR)"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self.local_path(key).is_file)
+
+    async def put(self, key: str, source: Path):
+        target = self.local_path(key)
+        await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(os.replace, source, target)
+
+    async def fetch(self, key: str, target: Path):
+        await asyncio.to_thread(shutil.copyfile, self.local_path(key), target)
+
+    async def delete(self, key: str):
+        try:
+            await asyncio.to_thread(os.remove, self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _list(self, prefix: str) -> List[Tuple[str, datetime]]:
+        base = self.local_path(prefix)
+        if not base.is_dir():
+            return []
+        return [
+            (path.relative_to(self.root).as_posix(),
+             datetime.fromtimestamp(path.stat().st_mtime, timezone.utc))
+            for path in base.rglob("*") if path.is_file()
+        ]
+
+    async def list(self, prefix: str) -> List[Tuple[str, datetime]]:
+        return await asyncio.to_thread(self._list, prefix)
+
+class S3Storage(Storage):
+    """S3-совместимое хранилище (AWS, MinIO, moto) через boto3.
+
+    boto3 - необязательная зависимость, нужна только при STORAGE_BACKEND=s3.
+    """
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, region: Optional[str] = None,
+                 access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from e
+        self.bucket = bucket
+        self._client_error = ClientError
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
+
+    def url(self, key: str, expires: int = 3600) -> str:
+        return self._client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=expires
+        )
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await asyncio.to_thread(self._client.head_object, Bucket=self.bucket, Key=key)
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    async def put(self, key: str, source: Path):
+        await asyncio.to_thread(self._client.upload_file, str(source), self.bucket, key)
+        await asyncio.to_thread(os.remove, source)
+
+    async def fetch(self, key: str, target: Path):
+        await asyncio.to_thread(self._client.download_file, self.bucket, key, str(target))
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._client.delete_object, Bucket=self.bucket, Key=key)
+
+    def _list(self, prefix: str) -> List[Tuple[str, datetime]]:
+        paginator = self._client.get_paginator("list_objects_v2")
+        return [
+            (item["Key"], item["LastModified"])
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix)
+            for item in page.get("Contents", [])
+        ]
+
+    async def list(self, prefix: str) -> List[Tuple[str, datetime]]:
+        return await asyncio.to_thread(self._list, prefix)
+
+def create_storage() -> Storage:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL or None,
+            region=settings.S3_REGION or None,
+            access_key_id=settings.S3_ACCESS_KEY_ID or None,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+        )
+    return LocalStorage(Path(settings.UPLOAD_DIR))
+
+storage = create_storage()
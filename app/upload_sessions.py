@@ -0,0 +1,235 @@
+# app/upload_sessions.py
+import asyncio
+import json
+import logging
+import re
+import shutil
+import time
+import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException
+
+from app.config import settings
+from app.uploads import CHUNK_SIZE, DOCUMENT_SLOTS, StagedUpload, detect_extension, file_sha256
+
+logger = logging.getLogger(__name__)
+
+SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+MANIFEST = "manifest.json"
+
+class UploadSessions:
+    """Возобновляемая загрузка документов водителя.
+
+    Сессия - каталог root/<id> с manifest.json (владелец и заявленные
+    размеры слотов) и файлом <слот>.part на каждый документ. Принятое
+    количество байт - это размер .part, поэтому после обрыва клиент
+    спрашивает прогресс и продолжает с него. Сессия истекает через ttl
+    после последнего записанного куска; просроченные каталоги удаляет
+    фоновая сборка мусора.
+    """
+
+    def __init__(self, root: Path, ttl: float, gc_interval: float):
+        self.root = root
+        self.ttl = ttl
+        self.gc_interval = gc_interval
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.collected = 0
+
+    def _dir(self, session_id: str) -> Path:
+        if not SESSION_ID.match(session_id):
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        return self.root / session_id
+
+    def _lock(self, session_id: str, slot: str) -> asyncio.Lock:
+        return self._locks.setdefault((session_id, slot), asyncio.Lock())
+
+    async def create(self, user_id: int, sizes: Dict[str, int]) -> str:
+        if set(sizes) != set(DOCUMENT_SLOTS):
+            raise HTTPException(status_code=400, detail=f"Expected sizes for: {', '.join(DOCUMENT_SLOTS)}")
+        for slot, size in sizes.items():
+            if not 0 < size <= settings.MAX_UPLOAD_SIZE:
+                raise HTTPException(status_code=413, detail=f"File too large: {slot}")
+
+        session_id = uuid.uuid4().hex
+        directory = self.root / session_id
+        await aiofiles.os.makedirs(directory)
+        for slot in sizes:
+            async with aiofiles.open(directory / f"{slot}.part", "wb"):
+                pass
+        async with aiofiles.open(directory / MANIFEST, "w") as manifest:
+            await manifest.write(json.dumps({"user_id": user_id, "sizes": sizes}))
+        return session_id
+
+    async def get(self, session_id: str, user_id: int) -> dict:
+        """Манифест и прогресс сессии; чужая или истёкшая сессия - 404"""
+        directory = self._dir(session_id)
+        try:
+            async with aiofiles.open(directory / MANIFEST) as manifest:
+                data = json.loads(await manifest.read())
+            received = {}
+            last_activity = (await aiofiles.os.stat(directory / MANIFEST)).st_mtime
+            for slot in data["sizes"]:
+                stat = await aiofiles.os.stat(directory / f"{slot}.part")
+                received[slot] = stat.st_size
+                last_activity = max(last_activity, stat.st_mtime)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        if data["user_id"] != user_id or last_activity + self.ttl < time.time():
+            raise HTTPException(status_code=404, detail="Upload session not found")
+
+        return {
+            "session_id": session_id,
+            "chunk_size": settings.UPLOAD_CHUNK_SIZE,
+            "expires_at": datetime.fromtimestamp(last_activity + self.ttl),
+            "files": {
+                slot: {"size": size, "received": received[slot]}
+                for slot, size in data["sizes"].items()
+            },
+            "complete": all(received[slot] == size for slot, size in data["sizes"].items()),
+        }
+
+    async def append(self, session: dict, slot: str, offset: int, body: AsyncIterator[bytes]) -> int:
+        """Дописать кусок в слот с позиции offset; вернуть принятое число байт"""
+        if slot not in session["files"]:
+            raise HTTPException(status_code=404, detail=f"Unknown document slot: {slot}")
+        path = self.root / session["session_id"] / f"{slot}.part"
+        size = session["files"][slot]["size"]
+
+        async with self._lock(session["session_id"], slot):
+            try:
+                received = (await aiofiles.os.stat(path)).st_size
+            except FileNotFoundError:
+                raise HTTPException(status_code=404, detail="Upload session not found")
+            if offset != received:
+                # Клиент продолжает не с того места: сообщаем, сколько уже есть
+                raise HTTPException(
+                    status_code=409,
+                    detail={"message": "Offset does not match received bytes", "received": received}
+                )
+            async with aiofiles.open(path, "ab") as part:
+                async for chunk in body:
+                    if not chunk:
+                        continue
+                    if received == 0 and len(chunk) >= 12 and detect_extension(chunk) is None:
+                        raise HTTPException(status_code=415, detail=f"Unsupported file type: {slot}")
+                    if received + len(chunk) > size:
+                        raise HTTPException(status_code=413, detail=f"Chunk exceeds declared size: {slot}")
+                    await part.write(chunk)
+                    received += len(chunk)
+        return received
+
+    async def stage(self, session: dict) -> Dict[str, StagedUpload]:
+        """Проверить, что все слоты дописаны, и отдать их как StagedUpload для drivers.save_documents"""
+        incomplete = [slot for slot, progress in session["files"].items() if progress["received"] != progress["size"]]
+        if incomplete:
+            raise HTTPException(status_code=409, detail=f"Upload incomplete: {', '.join(incomplete)}")
+
+        directory = self.root / session["session_id"]
+        staged = {}
+        for slot, progress in session["files"].items():
+            path = directory / f"{slot}.part"
+            async with aiofiles.open(path, "rb") as part:
+                extension = detect_extension(await part.read(CHUNK_SIZE))
+            if extension is None:
+                raise HTTPException(status_code=415, detail=f"Unsupported file type: {slot}")
+            staged[slot] = StagedUpload(
+                temp_path=path, extension=extension, size=progress["size"],
+                sha256=await asyncio.to_thread(file_sha256, path)
+            )
+        return staged
+
+    @asynccontextmanager
+    async def _slots_locked(self, session_id: str):
+        async with AsyncExitStack() as stack:
+            for slot in DOCUMENT_SLOTS:
+                await stack.enter_async_context(self._lock(session_id, slot))
+            yield
+
+    def _forget(self, session_id: str):
+        for slot in DOCUMENT_SLOTS:
+            self._locks.pop((session_id, slot), None)
+
+    @asynccontextmanager
+    async def locked(self, session_id: str, user_id: int):
+        """Сессия со всеми слотами под замком: на время финализации дозапись невозможна.
+
+        Замки берутся только после проверки сессии, чтобы чужие и
+        выдуманные id не оставляли записей в _locks. Отдаёт манифест,
+        прочитанный уже под замком.
+        """
+        await self.get(session_id, user_id)
+        async with self._slots_locked(session_id):
+            try:
+                # Пока ждали замок, сессию могли удалить
+                session = await self.get(session_id, user_id)
+            except HTTPException:
+                self._forget(session_id)
+                raise
+            yield session
+
+    async def discard(self, session_id: str):
+        """Удалить каталог сессии под замками слотов и забыть замки"""
+        directory = self._dir(session_id)
+        async with self._slots_locked(session_id):
+            await asyncio.to_thread(shutil.rmtree, directory, True)
+        self._forget(session_id)
+
+    def _expired(self, now: float) -> list:
+        expired = []
+        if not self.root.is_dir():
+            return expired
+        for directory in self.root.iterdir():
+            if not directory.is_dir() or not SESSION_ID.match(directory.name):
+                continue
+            try:
+                last_activity = max(path.stat().st_mtime for path in directory.iterdir())
+            except ValueError:
+                last_activity = directory.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if last_activity + self.ttl < now:
+                expired.append(directory.name)
+        return expired
+
+    async def collect_garbage(self) -> int:
+        expired = await asyncio.to_thread(self._expired, time.time())
+        for session_id in expired:
+            await self.discard(session_id)
+        self.collected += len(expired)
+        return len(expired)
+
+    async def run(self):
+        while True:
+            try:
+                await self.collect_garbage()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка очистки сессий загрузки")
+            await asyncio.sleep(self.gc_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+upload_sessions = UploadSessions(
+    root=Path(settings.UPLOAD_DIR) / ".sessions",
+    ttl=settings.UPLOAD_SESSION_TTL_SECONDS,
+    gc_interval=settings.UPLOAD_SESSION_GC_INTERVAL_SECONDS,
+)
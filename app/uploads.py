@@ -0,0 +1,159 @@
+# app/uploads.py
+import asyncio
+import hashlib
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile
+
+CHUNK_SIZE = 64 * 1024
+# Запас на заголовки частей multipart сверх суммы размеров файлов
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Сигнатура -> расширение; проверяется по первым байтам, а не по content_type клиента
+SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+)
+
+# Слот документа -> (подкаталог, имя файла без расширения, тип документа, сторона)
+DOCUMENT_SLOTS = {
+    **{
+        f"car_photo_{i}": ("car_photos", f"car_photo_{i}", "car_photo", None)
+        for i in range(1, 5)
+    },
+    "tech_passport_front": ("tech_passport", "front", "tech_passport", "front"),
+    "tech_passport_back": ("tech_passport", "back", "tech_passport", "back"),
+    "license_front": ("license", "front", "license", "front"),
+    "license_back": ("license", "back", "license", "back"),
+    "selfie": ("selfie", "selfie", "selfie", None),
+}
+
+def detect_extension(head: bytes) -> Optional[str]:
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+def file_sha256(path: Path) -> str:
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+@dataclass
+class StagedUpload:
+    """Файл, полностью записанный во временный путь, и SHA-256 его содержимого"""
+    temp_path: Path
+    extension: str
+    size: int
+    sha256: str
+
+async def stage(file: UploadFile, directory: Path, max_size: int) -> StagedUpload:
+    """Записать файл по частям во временный .part, проверив тип и размер и посчитав хеш"""
+    head = await file.read(CHUNK_SIZE)
+    extension = detect_extension(head)
+    if extension is None:
+        raise HTTPException(status_code=415, detail=f"Unsupported file type: {file.filename}")
+
+    await aiofiles.os.makedirs(directory, exist_ok=True)
+    temp_path = directory / f".{uuid.uuid4().hex}.part"
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(status_code=413, detail=f"File too large: {file.filename}")
+                digest.update(chunk)
+                await buffer.write(chunk)
+                chunk = await file.read(CHUNK_SIZE)
+    except BaseException:
+        await discard(temp_path)
+        raise
+    return StagedUpload(temp_path=temp_path, extension=extension, size=size, sha256=digest.hexdigest())
+
+async def discard(path: Path):
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+async def stage_all(files: Dict[str, tuple], max_size: int) -> Dict[str, StagedUpload]:
+    """Параллельно записать {ключ: (UploadFile, каталог)}.
+
+    При первой ошибке остальные записи отменяются, а уже записанные
+    временные файлы удаляются: либо готовы все, либо ни одного.
+    """
+    tasks = {
+        key: asyncio.create_task(stage(file, directory, max_size))
+        for key, (file, directory) in files.items()
+    }
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for result in results:
+            if isinstance(result, StagedUpload):
+                await discard(result.temp_path)
+        raise
+    return {key: task.result() for key, task in tasks.items()}
+
+class MaxBodySizeMiddleware:
+    """Обрывает загрузку, как только тело запроса превысило лимит.
+
+    limits: префикс пути -> максимальный размер тела в байтах. Проверяется
+    и заявленный Content-Length, и фактически полученные байты
+    (на случай chunked-передачи).
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    def _limit(self, path: str) -> Optional[int]:
+        # Побеждает самый длинный подходящий префикс
+        prefix = max((prefix for prefix in self.limits if path.startswith(prefix)), key=len, default=None)
+        return self.limits[prefix] if prefix is not None else None
+
+    async def __call__(self, scope, receive, send):
+        limit = self._limit(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await send_too_large(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+async def send_too_large(send):
+    body = b'{"detail":"Request body too large"}'
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
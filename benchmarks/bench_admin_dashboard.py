@@ -0,0 +1,115 @@
+# benchmarks/bench_admin_dashboard.py
+# Память и время /api/admin/dashboard в зависимости от числа заказов.
+#
+#   python benchmarks/bench_admin_dashboard.py --sizes 10000,100000,1000000
+#
+# Для сравнения со старым подходом (загрузка всех завершённых заказов
+# в Python) добавьте --legacy; он выполняется только до --legacy-limit строк.
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+DB_PATH = Path(tempfile.mkdtemp()) / "bench_dashboard.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from app import models  # noqa: E402
+from app.principal_cache import Principal  # noqa: E402
+from app.routers import admin  # noqa: E402
+
+STATUSES = ["pending", "accepted", "completed", "completed", "completed", "cancelled"]
+
+def seed_users(conn, clients: int, drivers: int):
+    now = datetime.utcnow()
+    rows = [
+        {"email": f"u{i}@bench", "hashed_password": "x", "role": role, "is_active": True, "created_at": now}
+        for i, role in enumerate(["client"] * clients + ["driver"] * drivers + ["admin"])
+    ]
+    conn.execute(insert(models.User), rows)
+
+def seed_orders(conn, start: int, stop: int, clients: int, chunk: int = 50000):
+    rnd = random.Random(start)
+    base = datetime(2020, 1, 1)
+    for offset in range(start, stop, chunk):
+        rows = []
+        for _ in range(offset, min(stop, offset + chunk)):
+            status = rnd.choice(STATUSES)
+            price = round(rnd.uniform(10, 200), 2)
+            created = base + timedelta(minutes=rnd.randrange(3 * 365 * 24 * 60))
+            rows.append({
+                "client_id": rnd.randrange(1, clients + 1),
+                "pickup_location": "A",
+                "dropoff_location": "B",
+                "pickup_time": created + timedelta(hours=2),
+                "passengers_count": 1,
+                "luggage_count": 0,
+                "client_price": price,
+                "final_price": price if status == "completed" else None,
+                "status": status,
+                "created_at": created,
+            })
+        conn.execute(insert(models.Order), rows)
+
+async def legacy_dashboard(db):
+    """Старый подход: завершённые заказы целиком загружаются в Python"""
+    trips = await db.scalars(
+        select(models.Order).where(models.Order.status == models.OrderStatus.COMPLETED)
+    )
+    return sum(trip.final_price or 0 for trip in trips)
+
+async def measure(fn):
+    async with models.AsyncSessionLocal() as db:
+        tracemalloc.start()
+        started = time.perf_counter()
+        await fn(db)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--legacy", action="store_true")
+    parser.add_argument("--legacy-limit", type=int, default=100000)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    models.Base.metadata.create_all(models.engine)
+    clients = 1000
+    with models.engine.begin() as conn:
+        seed_users(conn, clients=clients, drivers=200)
+
+    admin_user = Principal(id=0, email="admin@bench", full_name=None, role="admin", is_active=True, created_at=None)
+    dashboard = lambda db: admin.admin_dashboard(current_user=admin_user, db=db)
+
+    print(f"{'orders':>10} {'dashboard ms':>13} {'peak KiB':>9} {'legacy ms':>10} {'legacy KiB':>11}")
+    seeded = 0
+    for size in sizes:
+        with models.engine.begin() as conn:
+            seed_orders(conn, seeded, size, clients)
+        seeded = size
+
+        elapsed, peak = await measure(dashboard)
+        line = f"{size:>10} {elapsed * 1000:>13.1f} {peak / 1024:>9.0f}"
+        if args.legacy and size <= args.legacy_limit:
+            legacy_elapsed, legacy_peak = await measure(legacy_dashboard)
+            line += f" {legacy_elapsed * 1000:>10.1f} {legacy_peak / 1024:>11.0f}"
+        print(line)
+
+    await models.async_engine.dispose()
+    DB_PATH.unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
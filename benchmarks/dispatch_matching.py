@@ -0,0 +1,93 @@
+# benchmarks/dispatch_matching.py
+# Время пакетного назначения app.dispatch.match на синтетическом городе.
+#
+#   python benchmarks/dispatch_matching.py [--sizes 1000x500,5000x2500,10000x5000] [--candidates 8]
+#
+# Заказы и водители разбросаны по кругу радиусом ~25 км, вместимость и
+# багаж случайные, у каждого пятого водителя две машины. Проверяется, что
+# водитель получил не больше одного заказа и что все назначения допустимы
+# по вместимости и багажу одной машины.
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.dispatch import DriverBatch, OrderBatch, match  # noqa: E402
+
+CENTER = (55.7558, 37.6173)
+
+def scatter(rng, count: int):
+    angle = rng.uniform(0, 2 * np.pi, count)
+    radius = 25 * np.sqrt(rng.uniform(0, 1, count)) / 111.0
+    lat = CENTER[0] + radius * np.cos(angle)
+    lng = CENTER[1] + radius * np.sin(angle) / np.cos(np.radians(CENTER[0]))
+    return lat, lng
+
+def build(rng, orders_count: int, drivers_count: int):
+    order_lat, order_lng = scatter(rng, orders_count)
+    driver_lat, driver_lng = scatter(rng, drivers_count)
+    # Вторая машина - ещё одна строка с тем же id и координатами
+    second = rng.choice(drivers_count, drivers_count // 5, replace=False)
+    cars = drivers_count + len(second)
+    orders = OrderBatch(
+        ids=np.arange(orders_count),
+        passengers=rng.choice([1, 1, 2, 3, 4, 6], orders_count).astype(float),
+        luggage=rng.choice([0, 1, 2, 3, 5], orders_count).astype(float),
+        lat=order_lat,
+        lng=order_lng,
+    )
+    drivers = DriverBatch(
+        ids=np.concatenate((np.arange(drivers_count), second)),
+        capacity=rng.choice([3, 4, 4, 7], cars).astype(float),
+        luggage=rng.choice([2, 3, 4, np.inf], cars).astype(float),
+        lat=np.concatenate((driver_lat, driver_lat[second])),
+        lng=np.concatenate((driver_lng, driver_lng[second])),
+    )
+    return orders, drivers
+
+def check(orders: OrderBatch, drivers: DriverBatch, assignments) -> int:
+    errors = 0
+    used = [int(drivers.ids[driver]) for _, driver, _ in assignments]
+    errors += len(used) - len(set(used))
+    for order, driver, _ in assignments:
+        errors += drivers.capacity[driver] < orders.passengers[order]
+        errors += drivers.luggage[driver] < orders.luggage[order]
+    return int(errors)
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000x500,5000x2500,10000x5000")
+    parser.add_argument("--candidates", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'orders x drivers':>18} {'assigned':>9} {'avg km':>7} {'best ms':>8} {'peak MiB':>9}")
+    for size in args.sizes.split(","):
+        orders_count, drivers_count = (int(part) for part in size.split("x"))
+        orders, drivers = build(np.random.default_rng(42), orders_count, drivers_count)
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            assignments = match(orders, drivers, candidates=args.candidates)
+            timings.append(time.perf_counter() - started)
+        tracemalloc.start()
+        match(orders, drivers, candidates=args.candidates)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        errors = check(orders, drivers, assignments)
+        failures += errors
+        average = np.mean([cost for _, _, cost in assignments]) if assignments else 0.0
+        print(f"{size:>18} {len(assignments):>9} {average:>7.2f} {min(timings) * 1000:>8.1f} {peak / 2**20:>9.1f}"
+              + (f"  ✗ {errors} invalid" if errors else ""))
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+# benchmarks/load_test.py
+# Нагрузочный прогон всего приложения: клиенты, водители и администраторы
+# одновременно ходят в app.main.app через httpx (ASGI в том же процессе,
+# без сети) на временной SQLite.
+#
+#   python benchmarks/load_test.py [--duration 30] [--clients 20] [--drivers 20] [--admins 2]
+#                                  [--save benchmarks/load_baseline.json]
+#                                  [--compare benchmarks/load_baseline.json --tolerance 0.25]
+#
+# Клиенты входят (bcrypt) и создают заказы, водители опрашивают
+# /available-orders и наперегонки принимают заказы (проигравший получает
+# 400 - это не ошибка), часть принятых завершают, администраторы
+# открывают дашборд и полную статистику. Итог - пропускная способность
+# и p50/p95/p99 по каждому маршруту. --save пишет итог в JSON, --compare
+# сверяет с сохранённым: код выхода 1, если p95 маршрута вырос или
+# пропускная способность упала больше чем на --tolerance, или были ошибки.
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+# Пути статики и шаблонов в app.main заданы относительно корня репозитория
+os.chdir(ROOT)
+
+WORK_DIR = Path(tempfile.mkdtemp())
+DB_PATH = WORK_DIR / "load_test.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["AUDIT_JOURNAL_DIR"] = str(WORK_DIR / "audit_journal")
+# Водители соревнуются за заказы сами; DISPATCH_ENABLED=true включает диспетчер
+os.environ.setdefault("DISPATCH_ENABLED", "false")
+
+import httpx  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+
+from app import models, rollups  # noqa: E402
+from app.hashing import hash_password  # noqa: E402
+
+PASSWORD = "loadtest"
+CENTER = (55.7558, 37.6173)
+
+def near_center(rnd: random.Random, spread: float = 0.05):
+    return CENTER[0] + rnd.uniform(-spread, spread), CENTER[1] + rnd.uniform(-spread, spread)
+
+def seed(clients: int, drivers: int, admins: int, history: int, rnd: random.Random):
+    """Пользователи с одним общим хешем пароля, одобренные водители и история заказов за два года"""
+    models.Base.metadata.create_all(models.engine)
+    now = datetime.utcnow()
+    hashed = hash_password(PASSWORD)
+    roles = [("client", clients), ("driver", drivers), ("admin", admins)]
+    users = [
+        {"email": f"{role}{i}@load", "hashed_password": hashed, "full_name": f"{role} {i}",
+         "role": role, "is_active": True, "created_at": now - timedelta(days=rnd.randrange(730))}
+        for role, count in roles for i in range(count)
+    ]
+    with models.engine.begin() as conn:
+        conn.execute(insert(models.User), users)
+        ids = {row.email: row.id for row in conn.execute(models.User.__table__.select())}
+        client_ids = [ids[f"client{i}@load"] for i in range(clients)]
+        driver_ids = [ids[f"driver{i}@load"] for i in range(drivers)]
+        conn.execute(insert(models.DriverProfile), [
+            {"user_id": driver_id, "documents_status": "approved", "is_verified": True, "total_trips": 0, "created_at": now}
+            for driver_id in driver_ids
+        ])
+        rows = []
+        for _ in range(history):
+            created = now - timedelta(minutes=rnd.randrange(2 * 365 * 24 * 60))
+            status = rnd.choice(["completed", "completed", "completed", "cancelled"])
+            price = round(rnd.uniform(10, 200), 2)
+            lat, lng = near_center(rnd)
+            rows.append({
+                "client_id": rnd.choice(client_ids), "driver_id": rnd.choice(driver_ids),
+                "pickup_location": "A", "dropoff_location": "B", "pickup_lat": lat, "pickup_lng": lng,
+                "pickup_time": created + timedelta(hours=2), "passengers_count": 1, "luggage_count": 0,
+                "client_price": price, "final_price": price if status == "completed" else None,
+                "status": status, "created_at": created,
+            })
+        if rows:
+            conn.execute(insert(models.Order), rows)
+        rollups.rebuild(conn)
+
+class Recorder:
+    """Задержки и статусы по шаблону маршрута"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.rejected = defaultdict(int)
+
+    def add(self, route: str, elapsed: float, ok: bool, rejected: bool):
+        self.latencies[route].append(elapsed)
+        if rejected:
+            self.rejected[route] += 1
+        elif not ok:
+            self.errors[route] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            samples.sort()
+            routes[route] = {
+                "requests": len(samples),
+                "errors": self.errors[route],
+                "rejected": self.rejected[route],
+                "rps": round(len(samples) / elapsed, 2),
+                **{f"p{q}_ms": round(percentile(samples, q) * 1000, 2) for q in (50, 95, 99)},
+                "max_ms": round(samples[-1] * 1000, 2),
+            }
+        return routes
+
+def percentile(samples: list, q: int) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+class User:
+    """Виртуальный пользователь со своими cookie"""
+
+    def __init__(self, transport, recorder: Recorder, email: str):
+        self.client = httpx.AsyncClient(transport=transport, base_url="http://load.test")
+        self.recorder = recorder
+        self.email = email
+
+    async def call(self, route: str, method: str, url: str, rejected=(), **kwargs) -> httpx.Response:
+        """Запрос с замером; статусы из rejected - ожидаемый отказ (проигранная гонка)"""
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        self.recorder.add(route, elapsed, response.status_code < 400, response.status_code in rejected)
+        return response
+
+    async def login(self):
+        response = await self.call(
+            "POST /api/auth/login", "POST", "/api/auth/login",
+            data={"email": self.email, "password": PASSWORD}
+        )
+        if response.status_code != 302:
+            raise RuntimeError(f"login failed for {self.email}: {response.status_code}")
+
+async def client_loop(user: User, stop: float, rnd: random.Random, think: float):
+    await user.login()
+    while time.perf_counter() < stop:
+        lat, lng = near_center(rnd)
+        await user.call(
+            "POST /api/clients/orders/create", "POST", "/api/clients/orders/create",
+            data={
+                "pickup_location": "Load street", "dropoff_location": "Test avenue",
+                "pickup_time": (datetime.now() + timedelta(hours=rnd.randint(1, 48))).isoformat(),
+                "passengers_count": rnd.randint(1, 4), "luggage_count": rnd.randint(0, 2),
+                "client_price": round(rnd.uniform(10, 200), 2),
+                "pickup_lat": lat, "pickup_lng": lng,
+            }
+        )
+        await asyncio.sleep(rnd.expovariate(1 / think))
+
+async def driver_loop(user: User, stop: float, rnd: random.Random, think: float, complete_ratio: float):
+    await user.login()
+    accepted = []
+    while time.perf_counter() < stop:
+        lat, lng = near_center(rnd)
+        response = await user.call(
+            "GET /api/drivers/available-orders", "GET", "/api/drivers/available-orders",
+            params={"lat": lat, "lng": lng, "radius_km": 10, "limit": 20}
+        )
+        items = response.json()["items"] if response.status_code == 200 else []
+        if items:
+            # Все водители видят одни и те же ближайшие заказы и берут из первых
+            order_id = rnd.choice(items[:3])["id"]
+            response = await user.call(
+                "POST /api/drivers/orders/{order_id}/accept", "POST", f"/api/drivers/orders/{order_id}/accept",
+                rejected=(400,)
+            )
+            if response.status_code == 200:
+                accepted.append(order_id)
+        if accepted and rnd.random() < complete_ratio:
+            order_id = accepted.pop(rnd.randrange(len(accepted)))
+            await user.call("POST /api/orders/{order_id}/complete", "POST", f"/api/orders/{order_id}/complete")
+        await asyncio.sleep(rnd.expovariate(1 / think))
+
+async def admin_loop(user: User, stop: float, rnd: random.Random, think: float):
+    await user.login()
+    while time.perf_counter() < stop:
+        await user.call("GET /api/admin/dashboard", "GET", "/api/admin/dashboard")
+        await user.call(
+            "GET /api/admin/statistics/full", "GET", "/api/admin/statistics/full",
+            params={"period": rnd.choice(["day", "week", "month", "year"])}
+        )
+        await asyncio.sleep(rnd.expovariate(1 / think))
+
+def compare(routes: dict, baseline_path: Path, tolerance: float) -> int:
+    """Число регрессий относительно сохранённого прогона"""
+    baseline = json.loads(baseline_path.read_text())["routes"]
+    regressions = 0
+    for route, current in routes.items():
+        before = baseline.get(route)
+        if before is None:
+            print(f"  {route}: нет в базовом прогоне")
+            continue
+        slower = current["p95_ms"] > before["p95_ms"] * (1 + tolerance)
+        fewer = current["rps"] < before["rps"] * (1 - tolerance)
+        regressions += slower or fewer
+        print(f"{'✗' if slower or fewer else '✓'} {route}: p95 {before['p95_ms']} -> {current['p95_ms']} ms, "
+              f"rps {before['rps']} -> {current['rps']}")
+    return regressions
+
+async def run(args) -> dict:
+    from app.main import app
+
+    if models.async_engine.dialect.name == "sqlite":
+        @event.listens_for(models.async_engine.sync_engine, "connect")
+        def _wal(dbapi_connection, record):
+            # Читатели не ждут писателей, как на рабочей базе с MVCC
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA busy_timeout=30000")
+            cursor.close()
+
+    rnd = random.Random(args.seed)
+    seed(args.clients, args.drivers, args.admins, args.history, rnd)
+
+    await app.router.startup()
+    transport = httpx.ASGITransport(app=app)
+    recorder = Recorder()
+    users = []
+    tasks = []
+    started = time.perf_counter()
+    stop = started + args.duration
+    try:
+        for role, count in (("client", args.clients), ("driver", args.drivers), ("admin", args.admins)):
+            for i in range(count):
+                user = User(transport, recorder, f"{role}{i}@load")
+                users.append(user)
+                user_rnd = random.Random(f"{args.seed}-{role}-{i}")
+                if role == "client":
+                    tasks.append(client_loop(user, stop, user_rnd, args.client_think))
+                elif role == "driver":
+                    tasks.append(driver_loop(user, stop, user_rnd, args.driver_think, args.complete_ratio))
+                else:
+                    tasks.append(admin_loop(user, stop, user_rnd, args.admin_think))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    finally:
+        for user in users:
+            await user.client.aclose()
+        await app.router.shutdown()
+
+    return {
+        "config": {
+            key: getattr(args, key)
+            for key in ("duration", "clients", "drivers", "admins", "history", "seed",
+                        "client_think", "driver_think", "admin_think", "complete_ratio")
+        },
+        "database": models.async_engine.dialect.name,
+        "elapsed_s": round(elapsed, 2),
+        "total_rps": round(sum(len(samples) for samples in recorder.latencies.values()) / elapsed, 2),
+        "routes": recorder.summary(elapsed),
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=30.0, help="секунд нагрузки")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--drivers", type=int, default=20)
+    parser.add_argument("--admins", type=int, default=2)
+    parser.add_argument("--history", type=int, default=20000, help="заказов в истории до прогона")
+    parser.add_argument("--client-think", type=float, default=1.0, help="средняя пауза клиента, с")
+    parser.add_argument("--driver-think", type=float, default=0.5, help="средняя пауза водителя, с")
+    parser.add_argument("--admin-think", type=float, default=2.0, help="средняя пауза администратора, с")
+    parser.add_argument("--complete-ratio", type=float, default=0.3, help="доля опросов, после которых водитель завершает заказ")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", type=Path, help="записать итог в JSON")
+    parser.add_argument("--compare", type=Path, help="сравнить с итогом, сохранённым --save")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        DB_PATH.unlink(missing_ok=True)
+
+    print(f"{result['database']}: {result['elapsed_s']}s, {result['total_rps']} req/s")
+    print(f"{'route':48} {'req':>7} {'err':>5} {'rej':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, stats in result["routes"].items():
+        print(f"{route:48} {stats['requests']:>7} {stats['errors']:>5} {stats['rejected']:>5} {stats['rps']:>8} "
+              f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+
+    if args.save:
+        args.save.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n")
+        print(f"✓ Итог записан в {args.save}")
+
+    failures = sum(stats["errors"] for stats in result["routes"].values())
+    if args.compare:
+        failures += compare(result["routes"], args.compare, args.tolerance)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# benchmarks/order_contention.py
+# Гонка водителей за одни и те же заказы: сотни потоков одновременно
+# принимают каждый заказ.
+#
+#   python benchmarks/order_contention.py [--drivers 200] [--orders 100] [--legacy]
+#
+# По умолчанию используется order_state.accept_statement (один условный
+# UPDATE); --legacy прогоняет прежнюю схему "прочитать-проверить-записать"
+# для сравнения. Код выхода 1, если у какого-то заказа больше одного
+# победителя или победитель не совпадает с driver_id в базе.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+DB_PATH = Path(tempfile.mkdtemp()) / "order_contention.db"
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from sqlalchemy import create_engine, delete, event, insert, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import models, order_state  # noqa: E402
+
+def make_engine(threads: int):
+    url = models.sync_database_url()
+    connect_args = {}
+    if url.startswith("sqlite"):
+        connect_args = {"timeout": 60, "check_same_thread": False}
+    engine = create_engine(url, pool_size=threads, max_overflow=0, connect_args=connect_args)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _wal(dbapi_connection, record):
+            dbapi_connection.execute("PRAGMA journal_mode=WAL")
+    return engine
+
+def seed(engine, drivers_count: int, orders_count: int):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for table in (models.Order, models.DriverProfile, models.User):
+            conn.execute(delete(table))
+        conn.execute(insert(models.User), [{"id": 1, "email": "c@bench", "hashed_password": "x", "role": "client", "is_active": True, "created_at": now}] + [
+            {"id": 100 + i, "email": f"d{i}@bench", "hashed_password": "x", "role": "driver", "is_active": True, "created_at": now}
+            for i in range(drivers_count)
+        ])
+        conn.execute(insert(models.DriverProfile), [
+            {"user_id": 100 + i, "documents_status": "approved", "total_trips": 0, "created_at": now}
+            for i in range(drivers_count)
+        ])
+        conn.execute(insert(models.Order), [
+            {"client_id": 1, "pickup_location": "A", "dropoff_location": "B", "pickup_time": now + timedelta(hours=1),
+             "passengers_count": 1, "luggage_count": 0, "client_price": 10.0, "status": "pending", "created_at": now}
+            for _ in range(orders_count)
+        ])
+        return list(conn.scalars(select(models.Order.id)))
+
+def accept_cas(engine, order_id: int, driver_id: int) -> bool:
+    with Session(engine) as db:
+        won = db.scalars(order_state.accept_statement(order_id, driver_id)).one_or_none() is not None
+        db.commit()
+        return won
+
+def accept_legacy(engine, order_id: int, driver_id: int) -> bool:
+    """Прежний drivers.accept_order: три оператора и проверка в Python"""
+    with Session(engine) as db:
+        profile = db.scalar(select(models.DriverProfile).where(models.DriverProfile.user_id == driver_id))
+        if not profile or profile.documents_status != "approved":
+            return False
+        order = db.get(models.Order, order_id)
+        if order is None or order.status != "pending":
+            return False
+        order.driver_id = driver_id
+        order.status = "accepted"
+        order.accepted_at = datetime.now()
+        db.commit()
+        return True
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--drivers", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    engine = make_engine(args.drivers)
+    models.Base.metadata.create_all(engine)
+    order_ids = seed(engine, args.drivers, args.orders)
+    accept = accept_legacy if args.legacy else accept_cas
+
+    wins = Counter()
+    winners = {}
+    latencies = []
+    lock = threading.Lock()
+    start_line = threading.Barrier(args.drivers)
+
+    def driver(driver_id: int):
+        attempts = order_ids[:]
+        random.Random(driver_id).shuffle(attempts)
+        start_line.wait()
+        for order_id in attempts:
+            started = time.perf_counter()
+            won = accept(engine, order_id, driver_id)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if won:
+                    wins[order_id] += 1
+                    winners[order_id] = driver_id
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.drivers) as pool:
+        list(pool.map(driver, range(100, 100 + args.drivers)))
+    elapsed = time.perf_counter() - started
+
+    with engine.connect() as conn:
+        assigned = dict(conn.execute(select(models.Order.id, models.Order.driver_id)).all())
+
+    double = sum(1 for count in wins.values() if count > 1)
+    unassigned = sum(1 for order_id in order_ids if wins[order_id] == 0)
+    mismatched = sum(1 for order_id, driver_id in winners.items() if assigned[order_id] != driver_id)
+    latencies.sort()
+    attempts = len(latencies)
+
+    print(f"mode: {'legacy read-check-write' if args.legacy else 'conditional UPDATE'} ({engine.dialect.name})")
+    print(f"drivers={args.drivers} orders={args.orders} attempts={attempts}")
+    print(f"elapsed: {elapsed:.2f}s, throughput: {attempts / elapsed:.0f} attempts/s")
+    print(f"latency ms: p50={latencies[attempts // 2] * 1000:.2f} "
+          f"p99={latencies[min(attempts - 1, int(attempts * 0.99))] * 1000:.2f} max={latencies[-1] * 1000:.2f}")
+    print(f"double assignments: {double}, unassigned: {unassigned}, winner != driver_id: {mismatched}")
+
+    engine.dispose()
+    DB_PATH.unlink(missing_ok=True)
+    return 1 if double or unassigned or mismatched else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
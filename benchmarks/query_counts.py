@@ -0,0 +1,117 @@
+# benchmarks/query_counts.py
+# Регрессия N+1: число SQL-запросов эндпоинта не должно зависеть от объёма данных.
+#
+#   python benchmarks/query_counts.py
+#
+# Код выхода 1, если число запросов отличается от EXPECTED или растёт с данными.
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+DB_PATH = Path(tempfile.mkdtemp()) / "query_counts.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import delete, event, insert  # noqa: E402
+
+from app import models, schemas  # noqa: E402
+from app.pagination import PageParams  # noqa: E402
+from app.principal_cache import Principal  # noqa: E402
+from app.routers import admin, drivers  # noqa: E402
+
+EXPECTED = {
+    "/api/admin/drivers/pending": 2,
+    "/api/admin/orders/all": 1,
+    "/api/drivers/profile": 3,
+    # UPDATE профилей, UPDATE активных документов, INSERT admin_actions
+    # (журнал не запущен - запись синхронная; в приложении INSERT идёт пачкой в фоне)
+    "/api/admin/drivers/{id}/approve": 3,
+    "/api/admin/drivers/review": 3,
+}
+
+ADMIN = Principal(id=1, email="admin@bench", full_name="Admin", role="admin", is_active=True, created_at=None)
+
+def seed(drivers_count: int, orders_count: int):
+    """Водители на проверке с документами и машинами, заказы с водителями"""
+    now = datetime.utcnow()
+    with models.engine.begin() as conn:
+        for table in (models.Order, models.Car, models.DriverDocument, models.DriverProfile, models.User):
+            conn.execute(delete(table))
+        users = [{"id": 1, "email": "admin@bench", "hashed_password": "x", "full_name": "Admin", "role": "admin", "is_active": True, "created_at": now}]
+        users += [
+            {"id": 100 + i, "email": f"d{i}@bench", "hashed_password": "x", "full_name": f"Driver {i}", "role": "driver", "is_active": True, "created_at": now}
+            for i in range(drivers_count)
+        ]
+        users.append({"id": 2, "email": "c@bench", "hashed_password": "x", "full_name": "Client", "role": "client", "is_active": True, "created_at": now})
+        conn.execute(insert(models.User), users)
+        conn.execute(insert(models.DriverProfile), [
+            {"id": 100 + i, "user_id": 100 + i, "documents_status": "pending", "created_at": now}
+            for i in range(drivers_count)
+        ])
+        conn.execute(insert(models.DriverDocument), [
+            {"driver_profile_id": 100 + i, "document_type": "car_photo", "file_path": f"{100 + i}/car_photos/{n}.jpg", "status": "pending", "uploaded_at": now}
+            for i in range(drivers_count) for n in range(9)
+        ])
+        conn.execute(insert(models.Car), [
+            {"driver_profile_id": 100 + i, "make": "T", "model": "C", "year": 2020, "color": "w", "license_plate": f"P{i}-{n}", "capacity": 4, "created_at": now}
+            for i in range(drivers_count) for n in range(2)
+        ])
+        conn.execute(insert(models.Order), [
+            {"client_id": 2, "driver_id": 100 + i % drivers_count, "pickup_location": "A", "dropoff_location": "B",
+             "pickup_time": now + timedelta(hours=1), "passengers_count": 1, "luggage_count": 0,
+             "client_price": 10.0, "status": "accepted", "created_at": now - timedelta(minutes=i)}
+            for i in range(orders_count)
+        ])
+
+async def count_statements(call) -> int:
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(models.async_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        async with models.AsyncSessionLocal() as db:
+            await call(db)
+    finally:
+        event.remove(models.async_engine.sync_engine, "before_cursor_execute", listener)
+    return len(statements)
+
+ENDPOINTS = {
+    "/api/admin/drivers/pending": lambda db: admin.get_pending_drivers(current_user=ADMIN, db=db),
+    "/api/admin/orders/all": lambda db: admin.get_all_orders(
+        status=None, start_date=None, end_date=None, page=PageParams(limit=200, cursor=None), current_user=ADMIN, db=db
+    ),
+    "/api/drivers/profile": lambda db: drivers.get_driver_profile(
+        request=None,
+        current_user=Principal(id=100, email="d0@bench", full_name="Driver 0", role="driver", is_active=True, created_at=None),
+        db=db,
+    ),
+    "/api/admin/drivers/{id}/approve": lambda db: admin.approve_driver(driver_id=100, current_user=ADMIN, db=db),
+    "/api/admin/drivers/review": lambda db: admin.review_drivers(
+        data=schemas.DriverReviewRequest(driver_ids=list(range(100, 400)), action="reject", reason="blurry"),
+        current_user=ADMIN,
+        db=db,
+    ),
+}
+
+async def main() -> int:
+    models.Base.metadata.create_all(models.engine)
+    failures = 0
+    counts = {}
+    for drivers_count, orders_count in ((3, 10), (300, 2000)):
+        seed(drivers_count, orders_count)
+        for name, call in ENDPOINTS.items():
+            counts.setdefault(name, []).append(await count_statements(call))
+    for name, observed in counts.items():
+        ok = all(count == EXPECTED[name] for count in observed)
+        failures += not ok
+        print(f"{'✓' if ok else '✗'} {name}: {observed} (expected {EXPECTED[name]})")
+    await models.async_engine.dispose()
+    DB_PATH.unlink(missing_ok=True)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
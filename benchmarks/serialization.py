@@ -0,0 +1,169 @@
+# benchmarks/serialization.py
+# Стоимость выборки и сериализации списочных эндпоинтов: было / стало.
+#
+#   python benchmarks/serialization.py --sizes 1000,10000
+#
+# Было: объекты ORM со всеми столбцами, ручные словари и jsonable_encoder
+# (или response_model) и JSONResponse. Стало: выборка только столбцов
+# схемы, response_model и ORJSONResponse. Страница берётся размером с
+# весь набор, в обход MAX_LIMIT.
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+DB_PATH = Path(tempfile.mkdtemp()) / "bench_serialization.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from sqlalchemy import delete, insert, select  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from app import models  # noqa: E402
+from app.pagination import PageParams, fetch_page  # noqa: E402
+from app.principal_cache import Principal  # noqa: E402
+from app.routers import admin, clients, drivers  # noqa: E402
+
+CLIENT = Principal(id=1, email="c@bench", full_name="Client", role="client", is_active=True, created_at=None)
+DRIVER = Principal(id=2, email="d@bench", full_name="Driver", role="driver", is_active=True, created_at=None)
+ADMIN = Principal(id=3, email="a@bench", full_name="Admin", role="admin", is_active=True, created_at=None)
+
+def seed(size: int):
+    """size пользователей и size ожидающих заказов одного клиента"""
+    now = datetime.utcnow()
+    with models.engine.begin() as conn:
+        for table in (models.Order, models.DriverProfile, models.User):
+            conn.execute(delete(table))
+        conn.execute(insert(models.User), [
+            {"id": principal.id, "email": principal.email, "hashed_password": "x", "full_name": principal.full_name,
+             "role": principal.role, "is_active": True, "created_at": now}
+            for principal in (CLIENT, DRIVER, ADMIN)
+        ] + [
+            {"id": 100 + i, "email": f"u{i}@bench", "hashed_password": "x", "full_name": f"User {i}",
+             "role": "client", "is_active": True, "created_at": now - timedelta(seconds=i)}
+            for i in range(size - 3)
+        ])
+        conn.execute(insert(models.DriverProfile), [{"user_id": DRIVER.id, "documents_status": "approved"}])
+        conn.execute(insert(models.Order), [
+            {"client_id": CLIENT.id, "driver_id": DRIVER.id if i % 2 else None,
+             "pickup_location": f"Pickup street {i}", "dropoff_location": f"Dropoff avenue {i}",
+             "pickup_lat": 55.7 + i * 1e-5, "pickup_lng": 37.6, "pickup_time": now + timedelta(days=1, minutes=i),
+             "passengers_count": 2, "luggage_count": 1, "client_price": 50.0 + i % 100, "status": "pending",
+             "created_at": now - timedelta(seconds=i)}
+            for i in range(size)
+        ])
+
+def response_field(router, path: str):
+    return next(route for route in router.routes if route.path == path).response_field
+
+def legacy_available_order(order: models.Order) -> dict:
+    """Старый ручной словарь ленты доступных заказов"""
+    return {
+        "id": order.id,
+        "pickup_location": order.pickup_location,
+        "dropoff_location": order.dropoff_location,
+        "pickup_lat": order.pickup_lat,
+        "pickup_lng": order.pickup_lng,
+        "dropoff_lat": order.dropoff_lat,
+        "dropoff_lng": order.dropoff_lng,
+        "pickup_time": order.pickup_time,
+        "passengers_count": order.passengers_count,
+        "luggage_count": order.luggage_count,
+        "client_price": order.client_price,
+        "status": order.status,
+        "version": order.version,
+        "created_at": order.created_at
+    }
+
+async def legacy_client_orders(db, page):
+    query = select(models.Order).where(models.Order.client_id == CLIENT.id)
+    return await fetch_page(db, query, models.Order, page)
+
+async def legacy_available_orders(db, page):
+    query = select(models.Order).where(models.order_is_pending(), models.Order.pickup_time >= datetime.now())
+    result = await fetch_page(db, query, models.Order, page)
+    return {"items": [legacy_available_order(order) for order in result["items"]], "next_cursor": result["next_cursor"]}
+
+async def legacy_users(db, page):
+    return await fetch_page(db, select(models.User), models.User, page)
+
+async def legacy_all_orders(db, page):
+    query = select(models.Order).options(joinedload(models.Order.client), joinedload(models.Order.driver))
+    result = await fetch_page(db, query, models.Order, page)
+    result["items"] = [{"order": order, "client": order.client, "driver": order.driver} for order in result["items"]]
+    return result
+
+# эндпоинт: (было: загрузка, response_model или None), (стало: загрузка, response_model)
+ENDPOINTS = {
+    "/api/clients/orders": (
+        (legacy_client_orders, None),
+        (lambda db, page: clients.get_client_orders(page=page, current_user=CLIENT, db=db),
+         response_field(clients.router, "/orders")),
+    ),
+    "/api/drivers/available-orders": (
+        (legacy_available_orders, None),
+        (lambda db, page: drivers.get_available_orders(
+            request=None, page=page, lat=None, lng=None, radius_km=10.0, current_user=DRIVER, db=db),
+         response_field(drivers.router, "/available-orders")),
+    ),
+    "/api/admin/users": (
+        (legacy_users, response_field(admin.router, "/users")),
+        (lambda db, page: admin.get_all_users(role=None, page=page, current_user=ADMIN, db=db),
+         response_field(admin.router, "/users")),
+    ),
+    "/api/admin/orders/all": (
+        (legacy_all_orders, response_field(admin.router, "/orders/all")),
+        (lambda db, page: admin.get_all_orders(
+            status=None, start_date=None, end_date=None, page=page, current_user=ADMIN, db=db),
+         response_field(admin.router, "/orders/all")),
+    ),
+}
+
+async def measure(load, field, response_class, size: int, repeat: int):
+    """Лучшие из repeat прогонов: (выборка мс, сериализация мс, байт)"""
+    best_load = best_dump = float("inf")
+    for _ in range(repeat):
+        async with models.AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            content = await load(db, PageParams(limit=size, cursor=None))
+            loaded = time.perf_counter()
+            if field is None:
+                content = jsonable_encoder(content)
+            else:
+                content = await serialize_response(field=field, response_content=content)
+            body = response_class(content).body
+            finished = time.perf_counter()
+        best_load = min(best_load, loaded - started)
+        best_dump = min(best_dump, finished - loaded)
+    return best_load * 1000, best_dump * 1000, len(body)
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(models.engine)
+    print(f"{'endpoint':<32} {'rows':>6} {'load ms':>15} {'serialize ms':>15} {'KiB':>6}")
+    print(f"{'':<32} {'':>6} {'was':>7} {'now':>7} {'was':>7} {'now':>7}")
+    for size in sorted(int(size) for size in args.sizes.split(",")):
+        seed(size)
+        for name, ((legacy_load, legacy_field), (load, field)) in ENDPOINTS.items():
+            was_load, was_dump, _ = await measure(legacy_load, legacy_field, JSONResponse, size, args.repeat)
+            now_load, now_dump, length = await measure(load, field, ORJSONResponse, size, args.repeat)
+            print(f"{name:<32} {size:>6} {was_load:>7.1f} {now_load:>7.1f} {was_dump:>7.1f} {now_dump:>7.1f} {length / 1024:>6.0f}")
+
+    await models.async_engine.dispose()
+    DB_PATH.unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,6 @@
 ﻿from app import models_final
-from app.auth import get_db
 
-db = next(get_db())
+db = models_final.SessionLocal()
 try:
     # Проверяем всех пользователей
     users = db.query(models_final.User).all()
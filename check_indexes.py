@@ -0,0 +1,128 @@
+# check_indexes.py
+# Проверка через EXPLAIN, что горячие запросы используют свои индексы.
+# Запуск после миграций: python check_indexes.py
+import sys
+from datetime import datetime
+
+from sqlalchemy import select, func, text
+
+from app import geo, models
+from app.pagination import PageParams, encode_cursor, keyset
+
+NOW = datetime(2024, 1, 1)
+PAGE = PageParams(limit=50, cursor=encode_cursor(NOW, 1000))
+
+HOT_QUERIES = [
+    (
+        "ix_orders_pending_pickup_geohash",
+        "/api/drivers/available-orders?lat=&lng=",
+        select(models.Order).where(
+            models.order_is_pending(),
+            models.Order.pickup_time >= NOW,
+            geo.geohash_condition(geo.covering_cells(55.75, 37.62, 10)),
+            geo.bounding_box_condition(geo.bounding_box(55.75, 37.62, 10))
+        ).order_by(models.Order.pickup_lat - 55.75).limit(50),
+    ),
+    (
+        "ix_orders_pending_created_at",
+        "/api/drivers/available-orders",
+        select(models.Order).where(
+            models.order_is_pending(),
+            models.Order.pickup_time >= NOW
+        ).order_by(models.Order.created_at.desc()),
+    ),
+    (
+        "ix_orders_driver_id_status",
+        "/api/drivers/stats",
+        select(func.count(models.Order.id)).where(
+            models.Order.driver_id == 1,
+            models.Order.status == "completed"
+        ),
+    ),
+    (
+        "ix_orders_client_id_created_at",
+        "/api/clients/orders",
+        select(models.Order).where(
+            models.Order.client_id == 1
+        ).order_by(models.Order.created_at.desc()),
+    ),
+    (
+        "ix_driver_documents_driver_profile_id",
+        "driver_documents by profile",
+        select(models.DriverDocument).where(
+            models.DriverDocument.driver_profile_id == 1
+        ),
+    ),
+    (
+        "ix_users_role_created_at",
+        "users by role and created_at",
+        select(func.count(models.User.id)).where(
+            models.User.role == models.UserRole.DRIVER,
+            models.User.created_at >= NOW
+        ),
+    ),
+    (
+        "ix_orders_driver_id_created_at",
+        "/api/orders/driver/my-orders (keyset)",
+        keyset(select(models.Order).where(models.Order.driver_id == 1), models.Order, PAGE),
+    ),
+    (
+        "ix_orders_created_at",
+        "/api/admin/orders/all (keyset)",
+        keyset(select(models.Order), models.Order, PAGE),
+    ),
+    (
+        "ix_users_created_at",
+        "/api/admin/users (keyset)",
+        keyset(select(models.User), models.User, PAGE),
+    ),
+    (
+        "ix_driver_documents_active_slot",
+        "/api/drivers/documents/upload (active versions)",
+        select(models.DriverDocument).where(
+            models.DriverDocument.driver_profile_id == 1,
+            models.document_is_active()
+        ),
+    ),
+    (
+        "ix_admin_actions_admin_id_created_at",
+        "/api/admin/audit?admin_id= (keyset)",
+        keyset(select(models.AdminAction).where(models.AdminAction.admin_id == 1), models.AdminAction, PAGE),
+    ),
+    (
+        "ix_admin_actions_target_user_id_created_at",
+        "/api/admin/audit?target_user_id= (keyset)",
+        keyset(select(models.AdminAction).where(models.AdminAction.target_user_id == 1), models.AdminAction, PAGE),
+    ),
+    (
+        "ix_admin_actions_created_at",
+        "/api/admin/audit (keyset)",
+        keyset(select(models.AdminAction), models.AdminAction, PAGE),
+    ),
+]
+
+def explain(conn, statement) -> str:
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql).fetchall()
+        return "\n".join(row[-1] for row in rows)
+    rows = conn.exec_driver_sql("EXPLAIN " + sql).fetchall()
+    return "\n".join(row[0] for row in rows)
+
+def main() -> int:
+    failures = 0
+    with models.engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # На маленьких таблицах планировщик предпочтёт seq scan
+            conn.execute(text("SET enable_seqscan = off"))
+        for index_name, label, statement in HOT_QUERIES:
+            plan = explain(conn, statement)
+            ok = index_name in plan
+            failures += not ok
+            print(f"{'✓' if ok else '✗'} {label}: {index_name}")
+            if not ok:
+                print("    " + plan.replace("\n", "\n    "))
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+# check_storage.py
+# Проверка контракта app.storage.Storage на обоих бэкендах: LocalStorage во
+# временном каталоге и S3Storage. По умолчанию S3 подменяется moto
+# (pip install boto3 "moto[s3]"); с --endpoint проверяется живой
+# S3-совместимый сервер, например MinIO, в существующем bucket.
+#
+#   python check_storage.py
+#   python check_storage.py --endpoint http://localhost:9000 --bucket test \
+#       --access-key minioadmin --secret-key minioadmin
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.storage import BLOB_PREFIX, LocalStorage, S3Storage, Storage, blob_key
+
+CONTENT = b"\xff\xd8\xff" + os.urandom(256 * 1024)
+
+async def check(storage: Storage, workdir: Path) -> list:
+    """Список нарушенных пунктов контракта"""
+    failures = []
+
+    def expect(ok: bool, label: str):
+        print(f"  {'✓' if ok else '✗'} {label}")
+        if not ok:
+            failures.append(label)
+
+    # Случайный хеш: живой bucket может быть не пустым
+    key = blob_key(uuid.uuid4().hex * 2, ".jpg")
+    source = workdir / "source.part"
+    source.write_bytes(CONTENT)
+
+    expect(not await storage.exists(key), "exists: нет ключа - False")
+    started = datetime.now(timezone.utc)
+    await storage.put(key, source)
+    expect(not source.exists(), "put: исходный файл перенесён")
+    expect(await storage.exists(key), "exists: после put - True")
+
+    target = workdir / "fetched"
+    await storage.fetch(key, target)
+    expect(target.read_bytes() == CONTENT, "fetch: содержимое совпадает")
+
+    listed = dict(await storage.list(BLOB_PREFIX))
+    expect(key in listed, "list: ключ найден по префиксу")
+    modified = listed.get(key)
+    expect(
+        modified is not None and modified.tzinfo is not None
+        and abs(modified - started) < timedelta(minutes=5),
+        "list: время изменения в UTC"
+    )
+    expect(key not in dict(await storage.list(BLOB_PREFIX + "zz-missing/")), "list: чужой префикс пуст")
+
+    await storage.delete(key)
+    expect(not await storage.exists(key), "delete: ключ удалён")
+    await storage.delete(key)
+    expect(True, "delete: отсутствующий ключ - не ошибка")
+    return failures
+
+async def check_local() -> list:
+    print("LocalStorage")
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as workdir:
+        storage = LocalStorage(Path(root))
+        failures = await check(storage, Path(workdir))
+        path = storage.local_path(blob_key("ab" * 32, ".jpg"))
+        ok = path == Path(root) / "blobs" / "ab" / ("ab" * 32 + ".jpg") and storage.url("x") is None
+        print(f"  {'✓' if ok else '✗'} local_path/url")
+        return failures + ([] if ok else ["local_path/url"])
+
+async def check_s3(args) -> list:
+    print(f"S3Storage ({args.endpoint or 'moto'})")
+    storage = S3Storage(
+        bucket=args.bucket, endpoint_url=args.endpoint or None, region=args.region,
+        access_key_id=args.access_key, secret_access_key=args.secret_key
+    )
+    if not args.endpoint:
+        storage._client.create_bucket(Bucket=args.bucket)
+    with tempfile.TemporaryDirectory() as workdir:
+        failures = await check(storage, Path(workdir))
+    url = storage.url(blob_key("ab" * 32, ".jpg"))
+    ok = url is not None and args.bucket in url and "Signature" in url
+    print(f"  {'✓' if ok else '✗'} url: подписанная ссылка")
+    return failures + ([] if ok else ["url"])
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", default="", help="S3/MinIO; пусто - moto в процессе")
+    parser.add_argument("--bucket", default="check-storage")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--access-key", default="testing")
+    parser.add_argument("--secret-key", default="testing")
+    args = parser.parse_args()
+
+    failures = asyncio.run(check_local())
+    if args.endpoint:
+        failures += asyncio.run(check_s3(args))
+    else:
+        try:
+            from moto import mock_aws
+        except ImportError:
+            print('✗ S3Storage: нужен moto (pip install boto3 "moto[s3]") или --endpoint')
+            return 1
+        with mock_aws():
+            failures += asyncio.run(check_s3(args))
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
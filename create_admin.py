@@ -1,8 +1,8 @@
 ﻿# create_admin.py
 from app import models_final
-from app.auth import get_db, get_password_hash
+from app.auth import get_password_hash
 
-db = next(get_db())
+db = models_final.SessionLocal()
 try:
     admin = db.query(models_final.User).filter(models_final.User.email == "admin@transferservice.com").first()
     
@@ -0,0 +1,83 @@
+# gc_documents.py
+# Сборка мусора документов водителей:
+#   1. удаляет заменённые версии старше DOCUMENT_RETENTION_DAYS;
+#   2. удаляет блобы хранилища (оригиналы, превью, миниатюры), на которые
+#      не ссылается ни одна строка driver_documents;
+#   3. удаляет брошенные временные файлы загрузки.
+#
+#   python gc_documents.py [--dry-run] [--grace-minutes 60]
+#
+# Блобы и временные файлы моложе grace не трогаются: их может прямо сейчас
+# записывать загрузка, строка для которой ещё не закоммичена.
+import argparse
+import asyncio
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import delete, false, func, select, union
+
+from app import models
+from app.config import settings
+from app.storage import BLOB_PREFIX, storage
+
+async def referenced_keys(db) -> set:
+    columns = (models.DriverDocument.file_path, models.DriverDocument.preview_path,
+               models.DriverDocument.thumbnail_path)
+    rows = await db.execute(union(*[select(column).where(column.is_not(None)) for column in columns]))
+    return {key for key, in rows}
+
+async def collect(dry_run: bool, grace: timedelta):
+    cutoff = datetime.utcnow() - timedelta(days=settings.DOCUMENT_RETENTION_DAYS)
+    superseded = (
+        models.DriverDocument.is_active == false(),
+        models.DriverDocument.superseded_at < cutoff
+    )
+    async with models.AsyncSessionLocal() as db:
+        if dry_run:
+            rows = await db.scalar(select(func.count(models.DriverDocument.id)).where(*superseded))
+        else:
+            rows = (await db.execute(delete(models.DriverDocument).where(*superseded))).rowcount
+            await db.commit()
+        print(f"✓ Заменённых версий документов удалено: {rows}")
+
+        referenced = await referenced_keys(db)
+        fresh = datetime.now(timezone.utc) - grace
+        candidates = [
+            key for key, modified in await storage.list(BLOB_PREFIX)
+            if key not in referenced and modified < fresh
+        ]
+        # Повторный снимок ссылок: за время обхода могла закоммититься загрузка того же блоба
+        if candidates:
+            referenced = await referenced_keys(db)
+        orphans = [key for key in candidates if key not in referenced]
+
+    for key in orphans:
+        if not dry_run:
+            await storage.delete(key)
+    print(f"✓ Блобов без ссылок удалено: {len(orphans)}")
+
+    staging = Path(settings.UPLOAD_DIR) / ".staging"
+    stale = [
+        path for path in (staging.iterdir() if staging.is_dir() else [])
+        if path.stat().st_mtime < time.time() - grace.total_seconds()
+    ]
+    for path in stale:
+        if not dry_run and path.is_dir():
+            # Рабочие каталоги обработки изображений (app/images.py)
+            shutil.rmtree(path, ignore_errors=True)
+        elif not dry_run:
+            path.unlink(missing_ok=True)
+    print(f"✓ Брошенных временных файлов удалено: {len(stale)}")
+    await models.async_engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, ничего не удалять")
+    parser.add_argument("--grace-minutes", type=float, default=60)
+    args = parser.parse_args()
+    asyncio.run(collect(args.dry_run, timedelta(minutes=args.grace_minutes)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+# generate_data.py
+# Синтетический набор данных для бенчмарков: клиенты, водители с профилями,
+# машинами и документами, администраторы, заказы за несколько лет и отзывы.
+#
+#   python generate_data.py --orders 5000000 [--clients 200000] [--drivers 20000] [--admins 5]
+#                           [--years 3] [--end 2026-01-01] [--seed 1] [--batch 100000]
+#
+# Пишет в DATABASE_URL (сначала alembic upgrade head; таблицы, которых нет,
+# создаются create_all). Строки добавляются к существующим, id продолжают
+# текущий максимум; в пустую базу одни и те же --seed, --end и объёмы дают
+# одинаковый набор. Распределения перекошены, как в жизни: поток заказов
+# растёт со временем и имеет утренний и вечерний пики, ранние клиенты и
+# водители делают большую часть поездок, заказы сосредоточены в нескольких
+# городах, цены логнормальные. Ожидающие и принятые заказы - только за
+# последние сутки перед --end. У всех пользователей пароль --password.
+import argparse
+import hashlib
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import bindparam, event, func, insert, select, text, update
+
+from app import models, rollups
+from app.geo import BASE32, STORED_PRECISION
+from app.hashing import pwd_context
+from app.storage import blob_key
+from app.uploads import DOCUMENT_SLOTS
+
+# Центр, вес и разброс (градусы) городов, где появляются заказы
+CITIES = [
+    (55.7558, 37.6173, 0.50, 0.12),
+    (59.9343, 30.3351, 0.25, 0.08),
+    (55.7961, 49.1064, 0.10, 0.05),
+    (56.8389, 60.6057, 0.10, 0.05),
+    (43.5855, 39.7231, 0.05, 0.04),
+]
+# Доля заказов по часам суток
+HOURLY = np.array([1, 1, 1, 1, 1, 2, 4, 7, 8, 6, 5, 5, 5, 5, 5, 6, 7, 8, 8, 6, 4, 3, 2, 1], dtype=float)
+STREETS = ["Lenina", "Pushkina", "Gagarina", "Mira", "Sadovaya", "Tverskaya", "Nevsky", "Kirova",
+           "Sovetskaya", "Molodezhnaya", "Shkolnaya", "Lesnaya", "Tsentralnaya", "Airport", "Vokzalnaya"]
+CARS = [("Toyota", "Camry"), ("Hyundai", "Solaris"), ("Kia", "Rio"), ("Skoda", "Octavia"),
+        ("Volkswagen", "Polo"), ("Mercedes", "V-Class"), ("Toyota", "Alphard"), ("Renault", "Logan")]
+COLORS = ["white", "black", "silver", "grey", "blue", "red"]
+COMMENTS = [None, None, "Всё отлично", "Вежливый водитель", "Чистая машина", "Опоздал", "Спасибо!"]
+
+def rng(seed: int, *stream: int) -> np.random.Generator:
+    """Отдельный поток случайных чисел на таблицу и пачку: набор не зависит от --batch"""
+    return np.random.default_rng([seed, *stream])
+
+def skewed_index(rng: np.random.Generator, available: np.ndarray, skew: float) -> np.ndarray:
+    """Индекс в [0, available): младшие (ранние) чаще, степенной закон"""
+    return np.minimum((available * rng.random(len(available)) ** skew).astype(np.int64), available - 1)
+
+def growing_times(rng: np.random.Generator, count: int, start: datetime, end: datetime) -> np.ndarray:
+    """Моменты с линейно растущей плотностью и суточным профилем HOURLY"""
+    days = (end - start).days
+    day = np.minimum((days * np.sqrt(rng.random(count))).astype(np.int64), days - 1)
+    hour = rng.choice(24, size=count, p=HOURLY / HOURLY.sum())
+    seconds = day * 86400 + hour * 3600 + rng.integers(0, 3600, count)
+    return np.datetime64(start, "s") + seconds.astype("timedelta64[s]")
+
+def geohash(lat: np.ndarray, lng: np.ndarray, precision: int = STORED_PRECISION) -> np.ndarray:
+    """Векторный аналог app.geo.encode"""
+    bits = precision * 5
+    lng_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lng_cells = np.minimum(((lng + 180.0) / 360.0 * (1 << lng_bits)).astype(np.int64), (1 << lng_bits) - 1)
+    lat_cells = np.minimum(((lat + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64), (1 << lat_bits) - 1)
+    value = np.zeros(len(lat), dtype=np.int64)
+    for i in range(bits):
+        # Чётные биты (с 0) - долгота, нечётные - широта, старшие первыми
+        if i % 2 == 0:
+            bit = (lng_cells >> (lng_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_cells >> (lat_bits - 1 - i // 2)) & 1
+        value = (value << 1) | bit
+    shifts = np.arange(precision - 1, -1, -1) * 5
+    chars = np.array(list(BASE32))[(value[:, None] >> shifts) & 31]
+    return np.ascontiguousarray(chars).view(f"<U{precision}").ravel()
+
+def points(rng: np.random.Generator, count: int):
+    city = rng.choice(len(CITIES), size=count, p=[c[2] for c in CITIES])
+    centers = np.array([(c[0], c[1], c[3]) for c in CITIES])[city]
+    lat = centers[:, 0] + rng.normal(0, 1, count) * centers[:, 2]
+    lng = centers[:, 1] + rng.normal(0, 1, count) * centers[:, 2] * 1.8
+    return np.round(lat, 6), np.round(lng, 6)
+
+def rows(columns: dict) -> list:
+    keys = list(columns)
+    values = [column.tolist() if isinstance(column, np.ndarray) else column for column in columns.values()]
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+def as_datetimes(values: np.ndarray, mask: np.ndarray = None) -> list:
+    result = values.astype("datetime64[us]").tolist()
+    if mask is not None:
+        result = [value if keep else None for value, keep in zip(result, mask.tolist())]
+    return result
+
+def password_hash(password: str, seed: int) -> str:
+    """bcrypt-хеш с солью из seed: один на всех пользователей и одинаковый от запуска к запуску"""
+    alphabet = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    salt = "".join(alphabet[i] for i in rng(seed, 0).integers(0, len(alphabet), 21)) + "."
+    return pwd_context.handler("bcrypt").using(salt=salt).hash(password)
+
+def next_id(conn, model) -> int:
+    return (conn.scalar(select(func.max(model.id))) or 0) + 1
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.end = args.end
+        self.start = args.end - timedelta(days=365 * args.years)
+        self.batch = args.batch
+        self.hashed = password_hash(args.password, args.seed)
+        self.inserted = {}
+
+    def insert(self, conn, model, columns: dict):
+        data = rows(columns)
+        for offset in range(0, len(data), self.batch):
+            conn.execute(insert(model), data[offset:offset + self.batch])
+        self.inserted[model.__tablename__] = self.inserted.get(model.__tablename__, 0) + len(data)
+
+    def users(self, conn):
+        args = self.args
+        r = rng(args.seed, 1)
+        base = next_id(conn, models.User)
+        roles = np.array(["client"] * args.clients + ["driver"] * args.drivers + ["admin"] * args.admins)
+        ids = base + np.arange(len(roles))
+        # Внутри роли id растут вместе с датой регистрации; первые - в начале периода
+        created = np.concatenate([
+            np.sort(growing_times(r, count, self.start, self.end)) for count in (args.clients, args.drivers, args.admins)
+        ])
+        for offset in np.cumsum([0, args.clients, args.drivers])[:3]:
+            created[offset] = np.datetime64(self.start, "s")
+        self.insert(conn, models.User, {
+            "id": ids,
+            "email": [f"{role}{user_id}@seed.test" for role, user_id in zip(roles.tolist(), ids.tolist())],
+            "hashed_password": [self.hashed] * len(ids),
+            "full_name": [f"{role.title()} {user_id}" for role, user_id in zip(roles.tolist(), ids.tolist())],
+            "role": roles,
+            "is_active": r.random(len(ids)) > 0.01,
+            "created_at": as_datetimes(created),
+        })
+        self.client_ids = ids[:args.clients]
+        self.client_created = created[:args.clients]
+        self.driver_ids = ids[args.clients:args.clients + args.drivers]
+        self.driver_created = created[args.clients:args.clients + args.drivers]
+        self.admin_ids = ids[args.clients + args.drivers:]
+
+    def drivers(self, conn):
+        args = self.args
+        r = rng(args.seed, 2)
+        count = len(self.driver_ids)
+        self.profile_ids = next_id(conn, models.DriverProfile) + np.arange(count)
+        status = r.choice(["approved", "pending", "rejected"], size=count, p=[0.85, 0.10, 0.05])
+        created = as_datetimes(self.driver_created)
+        self.insert(conn, models.DriverProfile, {
+            "id": self.profile_ids,
+            "user_id": self.driver_ids,
+            "phone": [f"+7900{i:07d}" for i in r.integers(0, 10 ** 7, count).tolist()],
+            "experience_years": r.integers(1, 30, count),
+            "bio": [None] * count,
+            "documents_status": status,
+            "is_verified": status == "approved",
+            "rating": np.zeros(count),
+            "total_trips": np.zeros(count, dtype=np.int64),
+            "created_at": created,
+        })
+        approved = status == "approved"
+        self.approved_ids = self.driver_ids[approved]
+        self.approved_created = self.driver_created[approved]
+        self.approved_profiles = self.profile_ids[approved]
+        self.trips = np.zeros(count, dtype=np.int64)
+        self.rating_sum = np.zeros(count)
+        self.rating_count = np.zeros(count, dtype=np.int64)
+
+        # Машины: у каждого пятого две
+        cars_per_driver = 1 + (r.random(count) < 0.2)
+        owner = np.repeat(np.arange(count), cars_per_driver)
+        car_ids = next_id(conn, models.Car) + np.arange(len(owner))
+        model_index = r.integers(0, len(CARS), len(owner))
+        capacity = r.choice([4, 4, 4, 6, 7], size=len(owner))
+        self.insert(conn, models.Car, {
+            "id": car_ids,
+            "driver_profile_id": self.profile_ids[owner],
+            "make": [CARS[i][0] for i in model_index.tolist()],
+            "model": [CARS[i][1] for i in model_index.tolist()],
+            "year": r.integers(2008, 2025, len(owner)),
+            "color": r.choice(COLORS, size=len(owner)),
+            "license_plate": [f"S{car_id}" for car_id in car_ids.tolist()],
+            "capacity": capacity,
+            "luggage_capacity": [None if c > 4 else int(l) for c, l in zip(capacity.tolist(), r.integers(2, 5, len(owner)).tolist())],
+            "has_air_conditioning": r.random(len(owner)) < 0.9,
+            "has_wifi": r.random(len(owner)) < 0.3,
+            "created_at": [created[i] for i in owner.tolist()],
+        })
+
+        # Документы: все слоты; у каждого десятого отклонённая первая версия прав
+        slots = list(DOCUMENT_SLOTS.items())
+        redo = r.random(count) < 0.1
+        reviewer = self.admin_ids[r.integers(0, len(self.admin_ids), count)] if len(self.admin_ids) else np.full(count, None)
+        documents = {key: [] for key in (
+            "driver_profile_id", "document_type", "file_path", "side", "slot", "version", "is_active",
+            "content_hash", "superseded_at", "uploaded_at", "status", "reviewed_by", "reviewed_at", "rejection_reason",
+        )}
+
+        def document(i, slot, document_type, side, version, active, doc_status, reason=None):
+            content_hash = hashlib.sha256(f"{args.seed}-{self.profile_ids[i]}-{slot}-{version}".encode()).hexdigest()
+            reviewed = doc_status != "pending"
+            values = {
+                "driver_profile_id": int(self.profile_ids[i]), "document_type": document_type,
+                "file_path": blob_key(content_hash, ".jpg"), "side": side, "slot": slot, "version": version,
+                "is_active": active, "content_hash": content_hash,
+                "superseded_at": None if active else created[i] + timedelta(days=1),
+                "uploaded_at": created[i] + timedelta(days=version - 1),
+                "status": doc_status,
+                "reviewed_by": int(reviewer[i]) if reviewed and reviewer[i] is not None else None,
+                "reviewed_at": created[i] + timedelta(days=version) if reviewed else None,
+                "rejection_reason": reason,
+            }
+            for key, value in values.items():
+                documents[key].append(value)
+
+        for i, driver_status in enumerate(status.tolist()):
+            for slot, (_, _, document_type, side) in slots:
+                if redo[i] and slot == "license_front":
+                    document(i, slot, document_type, side, 1, False, "rejected", "Документ нечитаем")
+                    document(i, slot, document_type, side, 2, True, driver_status)
+                else:
+                    document(i, slot, document_type, side, 1, True, driver_status)
+        self.insert(conn, models.DriverDocument, documents)
+
+        reviewed = np.flatnonzero(status != "pending")
+        if len(self.admin_ids):
+            self.insert(conn, models.AdminAction, {
+                "admin_id": reviewer[reviewed],
+                "action_type": ["approve_driver" if status[i] == "approved" else "reject_driver" for i in reviewed.tolist()],
+                "target_user_id": self.driver_ids[reviewed],
+                "details": ["Driver approved" if status[i] == "approved" else "Driver rejected: Документ нечитаем"
+                            for i in reviewed.tolist()],
+                "created_at": [created[i] + timedelta(days=1 + int(redo[i])) for i in reviewed.tolist()],
+            })
+
+    def orders(self, conn, chunk: int, offset: int, count: int, first_id: int, first_review_id: int) -> int:
+        """Пачка заказов и отзывов к ним; возвращает число отзывов"""
+        r = rng(self.args.seed, 3, chunk)
+        ids = first_id + offset + np.arange(count)
+        created = np.sort(growing_times(r, count, self.start, self.end))
+
+        client = skewed_index(r, np.maximum(np.searchsorted(self.client_created, created, side="right"), 1), 2.0)
+        driver = skewed_index(r, np.maximum(np.searchsorted(self.approved_created, created, side="right"), 1), 1.5)
+
+        recent = created >= np.datetime64(self.end - timedelta(days=1), "s")
+        status = np.where(
+            recent,
+            r.choice(["pending", "accepted", "completed", "cancelled"], size=count, p=[0.5, 0.3, 0.1, 0.1]),
+            r.choice(["completed", "cancelled"], size=count, p=[0.82, 0.18]),
+        )
+        has_driver = (status == "accepted") | (status == "completed") | ((status == "cancelled") & (r.random(count) < 0.4))
+
+        lead = np.minimum(r.lognormal(np.log(3 * 3600), 1.0, count), 14 * 86400).astype(np.int64)
+        pickup_time = created + np.maximum(lead, 900).astype("timedelta64[s]")
+        accepted_at = created + r.exponential(300, count).astype("timedelta64[s]")
+        completed_at = pickup_time + (900 + r.exponential(2400, count)).astype("timedelta64[s]")
+        price = np.round(r.lognormal(np.log(40), 0.6, count), 2)
+        completed = status == "completed"
+
+        lat, lng = points(r, count)
+        dropoff_lat = np.round(lat + r.normal(0, 0.08, count), 6)
+        dropoff_lng = np.round(lng + r.normal(0, 0.14, count), 6)
+        addresses = np.array([f"ul. {street}, {n}" for street in STREETS for n in range(1, 101)])
+
+        driver_ids = self.approved_ids[driver]
+        self.insert(conn, models.Order, {
+            "id": ids,
+            "client_id": self.client_ids[client],
+            "driver_id": [int(d) if keep else None for d, keep in zip(driver_ids.tolist(), has_driver.tolist())],
+            "pickup_location": addresses[r.integers(0, len(addresses), count)],
+            "dropoff_location": addresses[r.integers(0, len(addresses), count)],
+            "pickup_lat": lat,
+            "pickup_lng": lng,
+            "dropoff_lat": dropoff_lat,
+            "dropoff_lng": dropoff_lng,
+            "pickup_geohash": geohash(lat, lng),
+            "pickup_time": as_datetimes(pickup_time),
+            "passengers_count": r.choice([1, 2, 3, 4, 5, 6], size=count, p=[0.45, 0.3, 0.12, 0.08, 0.03, 0.02]),
+            "luggage_count": r.choice([0, 1, 2, 3, 4], size=count, p=[0.3, 0.35, 0.2, 0.1, 0.05]),
+            "client_price": price,
+            "final_price": [p if done else None for p, done in zip(price.tolist(), completed.tolist())],
+            "status": status,
+            "created_at": as_datetimes(created),
+            "accepted_at": as_datetimes(accepted_at, has_driver),
+            "completed_at": as_datetimes(completed_at, completed),
+            "version": 1 + has_driver + (completed | (status == "cancelled")),
+        })
+
+        # Отзыв оставляют к трети завершённых поездок, оценки смещены к пятёрке
+        reviewed = np.flatnonzero(completed & (r.random(count) < 0.35))
+        rating = r.choice([5, 4, 3, 2, 1], size=len(reviewed), p=[0.62, 0.22, 0.08, 0.04, 0.04])
+        profile_index = np.searchsorted(self.driver_ids, driver_ids[reviewed])
+        self.insert(conn, models.DriverReview, {
+            "id": first_review_id + np.arange(len(reviewed)),
+            "driver_id": self.profile_ids[profile_index],
+            "client_id": self.client_ids[client[reviewed]],
+            "order_id": ids[reviewed],
+            "rating": rating,
+            "comment": [COMMENTS[i] for i in r.integers(0, len(COMMENTS), len(reviewed)).tolist()],
+            "created_at": as_datetimes(completed_at[reviewed] + r.exponential(7200, len(reviewed)).astype("timedelta64[s]")),
+        })
+
+        self.trips += np.bincount(np.searchsorted(self.driver_ids, driver_ids[completed]), minlength=len(self.driver_ids))
+        self.rating_sum += np.bincount(profile_index, weights=rating, minlength=len(self.driver_ids))
+        self.rating_count += np.bincount(profile_index, minlength=len(self.driver_ids))
+        return len(reviewed)
+
+    def driver_totals(self, conn):
+        """Счётчик поездок и средняя оценка водителей - одним executemany"""
+        rating = np.round(np.divide(self.rating_sum, self.rating_count, out=np.zeros(len(self.rating_sum)),
+                                    where=self.rating_count > 0), 2)
+        data = rows({"profile_id": self.profile_ids, "trips": self.trips, "new_rating": rating})
+        statement = (
+            update(models.DriverProfile)
+            .where(models.DriverProfile.id == bindparam("profile_id"))
+            .values(total_trips=bindparam("trips"), rating=bindparam("new_rating"))
+        )
+        for offset in range(0, len(data), self.batch):
+            conn.execute(statement, data[offset:offset + self.batch])
+
+def sync_sequences(conn):
+    """id вставлялись явно: сдвинуть последовательности PostgreSQL за максимум"""
+    for model in (models.User, models.DriverProfile, models.Car, models.DriverDocument,
+                  models.AdminAction, models.Order, models.DriverReview):
+        table = model.__tablename__
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+        ))
+
+def speed_up_sqlite(engine):
+    """Без fsync на каждый коммит и с большим кешем: набор всегда можно сгенерировать заново"""
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA cache_size=-262144")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, default=None, help="по умолчанию - orders / 25")
+    parser.add_argument("--drivers", type=int, default=None, help="по умолчанию - orders / 250")
+    parser.add_argument("--admins", type=int, default=5)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--end", type=datetime.fromisoformat,
+                        default=datetime.now().replace(hour=0, minute=0, second=0, microsecond=0),
+                        help="конец периода (по умолчанию - сегодня 00:00)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch", type=int, default=100_000, help="строк в одном executemany и одной транзакции заказов")
+    parser.add_argument("--password", default="password")
+    args = parser.parse_args()
+    args.clients = args.clients if args.clients is not None else max(args.orders // 25, 1)
+    args.drivers = args.drivers if args.drivers is not None else max(args.orders // 250, 1)
+
+    engine = models.engine
+    if engine.dialect.name == "sqlite":
+        speed_up_sqlite(engine)
+    models.Base.metadata.create_all(engine)
+
+    started = time.perf_counter()
+    generator = Generator(args)
+    with engine.begin() as conn:
+        generator.users(conn)
+        generator.drivers(conn)
+        first_order = next_id(conn, models.Order)
+        review_id = next_id(conn, models.DriverReview)
+    print(f"✓ Пользователи и водители: {time.perf_counter() - started:.1f}s")
+
+    for chunk, offset in enumerate(range(0, args.orders, args.batch)):
+        count = min(args.batch, args.orders - offset)
+        with engine.begin() as conn:
+            review_id += generator.orders(conn, chunk, offset, count, first_order, review_id)
+        done = offset + count
+        elapsed = time.perf_counter() - started
+        print(f"  заказов {done}/{args.orders} ({done / elapsed:.0f}/s)", end="\r", flush=True)
+    print()
+
+    with engine.begin() as conn:
+        generator.driver_totals(conn)
+        buckets = rollups.rebuild(conn)
+        if conn.dialect.name == "postgresql":
+            sync_sequences(conn)
+    elapsed = time.perf_counter() - started
+
+    for table, count in generator.inserted.items():
+        print(f"✓ {table}: {count}")
+    print(f"✓ Корзин статистики пересчитано: {buckets}")
+    print(f"✓ Готово за {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
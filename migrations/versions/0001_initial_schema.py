@@ -0,0 +1,177 @@
+"""initial schema
+
+Схема в том виде, в каком её создавал Base.metadata.create_all.
+Для существующей базы: alembic stamp 0001 && alembic upgrade head
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 20:30:20.474318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=True),
+    sa.Column('role', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+        batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+
+    op.create_table('admin_actions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('admin_id', sa.Integer(), nullable=True),
+    sa.Column('action_type', sa.String(), nullable=True),
+    sa.Column('target_user_id', sa.Integer(), nullable=True),
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['admin_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['target_user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('admin_actions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_admin_actions_id'), ['id'], unique=False)
+
+    op.create_table('driver_profiles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('phone', sa.String(), nullable=True),
+    sa.Column('experience_years', sa.Integer(), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('documents_status', sa.String(), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('rating', sa.Float(), nullable=True),
+    sa.Column('total_trips', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    with op.batch_alter_table('driver_profiles', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_driver_profiles_id'), ['id'], unique=False)
+
+    op.create_table('orders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=True),
+    sa.Column('driver_id', sa.Integer(), nullable=True),
+    sa.Column('pickup_location', sa.String(), nullable=True),
+    sa.Column('dropoff_location', sa.String(), nullable=True),
+    sa.Column('pickup_time', sa.DateTime(), nullable=True),
+    sa.Column('passengers_count', sa.Integer(), nullable=True),
+    sa.Column('luggage_count', sa.Integer(), nullable=True),
+    sa.Column('client_price', sa.Float(), nullable=True),
+    sa.Column('final_price', sa.Float(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('accepted_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['driver_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_orders_id'), ['id'], unique=False)
+
+    op.create_table('cars',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('driver_profile_id', sa.Integer(), nullable=True),
+    sa.Column('make', sa.String(), nullable=True),
+    sa.Column('model', sa.String(), nullable=True),
+    sa.Column('year', sa.Integer(), nullable=True),
+    sa.Column('color', sa.String(), nullable=True),
+    sa.Column('license_plate', sa.String(), nullable=True),
+    sa.Column('capacity', sa.Integer(), nullable=True),
+    sa.Column('has_air_conditioning', sa.Boolean(), nullable=True),
+    sa.Column('has_wifi', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['driver_profile_id'], ['driver_profiles.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('license_plate')
+    )
+    with op.batch_alter_table('cars', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cars_id'), ['id'], unique=False)
+
+    op.create_table('driver_documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('driver_profile_id', sa.Integer(), nullable=True),
+    sa.Column('document_type', sa.String(), nullable=True),
+    sa.Column('file_path', sa.String(), nullable=True),
+    sa.Column('side', sa.String(), nullable=True),
+    sa.Column('uploaded_at', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('reviewed_by', sa.Integer(), nullable=True),
+    sa.Column('reviewed_at', sa.DateTime(), nullable=True),
+    sa.Column('rejection_reason', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['driver_profile_id'], ['driver_profiles.id'], ),
+    sa.ForeignKeyConstraint(['reviewed_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('driver_documents', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_driver_documents_id'), ['id'], unique=False)
+
+    op.create_table('driver_reviews',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('driver_id', sa.Integer(), nullable=True),
+    sa.Column('client_id', sa.Integer(), nullable=True),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('rating', sa.Integer(), nullable=True),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['driver_id'], ['driver_profiles.id'], ),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('driver_reviews', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_driver_reviews_id'), ['id'], unique=False)
+
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('driver_reviews', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_driver_reviews_id'))
+
+    op.drop_table('driver_reviews')
+    with op.batch_alter_table('driver_documents', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_driver_documents_id'))
+
+    op.drop_table('driver_documents')
+    with op.batch_alter_table('cars', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cars_id'))
+
+    op.drop_table('cars')
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_orders_id'))
+
+    op.drop_table('orders')
+    with op.batch_alter_table('driver_profiles', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_driver_profiles_id'))
+
+    op.drop_table('driver_profiles')
+    with op.batch_alter_table('admin_actions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_admin_actions_id'))
+
+    op.drop_table('admin_actions')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
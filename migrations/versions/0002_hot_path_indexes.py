@@ -0,0 +1,43 @@
+"""hot path indexes
+
+Составные и частичные индексы под горячие запросы:
+лента доступных заказов, статистика водителя, история клиента,
+документы профиля и выборки пользователей по роли.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 20:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PENDING = sa.text("status = 'pending'")
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_orders_pending_created_at', 'orders', ['created_at', 'pickup_time'],
+        sqlite_where=PENDING, postgresql_where=PENDING,
+    )
+    op.create_index('ix_orders_driver_id_status', 'orders', ['driver_id', 'status'])
+    op.create_index('ix_orders_client_id_created_at', 'orders', ['client_id', 'created_at'])
+    op.create_index('ix_driver_documents_driver_profile_id', 'driver_documents', ['driver_profile_id'])
+    op.create_index('ix_users_role_created_at', 'users', ['role', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_role_created_at', table_name='users')
+    op.drop_index('ix_driver_documents_driver_profile_id', table_name='driver_documents')
+    op.drop_index('ix_orders_client_id_created_at', table_name='orders')
+    op.drop_index('ix_orders_driver_id_status', table_name='orders')
+    op.drop_index('ix_orders_pending_created_at', table_name='orders')
@@ -0,0 +1,41 @@
+"""stats buckets
+
+Таблица почасовых и суточных счётчиков. После миграции заполнить:
+python rebuild_rollups.py
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 21:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('stats_buckets',
+    sa.Column('granularity', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('orders_created', sa.Integer(), nullable=False),
+    sa.Column('orders_accepted', sa.Integer(), nullable=False),
+    sa.Column('orders_completed', sa.Integer(), nullable=False),
+    sa.Column('orders_cancelled', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('new_users', sa.Integer(), nullable=False),
+    sa.Column('new_clients', sa.Integer(), nullable=False),
+    sa.Column('new_drivers', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('granularity', 'bucket_start')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('stats_buckets')
@@ -0,0 +1,32 @@
+"""keyset pagination indexes
+
+Индексы под сортировку (created_at, id) в списочных эндпоинтах:
+все заказы, заказы водителя, все пользователи.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 21:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_orders_created_at', 'orders', ['created_at'])
+    op.create_index('ix_orders_driver_id_created_at', 'orders', ['driver_id', 'created_at'])
+    op.create_index('ix_users_created_at', 'users', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at', table_name='users')
+    op.drop_index('ix_orders_driver_id_created_at', table_name='orders')
+    op.drop_index('ix_orders_created_at', table_name='orders')
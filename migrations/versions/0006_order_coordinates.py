@@ -0,0 +1,46 @@
+"""order coordinates
+
+Координаты посадки и высадки и геохеш точки посадки с частичным
+индексом по ожидающим заказам.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 23:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PENDING = sa.text("status = 'pending'")
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.add_column(sa.Column('pickup_lat', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('pickup_lng', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('dropoff_lat', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('dropoff_lng', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('pickup_geohash', sa.String(length=12), nullable=True))
+    op.create_index(
+        'ix_orders_pending_pickup_geohash', 'orders', ['pickup_geohash'],
+        sqlite_where=PENDING, postgresql_where=PENDING,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_pending_pickup_geohash', table_name='orders')
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('pickup_geohash')
+        batch_op.drop_column('dropoff_lng')
+        batch_op.drop_column('dropoff_lat')
+        batch_op.drop_column('pickup_lng')
+        batch_op.drop_column('pickup_lat')
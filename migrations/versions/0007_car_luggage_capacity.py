@@ -0,0 +1,30 @@
+"""car luggage capacity
+
+Вместимость багажника для отбора водителей диспетчером.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 23:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('cars') as batch_op:
+        batch_op.add_column(sa.Column('luggage_capacity', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('cars') as batch_op:
+        batch_op.drop_column('luggage_capacity')
@@ -0,0 +1,45 @@
+"""driver document renditions
+
+Размеры документа и пути к WebP-превью и миниатюре, которые строит
+фоновая обработка изображений.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16 23:55:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    ('width', sa.Integer()),
+    ('height', sa.Integer()),
+    ('preview_path', sa.String()),
+    ('preview_width', sa.Integer()),
+    ('preview_height', sa.Integer()),
+    ('thumbnail_path', sa.String()),
+    ('thumbnail_width', sa.Integer()),
+    ('thumbnail_height', sa.Integer()),
+    ('processed_at', sa.DateTime()),
+)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('driver_documents') as batch_op:
+        for name, column_type in COLUMNS:
+            batch_op.add_column(sa.Column(name, column_type, nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('driver_documents') as batch_op:
+        for name, _ in reversed(COLUMNS):
+            batch_op.drop_column(name)
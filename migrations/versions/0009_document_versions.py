@@ -0,0 +1,84 @@
+"""driver document versions
+
+Слот, версия и признак активности документа, хеш содержимого для
+хранилища с адресацией по SHA-256. Существующие строки получают слот
+из типа/стороны/имени файла, активной остаётся последняя в слоте.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:05:00.000000
+
+"""
+from pathlib import PurePosixPath
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def legacy_slot(document_type, side, file_path):
+    if document_type == 'car_photo':
+        # 3/car_photos/car_photo_2.jpg -> car_photo_2
+        return PurePosixPath((file_path or '').replace('\\', '/')).stem or None
+    return f'{document_type}_{side}' if side else document_type
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('driver_documents') as batch_op:
+        batch_op.add_column(sa.Column('slot', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=False))
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('superseded_at', sa.DateTime(), nullable=True))
+
+    connection = op.get_bind()
+    documents = sa.table(
+        'driver_documents',
+        sa.column('id', sa.Integer), sa.column('driver_profile_id', sa.Integer),
+        sa.column('document_type', sa.String), sa.column('side', sa.String),
+        sa.column('file_path', sa.String), sa.column('uploaded_at', sa.DateTime),
+        sa.column('slot', sa.String), sa.column('version', sa.Integer),
+        sa.column('is_active', sa.Boolean), sa.column('superseded_at', sa.DateTime),
+    )
+    rows = connection.execute(
+        sa.select(
+            documents.c.id, documents.c.driver_profile_id, documents.c.document_type,
+            documents.c.side, documents.c.file_path, documents.c.uploaded_at
+        ).order_by(documents.c.id)
+    ).all()
+    slots = {}
+    for row in rows:
+        slots.setdefault((row.driver_profile_id, legacy_slot(row.document_type, row.side, row.file_path)), []).append(row)
+    for (_, slot), versions in slots.items():
+        for number, row in enumerate(versions, start=1):
+            following = versions[number] if number < len(versions) else None
+            connection.execute(
+                documents.update().where(documents.c.id == row.id).values(
+                    slot=slot,
+                    version=number,
+                    is_active=following is None,
+                    superseded_at=following.uploaded_at if following is not None else None,
+                )
+            )
+
+    op.create_index(
+        'ix_driver_documents_active_slot', 'driver_documents', ['driver_profile_id', 'slot'],
+        unique=True, sqlite_where=sa.text('is_active = 1'), postgresql_where=sa.text('is_active'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_driver_documents_active_slot', table_name='driver_documents')
+    with op.batch_alter_table('driver_documents') as batch_op:
+        batch_op.drop_column('superseded_at')
+        batch_op.drop_column('content_hash')
+        batch_op.drop_column('is_active')
+        batch_op.drop_column('version')
+        batch_op.drop_column('slot')
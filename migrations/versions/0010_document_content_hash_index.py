@@ -0,0 +1,28 @@
+"""driver document content hash index
+
+Проверка доступа к файлу по ключу blobs/ab/<hash>... ищет документы по
+content_hash.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 00:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_driver_documents_content_hash', 'driver_documents', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_driver_documents_content_hash', table_name='driver_documents')
@@ -0,0 +1,40 @@
+"""admin action audit
+
+entry_id записей журнала app/audit.py (повторная вставка после сбоя
+игнорируется) и индексы под выборку истории действий по администратору,
+по пользователю и по времени.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 00:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('admin_actions') as batch_op:
+        batch_op.add_column(sa.Column('entry_id', sa.String(length=32), nullable=True))
+    op.create_index('ix_admin_actions_entry_id', 'admin_actions', ['entry_id'], unique=True)
+    op.create_index('ix_admin_actions_created_at', 'admin_actions', ['created_at'])
+    op.create_index('ix_admin_actions_admin_id_created_at', 'admin_actions', ['admin_id', 'created_at'])
+    op.create_index('ix_admin_actions_target_user_id_created_at', 'admin_actions', ['target_user_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_admin_actions_target_user_id_created_at', table_name='admin_actions')
+    op.drop_index('ix_admin_actions_admin_id_created_at', table_name='admin_actions')
+    op.drop_index('ix_admin_actions_created_at', table_name='admin_actions')
+    op.drop_index('ix_admin_actions_entry_id', table_name='admin_actions')
+    with op.batch_alter_table('admin_actions') as batch_op:
+        batch_op.drop_column('entry_id')
@@ -0,0 +1,8 @@
+# rebuild_rollups.py
+# Пересчёт таблицы stats_buckets из orders и users.
+# Нужен после миграции 0003 и после ручных правок данных.
+from app import models, rollups
+
+with models.engine.begin() as connection:
+    count = rollups.rebuild(connection)
+print(f"✓ Корзин статистики пересчитано: {count}")